@@ -102,6 +102,7 @@ class Cliente(models.Model):
             models.Index(fields=['cif']),
             models.Index(fields=['activo']),
             models.Index(fields=['empleado_asignado']),
+            models.Index(fields=['creado_el', 'id']),
         ]
 
     def __str__(self):
@@ -5,6 +5,8 @@ from django.contrib import messages
 from django.contrib.auth.models import User
 from django.http import JsonResponse, HttpResponse
 from .models import Cliente
+from core.busqueda import buscar
+from core.paginacion import paginar_keyset
 
 
 @login_required
@@ -98,10 +100,14 @@ def list_client(request):
     query = request.GET.get('buscarCliente')
     cliente = Cliente.objects.all()
 
+    orden = ('-creado_el',)
     if query:
-        cliente = cliente.filter(nombre_comercial__icontains=query)
+        cliente = buscar(cliente, query)
+        orden = ('-relevancia', '-creado_el')
 
-    return render(request, 'clientes/list_client.html', {"clientes": cliente, "query": query})
+    pagina = paginar_keyset(request, cliente, orden)
+
+    return render(request, 'clientes/list_client.html', {"clientes": pagina.objetos, "pagina": pagina, "query": query})
 
 
 @login_required
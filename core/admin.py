@@ -1,3 +1,12 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import ConsultaLenta
+
+
+@admin.register(ConsultaLenta)
+class ConsultaLentaAdmin(admin.ModelAdmin):
+    list_display = ('vista', 'ejecuciones', 'milisegundos_total', 'milisegundos_maximo', 'ultima_vez')
+    list_filter = ('vista',)
+    search_fields = ('sql', 'vista')
+    ordering = ('-milisegundos_total',)
+    readonly_fields = ('huella', 'sql', 'pila', 'primera_vez', 'ultima_vez')
@@ -0,0 +1,115 @@
+"""
+Búsqueda de productos, clientes y proveedores.
+
+En PostgreSQL con la extensión pg_trgm, los campos de búsqueda tienen
+índices GIN de trigramas sobre UPPER(campo), que es la expresión que usa
+Django para `icontains`, así que el ILIKE '%texto%' deja de recorrer la
+tabla entera, y los resultados se ordenan por similitud (TrigramSimilarity).
+Sin la extensión (u otra base de datos) se usa el mismo filtro icontains y
+una relevancia sencilla: coincidencia exacta, prefijo y resto.
+"""
+
+from django.apps import apps
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connections
+from django.db.models import Case, DecimalField, Q, Value, When
+from django.db.models.functions import Cast, Greatest
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Campos en los que se busca para cada modelo (el primero es el nombre)
+CAMPOS_BUSQUEDA = {
+    'inventario.Producto': ('nombre', 'codigo_producto'),
+    'clientes.Cliente': ('nombre_comercial', 'cif', 'email'),
+    'proveedores.Proveedor': ('nombre_empresa', 'cif', 'email'),
+}
+
+# La relevancia se redondea a un decimal exacto: es clave de ordenación de
+# la paginación keyset y el float4 de TrigramSimilarity no vuelve igual
+# tras pasar por el cursor, así que los empates en el borde de página se
+# perderían (WHERE relevancia = :valor no encontraría la fila)
+CAMPO_RELEVANCIA = DecimalField(max_digits=6, decimal_places=5)
+
+# Resultado de la comprobación de pg_trgm por alias de conexión
+_trigram_por_conexion = {}
+
+
+def trigram_disponible(alias='default'):
+    """Indica si la base de datos es PostgreSQL y tiene instalada pg_trgm"""
+    if alias not in _trigram_por_conexion:
+        connection = connections[alias]
+        disponible = False
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+                disponible = cursor.fetchone() is not None
+        _trigram_por_conexion[alias] = disponible
+    return _trigram_por_conexion[alias]
+
+
+def buscar(queryset, texto):
+    """
+    Filtra `queryset` por `texto` en los campos de CAMPOS_BUSQUEDA de su
+    modelo y añade la anotación `relevancia` (Decimal, mayor es mejor).
+    """
+    texto = (texto or '').strip()
+    if not texto:
+        return queryset
+
+    campos = CAMPOS_BUSQUEDA[queryset.model._meta.label]
+    filtro = Q()
+    for campo in campos:
+        filtro |= Q(**{f'{campo}__icontains': texto})
+
+    if trigram_disponible(queryset.db):
+        similitudes = [TrigramSimilarity(campo, texto) for campo in campos]
+        relevancia = Greatest(*similitudes) if len(similitudes) > 1 else similitudes[0]
+    else:
+        nombre = campos[0]
+        relevancia = Case(
+            When(**{f'{nombre}__iexact': texto}, then=Value(1.0)),
+            When(**{f'{nombre}__istartswith': texto}, then=Value(0.5)),
+            default=Value(0.1),
+        )
+
+    return queryset.filter(filtro).annotate(
+        relevancia=Cast(relevancia, CAMPO_RELEVANCIA))
+
+
+def _nombre_indice(tabla, columna):
+    return f'{tabla}_{columna}_trgm'[:63]
+
+
+def crear_indices_busqueda(using='default', **kwargs):
+    """
+    Instala pg_trgm (si el usuario tiene permisos) y crea los índices GIN de
+    trigramas. Se ejecuta en post_migrate porque las migraciones se generan
+    en el despliegue y no pueden llevar operaciones específicas de PostgreSQL.
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return
+
+    _trigram_por_conexion.pop(using, None)
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        except Exception as e:
+            logger.warning(
+                f"⚠️ No se pudo instalar pg_trgm, la búsqueda usará icontains: {e}")
+            return
+
+        for modelo, campos in CAMPOS_BUSQUEDA.items():
+            meta = apps.get_model(modelo)._meta
+            for campo in campos:
+                columna = meta.get_field(campo).column
+                cursor.execute(
+                    f'CREATE INDEX IF NOT EXISTS '
+                    f'{connection.ops.quote_name(_nombre_indice(meta.db_table, columna))} '
+                    f'ON {connection.ops.quote_name(meta.db_table)} '
+                    f'USING gin ((UPPER({connection.ops.quote_name(columna)}::text)) gin_trgm_ops)')
+
+    _trigram_por_conexion.pop(using, None)
+    logger.info("🔎 Índices de búsqueda por trigramas verificados")
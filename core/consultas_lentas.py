@@ -0,0 +1,169 @@
+"""
+Registro de consultas lentas (opcional).
+
+Si CONSULTAS_LENTAS_UMBRAL_MS está definido, ConsultasLentasMiddleware
+cronometra las consultas de cada petición. Las que superan el umbral se
+agrupan en memoria por huella (SQL normalizado, sin valores) y vista, con
+la pila de llamadas de la primera vez que aparecen. El registro guarda como
+mucho CONSULTAS_LENTAS_MAXIMO grupos y se vuelca a ConsultaLenta cada
+CONSULTAS_LENTAS_VOLCADO_SEGUNDOS. Con umbral 0 se agrupan todas las
+consultas, y los N+1 salen arriba por tiempo total: muchas consultas rápidas
+con la misma huella en la misma vista.
+"""
+
+import hashlib
+import logging
+import re
+import threading
+import time
+import traceback
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import ConsultaLenta
+
+logger = logging.getLogger(__name__)
+
+# Marcos de la pila (solo código del proyecto) guardados por grupo
+PROFUNDIDAD_PILA = 6
+
+_SAVEPOINTS = re.compile(r'"s\d+_x\d+"')
+_LITERALES = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_LISTAS = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_FILAS = re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+')
+_ESPACIOS = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=2048)
+def normalizar_sql(sql):
+    """
+    (huella, SQL normalizado): sin literales, parámetros ni nombres de
+    savepoint, y con las listas IN (...) y las filas de VALUES reducidas a
+    una, para que la misma consulta con otros valores o tamaños de lote
+    caiga en el mismo grupo
+    """
+    normalizado = _LITERALES.sub('?', _SAVEPOINTS.sub('"s?"', sql)).replace('%s', '?')
+    normalizado = _FILAS.sub('(...)', _LISTAS.sub('(...)', normalizado))
+    normalizado = _ESPACIOS.sub(' ', normalizado).strip()
+    return hashlib.md5(normalizado.encode()).hexdigest(), normalizado
+
+
+def pila_corta():
+    """Últimas llamadas del código del proyecto, de la más externa a la más interna"""
+    base = str(settings.BASE_DIR)
+    marcos = [
+        marco for marco in traceback.extract_stack()
+        if marco.filename.startswith(base) and 'site-packages' not in marco.filename
+        and marco.filename != __file__
+    ]
+    return '\n'.join(
+        f'{marco.filename[len(base) + 1:]}:{marco.lineno} {marco.name}'
+        for marco in marcos[-PROFUNDIDAD_PILA:]
+    )
+
+
+class RegistroConsultas:
+    """Grupos de consultas en memoria del proceso, como mucho CONSULTAS_LENTAS_MAXIMO"""
+
+    def __init__(self):
+        self.grupos = {}
+        self.descartadas = 0
+        self.ultimo_volcado = time.monotonic()
+        self.bloqueo = threading.Lock()
+        # Por hilo: el volcado de una petición no debe silenciar a las demás
+        self._hilo = threading.local()
+
+    @property
+    def volcando(self):
+        """True mientras este hilo guarda los grupos (sus consultas no se registran)"""
+        return getattr(self._hilo, 'volcando', False)
+
+    def registrar(self, sql, vista, milisegundos):
+        huella, normalizado = normalizar_sql(sql)
+        clave = (huella, vista)
+        with self.bloqueo:
+            grupo = self.grupos.get(clave)
+            if grupo is None:
+                if len(self.grupos) >= settings.CONSULTAS_LENTAS_MAXIMO:
+                    self.descartadas += 1
+                    return
+                grupo = self.grupos[clave] = {
+                    'sql': normalizado, 'pila': pila_corta(),
+                    'ejecuciones': 0, 'total': 0.0, 'maximo': 0.0,
+                }
+            grupo['ejecuciones'] += 1
+            grupo['total'] += milisegundos
+            grupo['maximo'] = max(grupo['maximo'], milisegundos)
+
+    def volcar(self, forzar=False):
+        """Suma los grupos pendientes a ConsultaLenta si ha pasado el intervalo (o si `forzar`)"""
+        with self.bloqueo:
+            if not forzar and (time.monotonic() - self.ultimo_volcado
+                               < settings.CONSULTAS_LENTAS_VOLCADO_SEGUNDOS):
+                return
+            grupos, self.grupos = self.grupos, {}
+            descartadas, self.descartadas = self.descartadas, 0
+            self.ultimo_volcado = time.monotonic()
+
+        if descartadas:
+            logger.warning(
+                f"Registro de consultas lleno: {descartadas} consultas sin registrar")
+        if not grupos:
+            return
+
+        ahora = timezone.now()
+        self._hilo.volcando = True
+        try:
+            self._guardar(grupos, ahora)
+        except DatabaseError as e:
+            # El registro no debe romper la petición que lo vuelca
+            logger.error(f"Error volcando consultas lentas: {str(e)}")
+        finally:
+            self._hilo.volcando = False
+
+    def _guardar(self, grupos, ahora):
+        with transaction.atomic():
+            # Filas nuevas a cero; las que ya existen (otro proceso) se respetan
+            ConsultaLenta.objects.bulk_create([
+                ConsultaLenta(huella=huella, vista=vista, sql=grupo['sql'],
+                              pila=grupo['pila'], ultima_vez=ahora)
+                for (huella, vista), grupo in grupos.items()
+            ], ignore_conflicts=True)
+            for (huella, vista), grupo in grupos.items():
+                ConsultaLenta.objects.filter(huella=huella, vista=vista).update(
+                    ejecuciones=F('ejecuciones') + grupo['ejecuciones'],
+                    milisegundos_total=F('milisegundos_total') + grupo['total'],
+                    milisegundos_maximo=Greatest('milisegundos_maximo', grupo['maximo']),
+                    ultima_vez=ahora,
+                )
+
+
+registro = RegistroConsultas()
+
+
+class CronometroConsultas:
+    """Envoltorio de connection.execute_wrapper que registra las consultas de una petición"""
+
+    def __init__(self, request, umbral_ms):
+        self.request = request
+        self.umbral_ms = umbral_ms
+
+    def __call__(self, execute, sql, params, many, context):
+        if registro.volcando:
+            # Volcado desde la propia petición (página de consultas lentas)
+            return execute(sql, params, many, context)
+
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            milisegundos = (time.perf_counter() - inicio) * 1000
+            if milisegundos >= self.umbral_ms:
+                coincidencia = self.request.resolver_match
+                registro.registrar(
+                    sql, coincidencia.view_name if coincidencia else '', milisegundos)
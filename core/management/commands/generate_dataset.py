@@ -0,0 +1,475 @@
+"""
+Genera un conjunto de datos sintético grande (clientes, proveedores,
+productos, órdenes de venta y pedidos con sus líneas) para entornos de
+pruebas de rendimiento.
+
+A diferencia de reset_demo, todo se inserta con bulk_create por lotes y con
+los signals de modelo desconectados: las líneas no reservan stock una a una.
+Al terminar, los saldos de inventario se reconstruyen de una vez a partir de
+los documentos generados (una consulta agregada por tipo de documento), y el
+total por producto y la cola de reposición con sus recálculos completos.
+Con la misma semilla se generan los mismos datos.
+"""
+
+import random
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Case, IntegerField, Sum, When
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.utils import timezone
+from faker import Faker
+
+from clientes.models import Cliente
+from core.models import ContadorDocumento
+from core.numeracion import reservar_numeros
+from inventario.codigos import prefijo_categoria, reservar_codigos
+from inventario.models import (
+    Almacen, CategoriaProducto, ContadorCodigo, Inventario, MovimientoStock, Producto,
+    ReposicionPendiente, StockProducto)
+from inventario.services import actualizar_cola_reposicion, recalcular_stock_productos
+from pedidos.estadisticas import invalidar_estadisticas_dashboard
+from pedidos.models import DetalleOrdenVenta, DetallePedidoProveedor, OrdenVenta, PedidoProveedor
+from pedidos.services import redondear_importe
+from pedidos.signals import EFECTO_ESTADO_ORDEN_VENTA
+from proveedores.models import Proveedor
+
+# Filas (o documentos) generadas por transacción
+TAMANO_LOTE = 5000
+
+# Filas por sentencia INSERT
+TAMANO_INSERT = 1000
+
+# Textos distintos que se generan con Faker y luego se combinan
+TAMANO_MUESTRAS = 500
+
+CATEGORIAS = [
+    ('Electrónica', 'Productos electrónicos y componentes'),
+    ('Herramientas', 'Herramientas manuales y eléctricas'),
+    ('Materiales de Construcción', 'Cemento, arena, ladrillos, etc.'),
+    ('Fontanería', 'Tuberías, grifos y accesorios'),
+    ('Electricidad', 'Cables, enchufes y componentes eléctricos'),
+    ('Pintura', 'Pinturas, brochas y accesorios'),
+    ('Ferretería', 'Tornillos, clavos, bisagras, etc.'),
+    ('Jardinería', 'Herramientas y productos para jardín'),
+]
+
+# Estados con su peso: la mayoría de los documentos ya están cerrados
+ESTADOS_ORDEN = (('pendiente', 10), ('procesando', 5), ('entregado', 80), ('cancelado', 5))
+ESTADOS_PEDIDO = (('pendiente', 10), ('recibido_parcial', 5),
+                  ('recibido_completo', 80), ('cancelado', 5))
+
+PORCENTAJES_IGIC = [Decimal('0'), Decimal('3'), Decimal('7'), Decimal('9.5'), Decimal('15')]
+METODOS_PAGO = ['Transferencia', 'Contado', 'Tarjeta', 'Cheque', '30 días', '60 días']
+UNIDADES = ['Unidad', 'Caja', 'Metro', 'Litro', 'Kilo']
+UBICACIONES = ['A-01', 'A-02', 'B-01', 'B-02', 'C-01', 'PATIO', 'DEPOSITO']
+
+# Tablas que vacía --limpiar, de las dependientes a las principales
+TABLAS_LIMPIEZA = [
+    MovimientoStock, ReposicionPendiente, StockProducto, Inventario,
+    DetalleOrdenVenta, DetallePedidoProveedor, OrdenVenta, PedidoProveedor,
+    Producto, Cliente, Proveedor, ContadorDocumento, ContadorCodigo,
+]
+
+
+@contextmanager
+def signals_desactivados():
+    """Desconecta temporalmente todos los receptores de los signals de modelo"""
+    senales = (pre_save, post_save, pre_delete, post_delete)
+    receptores = {senal: senal.receivers for senal in senales}
+    for senal in senales:
+        senal.receivers = []
+        senal.sender_receivers_cache.clear()
+    try:
+        yield
+    finally:
+        for senal, lista in receptores.items():
+            senal.receivers = lista
+            senal.sender_receivers_cache.clear()
+
+
+class Command(BaseCommand):
+    help = ('Genera un conjunto de datos sintético de cualquier tamaño con '
+            'bulk_create por lotes y una semilla fija (mismos datos en cada '
+            'ejecución), y reconstruye el inventario al final')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clientes', type=int, default=10000,
+                            help='Clientes a crear (default: 10000)')
+        parser.add_argument('--proveedores', type=int, default=500,
+                            help='Proveedores a crear (default: 500)')
+        parser.add_argument('--productos', type=int, default=5000,
+                            help='Productos a crear (default: 5000)')
+        parser.add_argument('--ordenes', type=int, default=100000,
+                            help='Órdenes de venta a crear (default: 100000)')
+        parser.add_argument('--pedidos', type=int, default=10000,
+                            help='Pedidos a proveedores a crear (default: 10000)')
+        parser.add_argument('--lineas', type=int, default=5,
+                            help='Máximo de líneas por documento (default: 5)')
+        parser.add_argument('--dias', type=int, default=730,
+                            help='Días hacia atrás que abarcan los documentos (default: 730)')
+        parser.add_argument('--semilla', type=int, default=42,
+                            help='Semilla de los datos aleatorios (default: 42)')
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE,
+                            help=f'Filas por transacción (default: {TAMANO_LOTE})')
+        parser.add_argument('--limpiar', action='store_true',
+                            help='Vacía antes las tablas de negocio (usuarios y almacenes se conservan)')
+
+    def handle(self, *args, **options):
+        if options['productos'] < 1 and (options['ordenes'] or options['pedidos']):
+            raise CommandError('Hacen falta productos para generar órdenes y pedidos')
+        if options['clientes'] < 1 and options['ordenes']:
+            raise CommandError('Hacen falta clientes para generar órdenes')
+        if options['proveedores'] < 1 and options['pedidos']:
+            raise CommandError('Hacen falta proveedores para generar pedidos')
+
+        self.rng = random.Random(options['semilla'])
+        self.semilla = options['semilla']
+        self.lote = max(options['lote'], 1)
+        self.max_lineas = max(options['lineas'], 1)
+        self.dias = max(options['dias'], 1)
+        self.hoy = timezone.localdate()
+        self._preparar_muestras(options['semilla'])
+        # Los documentos se reparten entre los usuarios existentes
+        self.empleados = list(
+            User.objects.filter(is_active=True).values_list('id', flat=True)) or [None]
+
+        self.stdout.write(self.style.WARNING(
+            f'🏗️  Generando dataset (semilla {self.semilla}, lotes de {self.lote})...'))
+        inicio = time.monotonic()
+
+        with signals_desactivados():
+            if options['limpiar']:
+                self.stdout.write('🗑️  Vaciando tablas de negocio...')
+                self._limpiar()
+
+            almacen = Almacen.principal()
+            categorias = self._categorias()
+            clientes = self._crear_en_lotes(
+                '👥 Clientes', Cliente, options['clientes'], self._cliente)
+            proveedores = self._crear_en_lotes(
+                '🏭 Proveedores', Proveedor, options['proveedores'], self._proveedor)
+            productos = self._crear_productos(categorias, options['productos'])
+            self._crear_ordenes(clientes, productos, options['ordenes'])
+            self._crear_pedidos(proveedores, productos, options['pedidos'])
+
+            self.stdout.write('📊 Reconstruyendo inventario...')
+            self._reconstruir_inventario(productos, almacen)
+
+        invalidar_estadisticas_dashboard()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Dataset generado en {time.monotonic() - inicio:.1f} s'))
+
+    # ------------------------------------------------------------------
+    # Preparación
+    # ------------------------------------------------------------------
+
+    def _preparar_muestras(self, semilla):
+        """Textos de Faker generados una vez; las filas los combinan al azar"""
+        fake = Faker('es_ES')
+        fake.seed_instance(semilla)
+        self.empresas = [fake.company() for _ in range(TAMANO_MUESTRAS)]
+        self.personas = [fake.name() for _ in range(TAMANO_MUESTRAS)]
+        self.ciudades = [fake.city().title() for _ in range(TAMANO_MUESTRAS)]
+        self.calles = [fake.street_address() for _ in range(TAMANO_MUESTRAS)]
+        self.frases = [fake.catch_phrase()[:150] for _ in range(TAMANO_MUESTRAS)]
+        self.textos = [fake.text(max_nb_chars=200) for _ in range(TAMANO_MUESTRAS)]
+
+    def _limpiar(self):
+        # DELETE directo: sin signals y sin cargar las filas en memoria
+        with transaction.atomic(), connection.cursor() as cursor:
+            for modelo in TABLAS_LIMPIEZA:
+                cursor.execute(
+                    f'DELETE FROM {connection.ops.quote_name(modelo._meta.db_table)}')
+
+    def _categorias(self):
+        categorias = []
+        for nombre, descripcion in CATEGORIAS:
+            # Mismo nombre normalizado que guarda CategoriaProducto.save
+            categoria, _ = CategoriaProducto.objects.get_or_create(
+                nombre_categoria=nombre.title(), defaults={'descripcion': descripcion})
+            categorias.append(categoria)
+        return categorias
+
+    def _progreso(self, etiqueta, hechos, total, inicio):
+        segundos = max(time.monotonic() - inicio, 0.001)
+        self.stdout.write(
+            f'{etiqueta}: {hechos}/{total} ({hechos / segundos:.0f} filas/s)')
+
+    def _telefono(self):
+        return f'{self.rng.choice("6789")}{self.rng.randint(10000000, 99999999)}'
+
+    def _fecha(self, indice, total):
+        # Fechas crecientes con el índice: el número del documento sigue su fecha
+        return self.hoy - timedelta(days=self.dias - 1 - indice * self.dias // total)
+
+    # ------------------------------------------------------------------
+    # Clientes, proveedores y productos
+    # ------------------------------------------------------------------
+
+    def _cliente(self, n):
+        return Cliente(
+            nombre_comercial=' '.join(self.rng.choice(self.empresas).split()).title(),
+            email=f'cliente{n}.s{self.semilla}@example.com',
+            telefono_oficina=self._telefono(),
+            direccion_fiscal=self.rng.choice(self.calles),
+            ciudad_fiscal=self.rng.choice(self.ciudades),
+            codigo_postal_fiscal=self.rng.randint(35000, 38999),
+            cif=f'C{self.semilla % 100:02d}{n:08d}',
+            activo=self.rng.random() < 0.9,
+        )
+
+    def _proveedor(self, n):
+        return Proveedor(
+            nombre_empresa=' '.join(self.rng.choice(self.empresas).split()).title(),
+            contacto_nombre=self.rng.choice(self.personas),
+            email=f'proveedor{n}.s{self.semilla}@example.com',
+            telefono_oficina=self._telefono(),
+            direccion=self.rng.choice(self.calles),
+            ciudad=self.rng.choice(self.ciudades),
+            codigo_postal=self.rng.randint(35000, 38999),
+            cif=f'P{self.semilla % 100:02d}{n:08d}',
+            condiciones_pago=self.rng.choice(['30 días', '60 días', '90 días', 'Contado']),
+        )
+
+    def _crear_en_lotes(self, etiqueta, modelo, cantidad, construir):
+        """Crea `cantidad` filas de `modelo` por lotes y devuelve sus ids"""
+        ids = []
+        inicio = time.monotonic()
+        for desde in range(0, cantidad, self.lote):
+            objetos = [construir(n) for n in range(desde, min(desde + self.lote, cantidad))]
+            with transaction.atomic():
+                modelo.objects.bulk_create(objetos, batch_size=TAMANO_INSERT)
+            ids.extend(objeto.pk for objeto in objetos)
+            self._progreso(etiqueta, len(ids), cantidad, inicio)
+        return ids
+
+    def _crear_productos(self, categorias, cantidad):
+        """Devuelve {producto_id: (precio_compra, precio_venta, stock_minimo)}"""
+        productos = {}
+        inicio = time.monotonic()
+        for desde in range(0, cantidad, self.lote):
+            lote = []
+            for _ in range(desde, min(desde + self.lote, cantidad)):
+                precio_compra = redondear_importe(Decimal(self.rng.randint(50, 50000)) / 100)
+                margen = Decimal(self.rng.randint(120, 250)) / 100
+                lote.append(Producto(
+                    nombre=' '.join(self.rng.choice(self.frases).split()).title(),
+                    descripcion=self.rng.choice(self.textos),
+                    categoria=self.rng.choice(categorias),
+                    precio_compra=precio_compra,
+                    precio_venta=redondear_importe(precio_compra * margen),
+                    stock_minimo=self.rng.randint(5, 50),
+                    unidad_medida=self.rng.choice(UNIDADES),
+                ))
+
+            # Un bloque de códigos por prefijo, como import_productos
+            por_prefijo = defaultdict(list)
+            for producto in lote:
+                por_prefijo[prefijo_categoria(producto.categoria)].append(producto)
+            with transaction.atomic():
+                for prefijo, grupo in sorted(por_prefijo.items()):
+                    for producto, codigo in zip(grupo, reservar_codigos(prefijo, len(grupo))):
+                        producto.codigo_producto = codigo
+                Producto.objects.bulk_create(lote, batch_size=TAMANO_INSERT)
+
+            for producto in lote:
+                productos[producto.pk] = (
+                    producto.precio_compra, producto.precio_venta, producto.stock_minimo)
+            self._progreso('📦 Productos', len(productos), cantidad, inicio)
+        return productos
+
+    # ------------------------------------------------------------------
+    # Documentos
+    # ------------------------------------------------------------------
+
+    def _lineas(self, productos, indice_precio):
+        """(producto_id, cantidad, precio, igic %, importe sin IGIC, IGIC) de un documento"""
+        lineas = []
+        for producto_id in self.rng.sample(
+                self.producto_ids, min(self.rng.randint(1, self.max_lineas), len(self.producto_ids))):
+            cantidad = self.rng.randint(1, 20)
+            precio = productos[producto_id][indice_precio]
+            igic_porcentaje = self.rng.choice(PORCENTAJES_IGIC)
+            importe = cantidad * precio
+            igic = redondear_importe(importe * igic_porcentaje / 100)
+            lineas.append((producto_id, cantidad, precio, igic_porcentaje, importe, igic))
+        return lineas
+
+    def _numerar(self, documentos, campo, serie, campo_fecha):
+        """Asigna números correlativos por año reservando un bloque por año"""
+        por_anio = defaultdict(list)
+        for documento in documentos:
+            por_anio[getattr(documento, campo_fecha).year].append(documento)
+        for anio, grupo in sorted(por_anio.items()):
+            for documento, numero in zip(grupo, reservar_numeros(serie, len(grupo), anio=anio)):
+                setattr(documento, campo, numero)
+
+    def _crear_ordenes(self, clientes, productos, cantidad):
+        self.producto_ids = list(productos)
+        estados, pesos = zip(*ESTADOS_ORDEN)
+        creadas = 0
+        inicio = time.monotonic()
+        while creadas < cantidad:
+            ordenes, detalles = [], []
+            for indice in range(creadas, min(creadas + self.lote, cantidad)):
+                fecha = self._fecha(indice, cantidad)
+                lineas = self._lineas(productos, 1)
+                subtotal = sum(importe for *_, importe, _ in lineas)
+                impuestos = sum(igic for *_, igic in lineas)
+                orden = OrdenVenta(
+                    cliente_id=self.rng.choice(clientes),
+                    fecha_orden=fecha,
+                    fecha_entrega=fecha + timedelta(days=self.rng.randint(1, 30)),
+                    estado=self.rng.choices(estados, pesos)[0],
+                    subtotal=subtotal,
+                    descuento=Decimal('0'),
+                    impuestos=impuestos,
+                    total=subtotal + impuestos,
+                    metodo_pago=self.rng.choice(METODOS_PAGO),
+                    empleado_creador_id=self.rng.choice(self.empleados),
+                )
+                ordenes.append(orden)
+                detalles.extend(DetalleOrdenVenta(
+                    orden=orden, producto_id=producto_id, cantidad=cantidad_linea,
+                    empleado_creador_id=orden.empleado_creador_id,
+                    precio_unitario=precio, descuento_linea=Decimal('0'),
+                    igic_porcentaje=igic_porcentaje, igic_importe=igic,
+                    subtotal=importe + igic,
+                ) for producto_id, cantidad_linea, precio, igic_porcentaje, importe, igic in lineas)
+
+            with transaction.atomic():
+                self._numerar(ordenes, 'numero_orden', OrdenVenta.SERIE_NUMERACION, 'fecha_orden')
+                OrdenVenta.objects.bulk_create(ordenes, batch_size=TAMANO_INSERT)
+                DetalleOrdenVenta.objects.bulk_create(detalles, batch_size=TAMANO_INSERT)
+
+            creadas += len(ordenes)
+            self._progreso('🛒 Órdenes de venta', creadas, cantidad, inicio)
+
+    def _crear_pedidos(self, proveedores, productos, cantidad):
+        self.producto_ids = list(productos)
+        estados, pesos = zip(*ESTADOS_PEDIDO)
+        creados = 0
+        inicio = time.monotonic()
+        while creados < cantidad:
+            pedidos, detalles = [], []
+            for indice in range(creados, min(creados + self.lote, cantidad)):
+                fecha = self._fecha(indice, cantidad)
+                estado = self.rng.choices(estados, pesos)[0]
+                lineas = self._lineas(productos, 0)
+                subtotal = sum(importe for *_, importe, _ in lineas)
+                impuestos = sum(igic for *_, igic in lineas)
+                pedido = PedidoProveedor(
+                    proveedor_id=self.rng.choice(proveedores),
+                    fecha_pedido=fecha,
+                    fecha_entrega_estimada=fecha + timedelta(days=self.rng.randint(7, 45)),
+                    estado=estado,
+                    subtotal=subtotal,
+                    impuestos=impuestos,
+                    total=subtotal + impuestos,
+                    empleado_creador_id=self.rng.choice(self.empleados),
+                )
+                pedidos.append(pedido)
+                for producto_id, cantidad_linea, precio, igic_porcentaje, importe, igic in lineas:
+                    if estado == 'recibido_completo':
+                        recibida = cantidad_linea
+                    elif estado == 'recibido_parcial':
+                        recibida = self.rng.randint(0, cantidad_linea)
+                    else:
+                        recibida = 0
+                    detalles.append(DetallePedidoProveedor(
+                        pedido=pedido, producto_id=producto_id, cantidad_pedida=cantidad_linea,
+                        empleado_creador_id=pedido.empleado_creador_id,
+                        cantidad_recibida=recibida, precio_unitario=precio,
+                        igic_porcentaje=igic_porcentaje, igic_importe=igic,
+                        subtotal=importe + igic,
+                    ))
+
+            with transaction.atomic():
+                self._numerar(pedidos, 'numero_pedido', PedidoProveedor.SERIE_NUMERACION,
+                              'fecha_pedido')
+                PedidoProveedor.objects.bulk_create(pedidos, batch_size=TAMANO_INSERT)
+                DetallePedidoProveedor.objects.bulk_create(detalles, batch_size=TAMANO_INSERT)
+
+            creados += len(pedidos)
+            self._progreso('📥 Pedidos a proveedores', creados, cantidad, inicio)
+
+    # ------------------------------------------------------------------
+    # Inventario
+    # ------------------------------------------------------------------
+
+    def _reconstruir_inventario(self, productos, almacen):
+        """
+        Saldos finales a partir de los documentos: una consulta agregada por
+        tipo de documento, un INSERT por lotes de inventarios y movimientos y
+        los recálculos completos del total por producto y de la cola.
+        """
+        if not productos:
+            return
+        # Los productos nuevos tienen los ids más altos: solo sus líneas cuentan
+        nuevos = {'producto_id__gte': min(productos)}
+
+        # Mismo efecto por estado que aplican los signals de las órdenes
+        vendidas = [e for e, (actual, _) in EFECTO_ESTADO_ORDEN_VENTA.items() if actual < 0]
+        reservadas = [e for e, (_, reservada) in EFECTO_ESTADO_ORDEN_VENTA.items() if reservada > 0]
+        ventas = {
+            fila['producto_id']: fila for fila in DetalleOrdenVenta.objects.filter(
+                **nuevos).values('producto_id').annotate(
+                vendido=Sum(Case(When(orden__estado__in=vendidas, then='cantidad'),
+                                 default=0, output_field=IntegerField())),
+                reservado=Sum(Case(When(orden__estado__in=reservadas, then='cantidad'),
+                                   default=0, output_field=IntegerField())),
+            )
+        }
+        # Lo que aporta cada línea de pedido (stock_aportado_pedido_proveedor)
+        recibido = dict(DetallePedidoProveedor.objects.filter(**nuevos).values(
+            'producto_id').annotate(total=Sum(Case(
+                When(pedido__estado='recibido_completo', then='cantidad_pedida'),
+                When(pedido__estado='recibido_parcial', then='cantidad_recibida'),
+                default=0, output_field=IntegerField()))).values_list('producto_id', 'total'))
+
+        ids = sorted(productos)
+        for desde in range(0, len(ids), self.lote):
+            inventarios, movimientos = [], []
+            for producto_id in ids[desde:desde + self.lote]:
+                venta = ventas.get(producto_id, {})
+                vendido = venta.get('vendido', 0)
+                reservado = venta.get('reservado', 0)
+                entrada = recibido.get(producto_id, 0)
+                # Stock inicial suficiente para lo vendido y reservado, más
+                # un libre aleatorio: parte de los productos queda bajo mínimo
+                inicial = vendido + reservado + self.rng.randint(0, productos[producto_id][2] * 3)
+
+                inventarios.append(Inventario(
+                    producto_id=producto_id, almacen=almacen,
+                    cantidad_actual=inicial + entrada - vendido, cantidad_reservada=reservado,
+                    ubicacion_almacen=self.rng.choice(UBICACIONES)))
+                movimientos.append(MovimientoStock(
+                    producto_id=producto_id, almacen=almacen,
+                    delta_actual=inicial, tipo_documento='ajuste'))
+                if entrada:
+                    movimientos.append(MovimientoStock(
+                        producto_id=producto_id, almacen=almacen,
+                        delta_actual=entrada, tipo_documento='pedido_proveedor'))
+                if vendido or reservado:
+                    movimientos.append(MovimientoStock(
+                        producto_id=producto_id, almacen=almacen, delta_actual=-vendido,
+                        delta_reservada=reservado, tipo_documento='orden_venta'))
+
+            with transaction.atomic():
+                Inventario.objects.bulk_create(inventarios, batch_size=TAMANO_INSERT)
+                MovimientoStock.objects.bulk_create(movimientos, batch_size=TAMANO_INSERT)
+                StockProducto.objects.bulk_create(
+                    [StockProducto(producto_id=inventario.producto_id) for inventario in inventarios],
+                    batch_size=TAMANO_INSERT, ignore_conflicts=True)
+
+        with transaction.atomic():
+            recalcular_stock_productos()
+            actualizar_cola_reposicion()
@@ -10,7 +10,8 @@ from datetime import timedelta
 
 # Importa tus modelos
 from clientes.models import Cliente
-from inventario.models import CategoriaProducto, Producto, Inventario
+from core.models import ContadorDocumento
+from inventario.models import CategoriaProducto, ContadorCodigo, Producto, Inventario
 from pedidos.models import OrdenVenta, DetalleOrdenVenta, PedidoProveedor, DetallePedidoProveedor
 from proveedores.models import Proveedor
 
@@ -105,6 +106,9 @@ class Command(BaseCommand):
         CategoriaProducto.objects.all().delete()
         Cliente.objects.all().delete()
         Proveedor.objects.all().delete()
+        # La numeración de documentos y códigos vuelve a empezar
+        ContadorDocumento.objects.all().delete()
+        ContadorCodigo.objects.all().delete()
         # Borra solo el usuario demo
         User.objects.filter(username='demo').delete()
 
@@ -270,7 +274,6 @@ class Command(BaseCommand):
             fecha_entrega = fecha_orden + timedelta(days=random.randint(1, 30))
 
             orden = OrdenVenta.objects.create(
-                numero_orden=f'OV-{timezone.now().year}-{i+1:05d}',
                 cliente=random.choice(clientes),
                 fecha_orden=fecha_orden,
                 fecha_entrega=fecha_entrega,
@@ -344,7 +347,6 @@ class Command(BaseCommand):
                 timedelta(days=random.randint(7, 45))
 
             pedido = PedidoProveedor.objects.create(
-                numero_pedido=f'PP-{timezone.now().year}-{i+1:05d}',
                 proveedor=random.choice(proveedores),
                 fecha_pedido=fecha_pedido,
                 fecha_entrega_estimada=fecha_entrega,
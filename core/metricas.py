@@ -0,0 +1,68 @@
+"""
+Métricas Prometheus de la aplicación.
+
+Con gunicorn cada worker es un proceso distinto. Si PROMETHEUS_MULTIPROC_DIR
+está definido (docker-compose), prometheus_client guarda los valores de
+cada proceso en ficheros mmap de ese directorio y /metrics los suma todos
+(el directorio se vacía al arrancar el contenedor). Los ficheros de los
+workers reciclados se siguen sumando, que es lo correcto para contadores e
+histogramas. Sin la variable (runserver, tests) se usa el registro del proceso.
+"""
+
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram,
+    generate_latest, multiprocess)
+
+LATENCIA_PETICIONES = Histogram(
+    'mystock_peticion_segundos',
+    'Duración de las peticiones por vista',
+    ['vista', 'metodo'],
+)
+
+CONSULTAS_PETICIONES = Histogram(
+    'mystock_peticion_consultas',
+    'Consultas SQL por petición',
+    ['vista'],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+)
+
+ESPERA_BLOQUEO_INVENTARIO = Histogram(
+    'mystock_inventario_bloqueo_segundos',
+    'Espera para bloquear el stock de los productos de una operación',
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+# Movimientos y unidades de reserva: operacion = reserva | liberacion
+RESERVAS_STOCK = Counter(
+    'mystock_stock_reservas',
+    'Movimientos de stock que reservan o liberan unidades',
+    ['operacion'],
+)
+
+UNIDADES_RESERVADAS = Counter(
+    'mystock_stock_reservas_unidades',
+    'Unidades reservadas o liberadas',
+    ['operacion'],
+)
+
+
+def contar_reservas(movimientos):
+    """Suma a los contadores de reservas los movimientos con delta_reservada"""
+    reservas = [m.delta_reservada for m in movimientos if m.delta_reservada > 0]
+    liberaciones = [-m.delta_reservada for m in movimientos if m.delta_reservada < 0]
+    for operacion, unidades in (('reserva', reservas), ('liberacion', liberaciones)):
+        if unidades:
+            RESERVAS_STOCK.labels(operacion).inc(len(unidades))
+            UNIDADES_RESERVADAS.labels(operacion).inc(sum(unidades))
+
+
+def exponer_metricas():
+    """(contenido, content_type) de todas las métricas en formato de texto de Prometheus"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+    else:
+        registro = REGISTRY
+    return generate_latest(registro), CONTENT_TYPE_LATEST
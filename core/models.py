@@ -1,3 +1,137 @@
 from django.db import models
 
-# Create your models here.
+
+class CamposRastreadosMixin:
+    """
+    Guarda los valores originales de los campos de `campos_rastreados` al
+    cargar la instancia desde la base de datos (from_db), para que los
+    signals sepan qué cambió sin volver a consultar la fila.
+
+    Para las claves foráneas se guarda el id (producto -> producto_id),
+    así el valor anterior nunca obliga a cargar el objeto relacionado.
+    """
+
+    campos_rastreados = ()
+    _valores_originales = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._guardar_originales()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self._guardar_originales(fields)
+
+    def save(self, *args, **kwargs):
+        # Instancias con pk que no vienen de la BD (p. ej. Modelo(pk=1)):
+        # se leen los originales una única vez antes de escribir
+        if self._valores_originales is None and self.pk is not None:
+            self._cargar_originales_desde_bd()
+        super().save(*args, **kwargs)
+        self._guardar_originales()
+
+    def _attname(self, campo):
+        return self._meta.get_field(campo).attname
+
+    def _guardar_originales(self, campos=None):
+        """
+        Toma como originales los valores actuales de los campos rastreados.
+        Con `campos` (un refresh_from_db parcial) solo los recargados: el
+        resto puede tener cambios sin guardar que no deben darse por originales.
+        """
+        # Los campos diferidos (.only/.defer) no están en __dict__ y no se rastrean
+        valores = {
+            campo: self.__dict__[self._attname(campo)]
+            for campo in self.campos_rastreados
+            if self._attname(campo) in self.__dict__
+        }
+        if campos is None or self._valores_originales is None:
+            self._valores_originales = valores
+            return
+
+        recargados = set(campos)
+        for campo, valor in valores.items():
+            if campo in recargados or self._attname(campo) in recargados:
+                self._valores_originales[campo] = valor
+
+    def _cargar_originales_desde_bd(self):
+        attnames = [self._attname(campo) for campo in self.campos_rastreados]
+        fila = type(self)._base_manager.using(self._state.db or 'default').filter(
+            pk=self.pk).values(*attnames).first()
+        self._valores_originales = {
+            campo: fila[self._attname(campo)] for campo in self.campos_rastreados
+        } if fila else {}
+
+    def previous(self, campo):
+        """Valor que tenía el campo en la base de datos (None si es una instancia nueva)"""
+        return (self._valores_originales or {}).get(campo)
+
+    def has_changed(self, campo):
+        """Indica si el campo difiere del valor guardado en la base de datos"""
+        if not self._valores_originales or campo not in self._valores_originales:
+            return True
+        return self._valores_originales[campo] != getattr(self, self._attname(campo))
+
+
+class ContadorDocumento(models.Model):
+    """
+    Último número asignado a cada serie de documentos (pedidos, órdenes)
+    y año. La fila se bloquea al incrementarla dentro de la misma
+    transacción que guarda el documento (ver core.numeracion).
+    """
+
+    serie = models.CharField(max_length=10, verbose_name="Serie")
+    anio = models.PositiveSmallIntegerField(verbose_name="Año")
+    ultimo_numero = models.PositiveIntegerField(
+        default=0, verbose_name="Último Número")
+    actualizado_el = models.DateTimeField(
+        auto_now=True, verbose_name="Actualizado el")
+
+    class Meta:
+        verbose_name = 'Contador de Documentos'
+        verbose_name_plural = 'Contadores de Documentos'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['serie', 'anio'], name='contador_documento_serie_anio_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.serie}-{self.anio}: {self.ultimo_numero}"
+
+
+class ConsultaLenta(models.Model):
+    """
+    Consultas registradas por core.consultas_lentas, agrupadas por huella
+    (SQL normalizado, sin valores) y vista. Los contadores se acumulan en
+    cada volcado del registro en memoria.
+    """
+
+    huella = models.CharField(max_length=32, verbose_name="Huella")
+    vista = models.CharField(max_length=200, blank=True, verbose_name="Vista")
+    sql = models.TextField(verbose_name="SQL Normalizado")
+    pila = models.TextField(blank=True, verbose_name="Pila de Llamadas")
+    ejecuciones = models.PositiveBigIntegerField(default=0, verbose_name="Ejecuciones")
+    milisegundos_total = models.FloatField(default=0, verbose_name="Tiempo Total (ms)")
+    milisegundos_maximo = models.FloatField(default=0, verbose_name="Tiempo Máximo (ms)")
+    primera_vez = models.DateTimeField(auto_now_add=True, verbose_name="Primera Vez")
+    ultima_vez = models.DateTimeField(verbose_name="Última Vez")
+
+    class Meta:
+        verbose_name = 'Consulta Lenta'
+        verbose_name_plural = 'Consultas Lentas'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['huella', 'vista'], name='consulta_lenta_huella_vista_unica'),
+        ]
+        indexes = [
+            models.Index(fields=['-milisegundos_total'], name='consulta_lenta_total_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.vista or '-'}: {self.sql[:80]}"
+
+    @property
+    def milisegundos_medio(self):
+        return self.milisegundos_total / self.ejecuciones if self.ejecuciones else 0
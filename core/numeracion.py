@@ -0,0 +1,70 @@
+"""
+Numeración correlativa por serie y año de los documentos, p. ej.
+PED-2026-000123.
+
+Cada número sale de incrementar la fila (serie, año) de ContadorDocumento
+dentro de la transacción que guarda el documento: la fila queda bloqueada
+hasta el COMMIT, así que dos altas simultáneas no pueden obtener el mismo
+número, y si la transacción se deshace el contador vuelve atrás con ella
+(no quedan huecos). Las cargas masivas reservan un bloque de una vez.
+
+El año es el de la fecha del documento. Los números de un año tienen
+todos la misma longitud, así que el orden alfabético coincide con el de
+creación y las búsquedas por prefijo (PED-2026-) o por rango son
+recorridos del índice; por eso una serie no puede pasar de MAXIMO_NUMERO
+en un año.
+"""
+
+from django.db import connections
+from django.utils import timezone
+
+from .models import ContadorDocumento
+
+DIGITOS_NUMERO = 6
+MAXIMO_NUMERO = 10 ** DIGITOS_NUMERO - 1
+
+
+class NumeracionAgotada(ValueError):
+    """La serie ha llegado a MAXIMO_NUMERO en el año"""
+
+
+def formatear_numero(serie, anio, numero):
+    return f"{serie}-{anio}-{numero:0{DIGITOS_NUMERO}d}"
+
+
+def reservar_numeros(serie, cantidad=1, anio=None, using='default'):
+    """
+    Reserva `cantidad` números consecutivos de `serie` para `anio` (por
+    defecto el actual). Debe llamarse en la transacción que guarda los
+    documentos para que un fallo no deje huecos en la numeración; si la
+    serie se agota se lanza NumeracionAgotada y esa transacción, al
+    deshacerse, devuelve el contador a su valor.
+    """
+    anio = anio or timezone.localdate().year
+    connection = connections[using]
+    tabla = connection.ops.quote_name(ContadorDocumento._meta.db_table)
+    # Un único upsert (PostgreSQL y SQLite >= 3.35): crea el contador la
+    # primera vez o lo incrementa, deja la fila bloqueada y devuelve el valor
+    sql = (
+        f'INSERT INTO {tabla} (serie, anio, ultimo_numero, actualizado_el) '
+        'VALUES (%s, %s, %s, %s) '
+        'ON CONFLICT (serie, anio) DO UPDATE SET '
+        f'ultimo_numero = {tabla}.ultimo_numero + EXCLUDED.ultimo_numero, '
+        'actualizado_el = EXCLUDED.actualizado_el '
+        'RETURNING ultimo_numero'
+    )
+    ahora = connection.ops.adapt_datetimefield_value(timezone.now())
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [serie, anio, cantidad, ahora])
+        fin = cursor.fetchone()[0]
+
+    if fin > MAXIMO_NUMERO:
+        raise NumeracionAgotada(
+            f'La serie {serie} no admite más de {MAXIMO_NUMERO} números en {anio}')
+    return [formatear_numero(serie, anio, numero)
+            for numero in range(fin - cantidad + 1, fin + 1)]
+
+
+def siguiente_numero(serie, anio=None, using='default'):
+    """Número siguiente de `serie`, p. ej. PED-2026-000124"""
+    return reservar_numeros(serie, 1, anio, using)[0]
@@ -0,0 +1,176 @@
+"""
+Paginación keyset (seek) para los listados.
+
+En lugar de OFFSET, cada página se pide con un cursor que contiene los
+valores de ordenación de la última (o primera) fila mostrada:
+WHERE (fecha, id) < (:fecha, :id) ORDER BY fecha DESC, id DESC LIMIT n.
+El coste de una página es el mismo en la primera que en la número mil,
+siempre que exista un índice sobre las columnas de ordenación.
+"""
+
+import base64
+import json
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+# Filas por página por defecto en los listados
+POR_PAGINA = 25
+
+PARAMETRO_CURSOR = 'cursor'
+
+
+class CursorInvalido(ValueError):
+    """El cursor recibido no se puede decodificar para esta ordenación"""
+
+
+class PaginaKeyset:
+    """Página de resultados con los enlaces a la siguiente y la anterior"""
+
+    def __init__(self, objetos, cursor_siguiente, cursor_anterior, parametros):
+        self.objetos = objetos
+        self.cursor_siguiente = cursor_siguiente
+        self.cursor_anterior = cursor_anterior
+        self._parametros = parametros
+
+    def __iter__(self):
+        return iter(self.objetos)
+
+    def __len__(self):
+        return len(self.objetos)
+
+    @property
+    def hay_siguiente(self):
+        return self.cursor_siguiente is not None
+
+    @property
+    def hay_anterior(self):
+        return self.cursor_anterior is not None
+
+    @property
+    def url_siguiente(self):
+        return self._querystring(self.cursor_siguiente)
+
+    @property
+    def url_anterior(self):
+        return self._querystring(self.cursor_anterior)
+
+    def _querystring(self, cursor):
+        # Conserva los filtros actuales (estado, cliente, búsqueda...)
+        if cursor is None:
+            return None
+        parametros = self._parametros.copy()
+        parametros[PARAMETRO_CURSOR] = cursor
+        return f'?{parametros.urlencode()}'
+
+
+def _campos_orden(orden):
+    """('-fecha_orden',) -> [('fecha_orden', True), ('pk', True)]"""
+    campos = [(campo.lstrip('-'), campo.startswith('-')) for campo in orden]
+    if campos[-1][0] not in ('pk', 'id'):
+        # El pk desempata filas con el mismo valor y hace el orden total
+        campos.append(('pk', campos[0][1]))
+    return campos
+
+
+def _codificar_cursor(direccion, valores):
+    datos = json.dumps([direccion, valores], default=str)
+    return base64.urlsafe_b64encode(datos.encode()).decode().rstrip('=')
+
+
+def _valor_campo(queryset, campo, valor):
+    modelo = queryset.model
+    if campo == 'pk':
+        return modelo._meta.pk.to_python(valor)
+    try:
+        return modelo._meta.get_field(campo).to_python(valor)
+    except FieldDoesNotExist:
+        pass
+    # Anotaciones (p. ej. la relevancia de una búsqueda): se convierten con
+    # su output_field, que debe ser exacto (Decimal) para que la igualdad
+    # del desempate encuentre la fila del borde de página
+    anotacion = queryset.query.annotations.get(campo)
+    if anotacion is None:
+        raise CursorInvalido(campo)
+    return anotacion.output_field.to_python(valor)
+
+
+def _decodificar_cursor(cursor, queryset, campos):
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        direccion, valores = json.loads(
+            base64.urlsafe_b64decode(cursor + relleno).decode())
+        if direccion not in ('s', 'a') or len(valores) != len(campos):
+            raise CursorInvalido(cursor)
+        return direccion, [
+            _valor_campo(queryset, campo, valor)
+            for (campo, _), valor in zip(campos, valores)
+        ]
+    except (ValueError, TypeError, ValidationError) as e:
+        raise CursorInvalido(cursor) from e
+
+
+def _filtro_posterior(campos, valores, hacia_atras):
+    """
+    (a, b) después de (va, vb) en el orden dado:
+    a < va OR (a = va AND b < vb), con > en los campos ascendentes.
+    """
+    filtro = Q()
+    for i, (campo, descendente) in enumerate(campos):
+        menor = descendente != hacia_atras
+        condicion = Q(**{f'{campo}__{"lt" if menor else "gt"}': valores[i]})
+        for (campo_previo, _), valor_previo in zip(campos[:i], valores[:i]):
+            condicion &= Q(**{campo_previo: valor_previo})
+        filtro |= condicion
+    return filtro
+
+
+def _valores(objeto, campos):
+    return [getattr(objeto, campo) for campo, _ in campos]
+
+
+def paginar_keyset(request, queryset, orden, por_pagina=POR_PAGINA):
+    """
+    Devuelve la página de `queryset` indicada por el parámetro ?cursor=.
+    `orden` son los campos de ordenación del listado, p. ej. ('-fecha_orden',),
+    que pueden incluir anotaciones numéricas exactas (enteros o Decimal, no
+    float); deben ser NOT NULL. Un cursor inválido muestra la primera página.
+    """
+    campos = _campos_orden(orden)
+    cursor = request.GET.get(PARAMETRO_CURSOR)
+    parametros = request.GET.copy()
+
+    direccion, valores = None, None
+    if cursor:
+        try:
+            direccion, valores = _decodificar_cursor(
+                cursor, queryset, campos)
+        except CursorInvalido:
+            direccion, valores = None, None
+
+    hacia_atras = direccion == 'a'
+    ordenacion = [
+        f'{"-" if descendente != hacia_atras else ""}{campo}'
+        for campo, descendente in campos
+    ]
+    consulta = queryset.order_by(*ordenacion)
+    if valores is not None:
+        consulta = consulta.filter(
+            _filtro_posterior(campos, valores, hacia_atras))
+
+    # Una fila de más indica si hay otra página en esa dirección
+    objetos = list(consulta[:por_pagina + 1])
+    hay_mas = len(objetos) > por_pagina
+    objetos = objetos[:por_pagina]
+    if hacia_atras:
+        objetos.reverse()
+
+    cursor_siguiente = cursor_anterior = None
+    if objetos:
+        if hay_mas or hacia_atras:
+            cursor_siguiente = _codificar_cursor(
+                's', _valores(objetos[-1], campos))
+        if (hay_mas and hacia_atras) or direccion == 's':
+            cursor_anterior = _codificar_cursor(
+                'a', _valores(objetos[0], campos))
+
+    return PaginaKeyset(objetos, cursor_siguiente, cursor_anterior, parametros)
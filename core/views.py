@@ -1,3 +1,30 @@
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied
 from django.shortcuts import render
 
-# Create your views here.
+from .consultas_lentas import registro
+from .models import ConsultaLenta
+
+# Grupos mostrados en la página de consultas lentas
+LIMITE_CONSULTAS_LENTAS = 50
+
+
+@login_required
+def consultas_lentas(request):
+    """Huellas con más tiempo total acumulado, opcionalmente de una vista (solo staff)"""
+    if not request.user.is_staff:
+        raise PermissionDenied
+
+    # Lo pendiente en memoria de este proceso se vuelca antes de mostrar
+    registro.volcar(forzar=True)
+
+    consultas = ConsultaLenta.objects.order_by('-milisegundos_total')
+    vista = request.GET.get('vista', '').strip()
+    if vista:
+        consultas = consultas.filter(vista=vista)
+
+    context = {
+        'consultas': consultas[:LIMITE_CONSULTAS_LENTAS],
+        'vista': vista,
+    }
+    return render(request, 'core/consultas_lentas.html', context)
@@ -1,6 +1,10 @@
 from django.contrib import admin
+from django.db.models import Count
 from django.utils.html import format_html
-from .models import CategoriaProducto, Producto, Inventario
+from core.exportacion import exportar_csv
+from .models import (
+    Almacen, CategoriaProducto, Producto, Inventario, MovimientoStock, ReposicionPendiente)
+from .services import registrar_movimientos
 
 
 @admin.register(CategoriaProducto)
@@ -21,10 +25,15 @@ class CategoriaProductoAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            num_productos=Count('productos'))
+
     def total_productos(self, obj):
         """Muestra el total de productos en esta categoría"""
-        return obj.productos.count()
+        return obj.num_productos
     total_productos.short_description = 'Total Productos'
+    total_productos.admin_order_field = 'num_productos'
 
 
 @admin.register(Producto)
@@ -103,48 +112,61 @@ class ProductoAdmin(admin.ModelAdmin):
             )
     margen_ganancia_detalle.short_description = 'Margen de Ganancia'
 
+    def get_queryset(self, request):
+        # Stock anotado en la consulta del listado (sin una consulta por fila)
+        return super().get_queryset(request).select_related('categoria').con_stock()
+
     def stock_actual(self, obj):
         """Muestra el stock actual desde el inventario"""
-        try:
-            inventario = obj.inventarios.first()
-            if inventario:
-                return inventario.cantidad_actual
-            return 0
-        except:
-            return 0
+        return obj.cantidad_actual
     stock_actual.short_description = 'Stock Actual'
+    stock_actual.admin_order_field = 'cantidad_actual'
 
     def estado_stock(self, obj):
         """Indica el estado del stock basado en el mínimo"""
-        try:
-            inventario = obj.inventarios.first()
-            if inventario:
-                stock_minimo = obj.stock_minimo or 0
-                if inventario.cantidad_actual <= stock_minimo:
-                    return format_html(
-                        '<span style="color: red; font-weight: bold;">⚠️ Bajo</span>'
-                    )
-                elif inventario.cantidad_actual <= stock_minimo * 1.5:
-                    return format_html(
-                        '<span style="color: orange;">⚡ Medio</span>'
-                    )
-                else:
-                    return format_html(
-                        '<span style="color: green;">✅ Bueno</span>'
-                    )
+        if not obj.tiene_inventario:
             return format_html('<span style="color: gray;">Sin inventario</span>')
-        except Exception:
-            return format_html('<span style="color: gray;">Error</span>')
+        stock_minimo = obj.stock_minimo or 0
+        if obj.stock_bajo:
+            return format_html(
+                '<span style="color: red; font-weight: bold;">⚠️ Bajo</span>'
+            )
+        elif obj.cantidad_disponible <= stock_minimo * 1.5:
+            return format_html(
+                '<span style="color: orange;">⚡ Medio</span>'
+            )
+        else:
+            return format_html(
+                '<span style="color: green;">✅ Bueno</span>'
+            )
     estado_stock.short_description = 'Estado Stock'
 
 
+@admin.register(Almacen)
+class AlmacenAdmin(admin.ModelAdmin):
+    list_display = ('codigo', 'nombre', 'activo', 'total_inventarios', 'creado_el')
+    list_filter = ('activo',)
+    search_fields = ('codigo', 'nombre', 'direccion')
+    readonly_fields = ('creado_el', 'actualizado_el')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            num_inventarios=Count('inventarios'))
+
+    def total_inventarios(self, obj):
+        """Productos con saldo en este almacén"""
+        return obj.num_inventarios
+    total_inventarios.short_description = 'Productos'
+    total_inventarios.admin_order_field = 'num_inventarios'
+
+
 @admin.register(Inventario)
 class InventarioAdmin(admin.ModelAdmin):
-    list_display = ('producto', 'cantidad_actual', 'cantidad_reservada',
+    list_display = ('producto', 'almacen', 'cantidad_actual', 'cantidad_reservada',
                     'cantidad_disponible', 'estado_stock', 'ubicacion_almacen',
                     'fecha_ultimo_movimiento')
     list_filter = (
-        'fecha_ultimo_movimiento', 'creado_el', 'producto__categoria'
+        'almacen', 'fecha_ultimo_movimiento', 'creado_el', 'producto__categoria'
     )
     search_fields = (
         'producto__nombre', 'producto__codigo_producto', 'ubicacion_almacen'
@@ -155,6 +177,7 @@ class InventarioAdmin(admin.ModelAdmin):
     list_editable = (
         'cantidad_actual', 'cantidad_reservada', 'ubicacion_almacen'
     )
+    actions = [exportar_csv]
 
     fieldsets = (
         ('Producto', {
@@ -164,7 +187,7 @@ class InventarioAdmin(admin.ModelAdmin):
             'fields': ('cantidad_actual', 'cantidad_reservada', 'cantidad_disponible_detalle')
         }),
         ('Almacén', {
-            'fields': ('ubicacion_almacen',)
+            'fields': ('almacen', 'ubicacion_almacen')
         }),
         ('Información de Sistema', {
             'fields': ('fecha_ultimo_movimiento', 'creado_el', 'actualizado_el'),
@@ -195,7 +218,7 @@ class InventarioAdmin(admin.ModelAdmin):
             return format_html(
                 '<span style="color: red; font-weight: bold;">🔴 Crítico</span>'
             )
-        elif obj.cantidad_actual <= stock_minimo * 1.5:
+        elif obj.cantidad_disponible <= stock_minimo * 1.5:
             return format_html(
                 '<span style="color: orange; font-weight: bold;">🟡 Bajo</span>'
             )
@@ -208,7 +231,72 @@ class InventarioAdmin(admin.ModelAdmin):
     # Filtros personalizados en la barra lateral
     def get_queryset(self, request):
         queryset = super().get_queryset(request)
-        return queryset.select_related('producto', 'producto__categoria')
+        return queryset.select_related('producto', 'producto__categoria', 'almacen')
+
+    def save_model(self, request, obj, form, change):
+        """Los cambios de cantidades se registran como ajuste en el libro de movimientos"""
+        if not change:
+            super().save_model(request, obj, form, change)
+            return
+
+        delta_actual = obj.cantidad_actual - \
+            form.initial.get('cantidad_actual', obj.cantidad_actual)
+        delta_reservada = obj.cantidad_reservada - \
+            form.initial.get('cantidad_reservada', obj.cantidad_reservada)
+
+        # Las cantidades no se escriben directamente para no pisar otros movimientos
+        obj.save(update_fields=['producto', 'almacen', 'ubicacion_almacen',
+                 'fecha_ultimo_movimiento', 'actualizado_el'])
+
+        registrar_movimientos([MovimientoStock(
+            producto_id=obj.producto_id,
+            almacen_id=obj.almacen_id,
+            delta_actual=delta_actual,
+            delta_reservada=delta_reservada,
+            tipo_documento='ajuste',
+        )])
+        obj.refresh_from_db(fields=['cantidad_actual', 'cantidad_reservada'])
+
+
+@admin.register(MovimientoStock)
+class MovimientoStockAdmin(admin.ModelAdmin):
+    list_display = ('producto', 'almacen', 'delta_actual', 'delta_reservada',
+                    'tipo_documento', 'documento_id', 'creado_el')
+    list_filter = ('tipo_documento', 'almacen', 'creado_el')
+    search_fields = ('producto__nombre', 'producto__codigo_producto')
+    list_select_related = ('producto', 'almacen')
+    date_hierarchy = 'creado_el'
+    list_per_page = 50
+
+    # El libro de movimientos es de solo inserción
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ReposicionPendiente)
+class ReposicionPendienteAdmin(admin.ModelAdmin):
+    list_display = ('producto', 'cantidad_disponible', 'stock_minimo',
+                    'faltante', 'detectado_el')
+    search_fields = ('producto__nombre', 'producto__codigo_producto')
+    list_select_related = ('producto',)
+    ordering = ('-faltante',)
+    list_per_page = 50
+
+    # La cola la mantiene el servicio de movimientos
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
 
 
 # Configuración adicional del admin
@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class InventarioConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'inventario'
+
+    def ready(self):
+        import inventario.signals
+        from inventario.services import inicializar_almacenes
+        post_migrate.connect(inicializar_almacenes, sender=self)
@@ -0,0 +1,90 @@
+"""
+Códigos de producto: prefijo de la categoría (dos letras) y número
+correlativo con cuatro dígitos como mínimo, p. ej. EL0001.
+
+Los números salen de ContadorCodigo, una fila por prefijo que se
+incrementa con un UPDATE atómico: pedir un código (o un bloque de códigos
+para una importación) es una sola fila bloqueada, sin recorrer los
+productos existentes. Como en una secuencia, un código reservado en una
+transacción que luego falla no se reutiliza.
+"""
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from .models import ContadorCodigo, Producto
+
+DIGITOS_CODIGO = 4
+LONGITUD_PREFIJO = 2
+
+
+def prefijo_categoria(categoria):
+    """Prefijo de los códigos de una categoría (sus dos primeras letras)"""
+    return categoria.nombre_categoria[:LONGITUD_PREFIJO].upper()
+
+
+def formatear_codigo(prefijo, numero):
+    return f"{prefijo}{numero:0{DIGITOS_CODIGO}d}"
+
+
+def ultimo_numero(prefijo):
+    """
+    Mayor número usado con `prefijo` en los productos existentes. Se compara
+    numéricamente porque a partir de 9999 el orden alfabético de los códigos
+    ya no sirve (EL10000 < EL9999). Solo se usa para iniciar el contador.
+    """
+    numeros = (
+        codigo[len(prefijo):]
+        for codigo in Producto.objects.filter(
+            codigo_producto__startswith=prefijo
+        ).values_list('codigo_producto', flat=True).iterator(chunk_size=5000)
+    )
+    return max((int(numero) for numero in numeros if numero.isdigit()), default=0)
+
+
+def _actualizar_contador(prefijo, valor):
+    """
+    Aplica `valor` (una expresión sobre ultimo_numero) al contador de
+    `prefijo`, creándolo antes si aún no existe. El UPDATE deja la fila
+    bloqueada hasta el final de la transacción.
+    """
+    contador = ContadorCodigo.objects.filter(prefijo=prefijo)
+    if not contador.update(ultimo_numero=valor):
+        ContadorCodigo.objects.bulk_create(
+            [ContadorCodigo(prefijo=prefijo, ultimo_numero=ultimo_numero(prefijo))],
+            ignore_conflicts=True)
+        contador.update(ultimo_numero=valor)
+
+
+def reservar_codigos(prefijo, cantidad=1):
+    """Reserva `cantidad` códigos consecutivos para `prefijo` y los devuelve"""
+    with transaction.atomic():
+        _actualizar_contador(prefijo, F('ultimo_numero') + cantidad)
+        fin = ContadorCodigo.objects.values_list(
+            'ultimo_numero', flat=True).get(prefijo=prefijo)
+
+    return [formatear_codigo(prefijo, numero)
+            for numero in range(fin - cantidad + 1, fin + 1)]
+
+
+def siguiente_codigo(prefijo):
+    """Código siguiente para `prefijo`, p. ej. EL0042"""
+    return reservar_codigos(prefijo)[0]
+
+
+def registrar_codigos(codigos):
+    """
+    Avanza los contadores para no repetir códigos puestos a mano
+    (una actualización por prefijo, con el mayor número de cada uno)
+    """
+    maximos = {}
+    for codigo in codigos:
+        prefijo, numero = codigo[:LONGITUD_PREFIJO], codigo[LONGITUD_PREFIJO:]
+        if numero.isdigit():
+            maximos[prefijo] = max(maximos.get(prefijo, 0), int(numero))
+
+    with transaction.atomic():
+        # Orden fijo de bloqueo entre importaciones simultáneas
+        for prefijo, numero in sorted(maximos.items()):
+            _actualizar_contador(prefijo, Greatest(F('ultimo_numero'), numero))
@@ -0,0 +1,277 @@
+import csv
+import json
+import time
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from inventario.codigos import prefijo_categoria, registrar_codigos, reservar_codigos
+from inventario.models import (
+    Almacen, CategoriaProducto, Inventario, MovimientoStock, Producto, StockProducto)
+from inventario.services import actualizar_cola_reposicion
+
+# Filas leídas y escritas por transacción
+TAMANO_LOTE = 5000
+
+# Filas por sentencia INSERT
+TAMANO_INSERT = 1000
+
+# Errores de fila que se muestran (el resto solo se cuentan)
+MAXIMO_ERRORES_MOSTRADOS = 20
+
+# Mayor valor de una columna integer de PostgreSQL
+MAXIMO_ENTERO = 2_147_483_647
+
+
+def _normalizar(texto):
+    """Misma normalización que Producto.save y CategoriaProducto.save"""
+    return ' '.join((texto or '').split()).title()
+
+
+def _decimal(valor, campo):
+    """Importe que cabe en el DecimalField `campo` de Producto"""
+    try:
+        importe = Decimal(str(valor or 0).strip().replace(',', '.'))
+    except InvalidOperation:
+        raise ValueError(f'{campo} no es un número válido: {valor!r}')
+    if not importe.is_finite():
+        raise ValueError(f'{campo} no es un número válido: {valor!r}')
+    if importe < 0:
+        raise ValueError(f'{campo} no puede ser negativo')
+
+    # Lo que no cabe en la columna falla en el INSERT y anula todo el lote
+    definicion = Producto._meta.get_field(campo)
+    _, digitos, exponente = importe.normalize().as_tuple()
+    if -exponente > definicion.decimal_places:
+        raise ValueError(
+            f'{campo} admite como mucho {definicion.decimal_places} decimales')
+    if len(digitos) + exponente > definicion.max_digits - definicion.decimal_places:
+        raise ValueError(f'{campo} es demasiado grande: {valor!r}')
+    return importe
+
+
+def _entero(valor, campo):
+    try:
+        numero = int(str(valor or 0).strip())
+    except ValueError:
+        raise ValueError(f'{campo} no es un entero válido: {valor!r}')
+    if numero < 0:
+        raise ValueError(f'{campo} no puede ser negativo')
+    if numero > MAXIMO_ENTERO:
+        raise ValueError(f'{campo} es demasiado grande: {valor!r}')
+    return numero
+
+
+def _texto(valor, campo):
+    """Texto que cabe en el CharField `campo` de Producto"""
+    longitud = Producto._meta.get_field(campo).max_length
+    if valor and len(str(valor)) > longitud:
+        raise ValueError(f'{campo} supera los {longitud} caracteres')
+    return valor
+
+
+class Command(BaseCommand):
+    help = ('Importa productos desde un CSV o JSONL de cualquier tamaño, por '
+            'lotes, con su inventario inicial y códigos asignados por categoría. '
+            'Columnas: nombre, categoria, descripcion, precio_compra, '
+            'precio_venta, stock_minimo, unidad_medida, cantidad y, opcional, '
+            'codigo_producto')
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del archivo .csv o .jsonl')
+        parser.add_argument(
+            '--formato',
+            choices=['csv', 'jsonl'],
+            help='Formato del archivo (por defecto, según su extensión)'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=TAMANO_LOTE,
+            help=f'Filas por transacción (default: {TAMANO_LOTE})'
+        )
+        parser.add_argument(
+            '--almacen',
+            help='Código del almacén del stock inicial (default: el principal)'
+        )
+        parser.add_argument(
+            '--crear-categorias',
+            action='store_true',
+            help='Crea las categorías que no existan en lugar de rechazar la fila'
+        )
+        parser.add_argument(
+            '--delimitador',
+            default=',',
+            help='Separador de columnas del CSV (default: ,)'
+        )
+
+    def handle(self, *args, **options):
+        ruta = Path(options['archivo'])
+        if not ruta.exists():
+            raise CommandError(f'No existe el archivo {ruta}')
+        formato = options['formato'] or (
+            'jsonl' if ruta.suffix.lower() in ('.jsonl', '.ndjson') else 'csv')
+        tamano_lote = max(options['lote'], 1)
+
+        self.almacen = self._obtener_almacen(options['almacen'])
+        self.crear_categorias = options['crear_categorias']
+        self.categorias = {
+            categoria.nombre_categoria: categoria
+            for categoria in CategoriaProducto.objects.all()
+        }
+        self.importados = 0
+        self.errores = 0
+
+        self.stdout.write(self.style.WARNING(
+            f'📥 Importando productos de {ruta} ({formato}, lotes de {tamano_lote})...'))
+        inicio = time.monotonic()
+
+        with ruta.open(encoding='utf-8-sig', newline='') as archivo:
+            if formato == 'csv':
+                filas = csv.DictReader(archivo, delimiter=options['delimitador'])
+            else:
+                # Cada línea se decodifica en _leer_fila: una línea mal formada
+                # se rechaza como cualquier otra fila, con su número de línea
+                filas = iter(archivo)
+
+            numero_fila = 1
+            while True:
+                lote = list(islice(filas, tamano_lote))
+                if not lote:
+                    break
+                self._importar_lote(lote, numero_fila)
+                numero_fila += len(lote)
+
+                segundos = max(time.monotonic() - inicio, 0.001)
+                self.stdout.write(
+                    f'📦 {self.importados} productos importados, {self.errores} errores '
+                    f'({self.importados / segundos:.0f} productos/s)')
+
+        segundos = max(time.monotonic() - inicio, 0.001)
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Importación terminada: {self.importados} productos en {segundos:.1f} s '
+            f'({self.importados / segundos:.0f} productos/s)'))
+        if self.errores:
+            self.stdout.write(self.style.ERROR(
+                f'❌ {self.errores} fila(s) rechazada(s)'))
+
+    def _obtener_almacen(self, codigo):
+        if not codigo:
+            return Almacen.principal()
+        try:
+            return Almacen.objects.get(codigo=codigo.strip().upper())
+        except Almacen.DoesNotExist:
+            raise CommandError(f'No existe el almacén {codigo}')
+
+    def _categoria(self, nombre):
+        nombre = _normalizar(nombre)
+        if not nombre:
+            raise ValueError('falta la categoría')
+        if nombre not in self.categorias:
+            if not self.crear_categorias:
+                raise ValueError(f'la categoría "{nombre}" no existe')
+            self.categorias[nombre] = CategoriaProducto.objects.create(
+                nombre_categoria=nombre)
+        return self.categorias[nombre]
+
+    def _leer_fila(self, fila):
+        """Convierte una fila del archivo en (Producto sin guardar, cantidad inicial)"""
+        if isinstance(fila, str):
+            try:
+                fila = json.loads(fila)
+            except json.JSONDecodeError as e:
+                raise ValueError(f'JSON no válido: {e}')
+            if not isinstance(fila, dict):
+                raise ValueError('la línea no es un objeto JSON')
+
+        nombre = _normalizar(fila.get('nombre'))
+        if not nombre:
+            raise ValueError('falta el nombre')
+
+        producto = Producto(
+            codigo_producto=_texto(
+                (fila.get('codigo_producto') or '').strip() or None, 'codigo_producto'),
+            nombre=_texto(nombre, 'nombre'),
+            descripcion=fila.get('descripcion') or '',
+            categoria=self._categoria(fila.get('categoria')),
+            precio_compra=_decimal(fila.get('precio_compra'), 'precio_compra'),
+            precio_venta=_decimal(fila.get('precio_venta'), 'precio_venta'),
+            stock_minimo=_entero(fila.get('stock_minimo'), 'stock_minimo'),
+            unidad_medida=_texto(fila.get('unidad_medida') or '', 'unidad_medida'),
+        )
+        return producto, _entero(fila.get('cantidad'), 'cantidad')
+
+    def _rechazar(self, numero_fila, motivo):
+        self.errores += 1
+        if self.errores <= MAXIMO_ERRORES_MOSTRADOS:
+            self.stdout.write(self.style.WARNING(
+                f'⚠️  Fila {numero_fila}: {motivo}'))
+
+    def _importar_lote(self, lote, primera_fila):
+        leidos = []
+        for numero_fila, fila in enumerate(lote, start=primera_fila):
+            if isinstance(fila, str) and not fila.strip():
+                continue  # línea en blanco del JSONL
+            try:
+                leidos.append((numero_fila, *self._leer_fila(fila)))
+            except (ValueError, ArithmeticError, AttributeError) as e:
+                self._rechazar(numero_fila, e)
+
+        # Códigos explícitos repetidos en la BD o dentro del propio lote
+        explicitos = [p.codigo_producto for _, p, _ in leidos if p.codigo_producto]
+        usados = set(Producto.objects.filter(
+            codigo_producto__in=explicitos).values_list('codigo_producto', flat=True))
+        validos = []
+        for numero_fila, producto, cantidad in leidos:
+            if producto.codigo_producto:
+                if producto.codigo_producto in usados:
+                    self._rechazar(
+                        numero_fila, f'el código {producto.codigo_producto} ya existe')
+                    continue
+                usados.add(producto.codigo_producto)
+            validos.append((producto, cantidad))
+
+        if not validos:
+            return
+
+        # Los códigos explícitos avanzan el contador de su prefijo
+        registrar_codigos(
+            producto.codigo_producto for producto, _ in validos if producto.codigo_producto)
+
+        # Un bloque de códigos por prefijo para las filas sin código
+        sin_codigo = {}
+        for producto, _ in validos:
+            if not producto.codigo_producto:
+                sin_codigo.setdefault(
+                    prefijo_categoria(producto.categoria), []).append(producto)
+        for prefijo, productos in sin_codigo.items():
+            codigos = reservar_codigos(prefijo, len(productos))
+            for producto, codigo in zip(productos, codigos):
+                producto.codigo_producto = codigo
+
+        with transaction.atomic():
+            Producto.objects.bulk_create(
+                [producto for producto, _ in validos], batch_size=TAMANO_INSERT)
+
+            Inventario.objects.bulk_create([
+                Inventario(producto=producto, almacen=self.almacen,
+                           cantidad_actual=cantidad, cantidad_reservada=0)
+                for producto, cantidad in validos
+            ], batch_size=TAMANO_INSERT)
+            StockProducto.objects.bulk_create([
+                StockProducto(producto=producto, cantidad_actual=cantidad)
+                for producto, cantidad in validos
+            ], batch_size=TAMANO_INSERT)
+            # El stock inicial queda en el libro como ajuste
+            MovimientoStock.objects.bulk_create([
+                MovimientoStock(producto=producto, almacen=self.almacen,
+                                delta_actual=cantidad, tipo_documento='ajuste')
+                for producto, cantidad in validos if cantidad
+            ], batch_size=TAMANO_INSERT)
+
+            actualizar_cola_reposicion([producto.pk for producto, _ in validos])
+
+        self.importados += len(validos)
@@ -1,4 +1,35 @@
 from django.db import models
+from django.db.models import BooleanField, Case, F, Value, When
+from django.db.models.functions import Coalesce
+
+
+class ProductoQuerySet(models.QuerySet):
+
+    def con_stock(self):
+        """
+        Añade el stock total de cada producto (todos los almacenes) leyendo
+        StockProducto con un LEFT JOIN uno a uno, sin agrupar filas de
+        Inventario: cantidad_actual, cantidad_reservada, cantidad_disponible,
+        stock_bajo y tiene_inventario. Evita consultar producto.inventarios
+        fila a fila en listados y admin. stock_bajo mira el disponible, igual
+        que la cola de reposición, que se calcula con esta misma anotación.
+        """
+        return self.annotate(
+            cantidad_actual=Coalesce(F('stock__cantidad_actual'), 0),
+            cantidad_reservada=Coalesce(F('stock__cantidad_reservada'), 0),
+            tiene_inventario=Case(
+                When(stock__isnull=False, then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField(),
+            ),
+        ).annotate(
+            cantidad_disponible=F('cantidad_actual') - F('cantidad_reservada'),
+            stock_bajo=Case(
+                When(cantidad_disponible__lte=F('stock_minimo'), then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField(),
+            ),
+        )
 
 
 class CategoriaProducto(models.Model):
@@ -48,9 +79,16 @@ class Producto(models.Model):
     actualizado_el = models.DateTimeField(
         auto_now=True, verbose_name="Actualizado el")
 
+    objects = ProductoQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Producto'
         verbose_name_plural = 'Productos'
+        indexes = [
+            # Paginación keyset del listado y del autocompletado
+            models.Index(fields=['creado_el', 'id']),
+            models.Index(fields=['nombre', 'id']),
+        ]
 
     def __str__(self):
         return f"{self.nombre} ({self.codigo_producto})"
@@ -62,9 +100,77 @@ class Producto(models.Model):
         super().save(*args, **kwargs)
 
 
+class ContadorCodigo(models.Model):
+    """
+    Último número asignado a cada prefijo de código de producto. Los códigos
+    se reparten incrementando esta fila (bloqueada durante la transacción),
+    así que dos altas simultáneas no pueden obtener el mismo código.
+    """
+
+    prefijo = models.CharField(
+        max_length=10, primary_key=True, verbose_name="Prefijo")
+    ultimo_numero = models.PositiveBigIntegerField(
+        default=0, verbose_name="Último Número")
+    actualizado_el = models.DateTimeField(
+        auto_now=True, verbose_name="Actualizado el")
+
+    class Meta:
+        verbose_name = 'Contador de Códigos'
+        verbose_name_plural = 'Contadores de Códigos'
+
+    def __str__(self):
+        return f"{self.prefijo}: {self.ultimo_numero}"
+
+
+class Almacen(models.Model):
+    """Almacén o ubicación física donde se guarda stock"""
+
+    CODIGO_PRINCIPAL = 'PRINCIPAL'
+
+    codigo = models.CharField(
+        max_length=20, unique=True, verbose_name="Código")
+    nombre = models.CharField(max_length=100, verbose_name="Nombre")
+    direccion = models.TextField(
+        blank=True, null=True, verbose_name="Dirección")
+    activo = models.BooleanField(default=True, verbose_name="Activo")
+    creado_el = models.DateTimeField(
+        auto_now_add=True, verbose_name="Creado el")
+    actualizado_el = models.DateTimeField(
+        auto_now=True, verbose_name="Actualizado el")
+
+    class Meta:
+        verbose_name = 'Almacén'
+        verbose_name_plural = 'Almacenes'
+        ordering = ['codigo']
+
+    def __str__(self):
+        return f"{self.nombre} ({self.codigo})"
+
+    def save(self, *args, **kwargs):
+        """Normalizar campos antes de guardar para evitar duplicados"""
+        if self.codigo:
+            self.codigo = self.codigo.strip().upper()
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def principal(cls):
+        """Almacén por defecto para el stock y los movimientos sin ubicación"""
+        almacen, _ = cls.objects.get_or_create(
+            codigo=cls.CODIGO_PRINCIPAL,
+            defaults={'nombre': 'Almacén Principal'})
+        return almacen
+
+
 class Inventario(models.Model):
+    """Saldo de un producto en un almacén (una fila por producto y almacén)"""
+
     producto = models.ForeignKey(
         Producto, on_delete=models.CASCADE, related_name='inventarios', verbose_name="Producto")
+    # Nullable solo para poder añadir la columna a tablas con datos; al
+    # guardar y en post_migrate se asigna el almacén principal
+    almacen = models.ForeignKey(
+        Almacen, on_delete=models.PROTECT, related_name='inventarios',
+        blank=True, null=True, verbose_name="Almacén")
     cantidad_actual = models.IntegerField(
         default=0, verbose_name="Cantidad Actual")
     cantidad_reservada = models.IntegerField(
@@ -81,6 +187,122 @@ class Inventario(models.Model):
     class Meta:
         verbose_name = 'Inventario'
         verbose_name_plural = 'Inventarios'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['producto', 'almacen'],
+                name='inventario_producto_almacen_unico'),
+        ]
 
     def __str__(self):
         return f"Inventario de {self.producto.nombre}"
+
+    def save(self, *args, **kwargs):
+        if self.almacen_id is None:
+            self.almacen = Almacen.principal()
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'almacen'}
+        super().save(*args, **kwargs)
+
+
+class StockProducto(models.Model):
+    """
+    Total de stock de un producto sumando todos sus almacenes. Lo mantiene
+    el servicio de movimientos en la misma transacción que Inventario, así
+    que la disponibilidad de un producto es una lectura por clave primaria.
+    Su fila es además el bloqueo por producto de cualquier cambio de stock.
+    """
+
+    producto = models.OneToOneField(
+        Producto, on_delete=models.CASCADE, primary_key=True,
+        related_name='stock', verbose_name="Producto")
+    cantidad_actual = models.IntegerField(
+        default=0, verbose_name="Cantidad Actual")
+    cantidad_reservada = models.IntegerField(
+        default=0, verbose_name="Cantidad Reservada")
+    actualizado_el = models.DateTimeField(
+        auto_now=True, verbose_name="Actualizado el")
+
+    class Meta:
+        verbose_name = 'Stock Total de Producto'
+        verbose_name_plural = 'Stock Total de Productos'
+
+    def __str__(self):
+        return f"Stock total de {self.producto_id}: {self.cantidad_actual} / {self.cantidad_reservada}"
+
+
+class ReposicionPendiente(models.Model):
+    """
+    Cola de reposición materializada: una fila por cada producto cuyo
+    disponible total (actual - reservada) está en su stock mínimo o por
+    debajo. La mantiene el servicio de movimientos al mover stock y al
+    cambiar el mínimo del producto, así que listar lo que hay que reponer
+    es una lectura por índice y no una comparación producto a producto.
+    """
+
+    producto = models.OneToOneField(
+        Producto, on_delete=models.CASCADE, primary_key=True,
+        related_name='reposicion', verbose_name="Producto")
+    cantidad_disponible = models.IntegerField(
+        default=0, verbose_name="Cantidad Disponible")
+    stock_minimo = models.PositiveIntegerField(
+        default=0, verbose_name="Stock Mínimo")
+    faltante = models.IntegerField(
+        default=0, verbose_name="Unidades hasta el Mínimo")
+    detectado_el = models.DateTimeField(
+        auto_now_add=True, verbose_name="Detectado el")
+    actualizado_el = models.DateTimeField(
+        auto_now=True, verbose_name="Actualizado el")
+
+    class Meta:
+        verbose_name = 'Reposición Pendiente'
+        verbose_name_plural = 'Reposiciones Pendientes'
+        indexes = [
+            # Paginación keyset de la cola (más urgentes primero)
+            models.Index(fields=['faltante', 'producto']),
+        ]
+
+    def __str__(self):
+        return f"Reponer {self.producto_id}: {self.cantidad_disponible} / {self.stock_minimo}"
+
+
+class MovimientoStock(models.Model):
+    """
+    Libro de movimientos de stock (solo inserciones). Cada cambio de
+    inventario queda registrado aqui y los saldos de Inventario son una
+    proyeccion de estos movimientos.
+    """
+
+    TIPOS_DOCUMENTO = [
+        ("orden_venta", "Orden de Venta"),
+        ("pedido_proveedor", "Pedido a Proveedor"),
+        ("ajuste", "Ajuste Manual"),
+    ]
+
+    producto = models.ForeignKey(
+        Producto, on_delete=models.CASCADE, related_name='movimientos', verbose_name="Producto")
+    almacen = models.ForeignKey(
+        Almacen, on_delete=models.PROTECT, related_name='movimientos',
+        blank=True, null=True, verbose_name="Almacén")
+    delta_actual = models.IntegerField(
+        default=0, verbose_name="Variación Cantidad Actual")
+    delta_reservada = models.IntegerField(
+        default=0, verbose_name="Variación Cantidad Reservada")
+    tipo_documento = models.CharField(
+        max_length=20, choices=TIPOS_DOCUMENTO, verbose_name="Tipo de Documento")
+    documento_id = models.PositiveBigIntegerField(
+        blank=True, null=True, verbose_name="Documento Origen")
+    creado_el = models.DateTimeField(
+        auto_now_add=True, verbose_name="Creado el")
+
+    class Meta:
+        verbose_name = 'Movimiento de Stock'
+        verbose_name_plural = 'Movimientos de Stock'
+        ordering = ['-creado_el']
+        indexes = [
+            models.Index(fields=['producto', 'creado_el']),
+            models.Index(fields=['tipo_documento', 'documento_id']),
+        ]
+
+    def __str__(self):
+        return (f"{self.get_tipo_documento_display()} #{self.documento_id} - "
+                f"{self.producto_id}: {self.delta_actual:+d} / {self.delta_reservada:+d}")
@@ -0,0 +1,285 @@
+"""
+Servicio de movimientos de stock.
+
+Todos los cambios de inventario pasan por aqui: primero se insertan los
+movimientos en el libro (MovimientoStock) y despues se proyectan en lote
+sobre Inventario (saldo por producto y almacen) y StockProducto (total del
+producto), con UPDATEs atomicos agrupados por producto. Asi nadie
+hace lectura-modificacion-escritura de la fila completa de Inventario, y
+los bloqueos de una operacion se toman juntos y siempre en el mismo orden.
+"""
+
+import time
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Case, Exists, F, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from core.metricas import ESPERA_BLOQUEO_INVENTARIO, contar_reservas
+from .models import (
+    Almacen, Inventario, MovimientoStock, Producto, ReposicionPendiente, StockProducto)
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Productos por sentencia UPDATE para no generar CASE gigantes
+TAMANO_LOTE_UPDATE = 500
+
+
+def registrar_movimientos(movimientos):
+    """
+    Inserta los movimientos en el libro y actualiza los saldos de Inventario
+    y los totales de StockProducto. Los movimientos sin almacén se asignan
+    al almacén principal.
+    """
+    movimientos = [
+        m for m in movimientos if m.delta_actual or m.delta_reservada]
+    if not movimientos:
+        return []
+
+    if any(m.almacen_id is None for m in movimientos):
+        almacen_principal_id = Almacen.principal().pk
+        for movimiento in movimientos:
+            if movimiento.almacen_id is None:
+                movimiento.almacen_id = almacen_principal_id
+
+    with transaction.atomic():
+        MovimientoStock.objects.bulk_create(movimientos)
+        aplicar_deltas(agrupar_deltas(movimientos))
+
+    # Solo cuentan las reservas que llegan a confirmarse
+    transaction.on_commit(lambda: contar_reservas(movimientos))
+    logger.info(f"Registrados {len(movimientos)} movimientos de stock")
+    return movimientos
+
+
+def agrupar_deltas(movimientos):
+    """
+    Agrupa los movimientos por producto y almacén:
+    {(producto_id, almacen_id): (delta_actual, delta_reservada)}
+    """
+    deltas = defaultdict(lambda: [0, 0])
+    for movimiento in movimientos:
+        clave = (movimiento.producto_id, movimiento.almacen_id)
+        deltas[clave][0] += movimiento.delta_actual
+        deltas[clave][1] += movimiento.delta_reservada
+
+    return {
+        clave: (delta_actual, delta_reservada)
+        for clave, (delta_actual, delta_reservada) in deltas.items()
+        if delta_actual or delta_reservada
+    }
+
+
+def aplicar_deltas(deltas):
+    """
+    Proyecta los deltas agrupados sobre Inventario (por almacén) y sobre
+    StockProducto (total por producto) con UPDATEs en bloque:
+    SET cantidad_actual = cantidad_actual + CASE producto_id WHEN ... END
+    """
+    if not deltas:
+        return
+
+    asegurar_inventarios(deltas.keys())
+    bloquear_inventarios(producto_id for producto_id, _ in deltas)
+    ahora = timezone.now()
+
+    por_almacen = defaultdict(dict)
+    totales = defaultdict(lambda: [0, 0])
+    for (producto_id, almacen_id), (delta_actual, delta_reservada) in deltas.items():
+        por_almacen[almacen_id][producto_id] = (delta_actual, delta_reservada)
+        totales[producto_id][0] += delta_actual
+        totales[producto_id][1] += delta_reservada
+
+    for almacen_id, deltas_almacen in sorted(por_almacen.items()):
+        _actualizar_en_lotes(
+            Inventario.objects.filter(almacen_id=almacen_id), deltas_almacen,
+            fecha_ultimo_movimiento=ahora, actualizado_el=ahora)
+    _actualizar_en_lotes(StockProducto.objects.all(), totales, actualizado_el=ahora)
+    actualizar_cola_reposicion(totales.keys())
+
+
+def _actualizar_en_lotes(queryset, deltas, **campos):
+    """UPDATE de las cantidades de `queryset` por lotes de productos"""
+    producto_ids = sorted(deltas)
+    for inicio in range(0, len(producto_ids), TAMANO_LOTE_UPDATE):
+        lote = producto_ids[inicio:inicio + TAMANO_LOTE_UPDATE]
+        queryset.filter(producto_id__in=lote).update(
+            cantidad_actual=F('cantidad_actual') + _case_por_producto(
+                (producto_id, deltas[producto_id][0]) for producto_id in lote),
+            cantidad_reservada=F('cantidad_reservada') + _case_por_producto(
+                (producto_id, deltas[producto_id][1]) for producto_id in lote),
+            **campos,
+        )
+
+
+def bloquear_inventarios(producto_ids, almacen_id=None):
+    """
+    Bloquea de una vez el stock de todos los productos de una operación:
+    SELECT ... FROM StockProducto WHERE producto_id IN (...) ORDER BY
+    producto_id FOR UPDATE. La fila de totales hace de bloqueo por producto
+    para todos sus almacenes y el orden fijo evita interbloqueos entre
+    órdenes que comparten productos. Devuelve {producto_id: StockProducto},
+    o los inventarios de `almacen_id` (también bloqueados) si se indica.
+    Debe llamarse dentro de transaction.atomic().
+    """
+    if not transaction.get_connection().in_atomic_block:
+        raise transaction.TransactionManagementError(
+            'bloquear_inventarios debe ejecutarse dentro de transaction.atomic()')
+
+    producto_ids = sorted(set(producto_ids))
+    if not producto_ids:
+        return {}
+
+    inicio = time.perf_counter()
+    totales = StockProducto.objects.select_for_update().filter(
+        producto_id__in=producto_ids).order_by('producto_id')
+    bloqueados = {total.producto_id: total for total in totales}
+    if almacen_id is not None:
+        inventarios = Inventario.objects.select_for_update().filter(
+            producto_id__in=producto_ids, almacen_id=almacen_id).order_by('producto_id')
+        bloqueados = {inventario.producto_id: inventario for inventario in inventarios}
+
+    ESPERA_BLOQUEO_INVENTARIO.observe(time.perf_counter() - inicio)
+    return bloqueados
+
+
+def _case_por_producto(valores):
+    """CASE producto_id WHEN id THEN delta ... ELSE 0 END (omite deltas en cero)"""
+    condiciones = [
+        When(producto_id=producto_id, then=Value(delta))
+        for producto_id, delta in valores if delta
+    ]
+    if not condiciones:
+        return Value(0)
+    return Case(*condiciones, default=Value(0), output_field=IntegerField())
+
+
+def asegurar_inventarios(claves):
+    """
+    Crea (en un solo INSERT por tabla) los inventarios (producto, almacén)
+    que falten y el total de los productos que aún no tenían inventario
+    """
+    claves = set(claves)
+    producto_ids = {producto_id for producto_id, _ in claves}
+    existentes = set(Inventario.objects.filter(
+        producto_id__in=producto_ids).values_list('producto_id', 'almacen_id'))
+    faltantes = claves - existentes
+
+    if faltantes:
+        Inventario.objects.bulk_create([
+            Inventario(producto_id=producto_id, almacen_id=almacen_id,
+                       cantidad_actual=0, cantidad_reservada=0)
+            for producto_id, almacen_id in sorted(faltantes)
+        ], ignore_conflicts=True)
+        logger.info(
+            f"Inventario creado automáticamente para {len(faltantes)} producto(s)")
+
+    # Todo producto con inventario tiene ya su total (signals y post_migrate)
+    sin_inventario = producto_ids - {producto_id for producto_id, _ in existentes}
+    if sin_inventario:
+        StockProducto.objects.bulk_create(
+            [StockProducto(producto_id=producto_id) for producto_id in sorted(sin_inventario)],
+            ignore_conflicts=True)
+
+
+def recalcular_stock_productos(producto_ids=None, using='default'):
+    """
+    Recalcula StockProducto como suma de los inventarios de cada producto
+    con un único UPDATE (todos los productos si no se indican ids)
+    """
+    totales = StockProducto.objects.using(using)
+    if producto_ids is not None:
+        totales = totales.filter(producto_id__in=list(producto_ids))
+
+    inventarios = Inventario.objects.filter(
+        producto_id=OuterRef('producto_id')).values('producto_id')
+    actualizados = totales.update(
+        cantidad_actual=Coalesce(Subquery(inventarios.annotate(
+            total=Sum('cantidad_actual')).values('total')), 0),
+        cantidad_reservada=Coalesce(Subquery(inventarios.annotate(
+            total=Sum('cantidad_reservada')).values('total')), 0),
+        actualizado_el=timezone.now(),
+    )
+    return actualizados
+
+
+def actualizar_cola_reposicion(producto_ids=None, using='default'):
+    """
+    Sincroniza ReposicionPendiente para los productos indicados (todos si no
+    se indican): entran o se actualizan los que tienen el disponible en su
+    stock mínimo o por debajo y salen los demás, con sentencias en bloque.
+    """
+    productos = Producto.objects.using(using).con_stock()
+    cola = ReposicionPendiente.objects.using(using)
+
+    if producto_ids is None:
+        # Reconstrucción completa sin traer a memoria los productos que salen
+        bajo_minimo = productos.filter(stock_bajo=True)
+        cola.exclude(producto_id__in=bajo_minimo.values('id')).delete()
+        filas = list(bajo_minimo.values_list(
+            'id', 'cantidad_disponible', 'stock_minimo'))
+    else:
+        afectados = productos.filter(id__in=list(producto_ids)).annotate(
+            en_cola=Exists(cola.filter(producto_id=OuterRef('pk')))
+        ).values_list('id', 'cantidad_disponible', 'stock_minimo', 'stock_bajo', 'en_cola')
+
+        filas, salen = [], []
+        for producto_id, disponible, stock_minimo, stock_bajo, en_cola in afectados:
+            if stock_bajo:
+                filas.append((producto_id, disponible, stock_minimo))
+            elif en_cola:
+                salen.append(producto_id)
+        if salen:
+            cola.filter(producto_id__in=salen).delete()
+
+    if filas:
+        cola.bulk_create([
+            ReposicionPendiente(
+                producto_id=producto_id,
+                cantidad_disponible=disponible,
+                stock_minimo=stock_minimo,
+                faltante=stock_minimo - disponible,
+            )
+            for producto_id, disponible, stock_minimo in filas
+        ], update_conflicts=True, unique_fields=['producto'],
+            update_fields=['cantidad_disponible', 'stock_minimo', 'faltante', 'actualizado_el'],
+            batch_size=TAMANO_LOTE_UPDATE)
+
+
+def sincronizar_stock_producto(producto_id):
+    """
+    Crea si falta y recalcula el total de un producto tras escribir su
+    Inventario fuera del servicio de movimientos, y su lugar en la cola
+    """
+    StockProducto.objects.get_or_create(producto_id=producto_id)
+    recalcular_stock_productos([producto_id])
+    actualizar_cola_reposicion([producto_id])
+
+
+def inicializar_almacenes(using='default', **kwargs):
+    """
+    Tras migrar: crea el almacén principal, le asigna los inventarios y
+    movimientos anteriores a los almacenes y genera los totales por producto
+    que falten. Es idempotente y solo hace operaciones en bloque.
+    """
+    with transaction.atomic(using=using):
+        almacen, _ = Almacen.objects.using(using).get_or_create(
+            codigo=Almacen.CODIGO_PRINCIPAL,
+            defaults={'nombre': 'Almacén Principal'})
+        asignados = Inventario.objects.using(using).filter(
+            almacen__isnull=True).update(almacen=almacen)
+        MovimientoStock.objects.using(using).filter(
+            almacen__isnull=True).update(almacen=almacen)
+
+        sin_total = set(Inventario.objects.using(using).filter(
+            producto__stock__isnull=True).values_list('producto_id', flat=True))
+        StockProducto.objects.using(using).bulk_create(
+            [StockProducto(producto_id=producto_id) for producto_id in sin_total],
+            ignore_conflicts=True)
+
+        if asignados or sin_total:
+            recalcular_stock_productos(using=using)
+        actualizar_cola_reposicion(using=using)
+    logger.info(
+        f"🏬 Almacenes verificados ({asignados} inventario(s) asignados al principal)")
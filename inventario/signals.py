@@ -0,0 +1,41 @@
+"""
+Signals de Inventario para las escrituras que no pasan por el servicio de
+movimientos (alta desde el admin, get_or_create en las vistas, borrados):
+mantienen StockProducto igual a la suma de los inventarios del producto.
+Los cambios del stock mínimo de un producto actualizan la cola de reposición.
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import Inventario, Producto
+from .services import (
+    actualizar_cola_reposicion, recalcular_stock_productos, sincronizar_stock_producto)
+
+# Campos de Inventario que afectan al total del producto
+CAMPOS_TOTALES = {'producto', 'cantidad_actual', 'cantidad_reservada'}
+
+
+@receiver(post_save, sender=Inventario)
+def inventario_post_save(sender, instance, update_fields=None, **kwargs):
+    """Recalcula el total del producto si cambiaron sus cantidades"""
+    if update_fields is not None and not CAMPOS_TOTALES & set(update_fields):
+        return
+    sincronizar_stock_producto(instance.producto_id)
+
+
+@receiver(post_delete, sender=Inventario)
+def inventario_post_delete(sender, instance, origin=None, **kwargs):
+    """Descuenta del total el inventario eliminado"""
+    # Al borrar el producto, su total y su fila en la cola se borran en cascada
+    if isinstance(origin, Producto) or getattr(origin, 'model', None) is Producto:
+        return
+    recalcular_stock_productos([instance.producto_id])
+    actualizar_cola_reposicion([instance.producto_id])
+
+
+@receiver(post_save, sender=Producto)
+def producto_post_save(sender, instance, update_fields=None, **kwargs):
+    """Un producto nuevo o con otro stock mínimo puede entrar o salir de la cola"""
+    if update_fields is not None and 'stock_minimo' not in update_fields:
+        return
+    actualizar_cola_reposicion([instance.pk])
@@ -1,11 +1,17 @@
 from django.urls import path
-from .views import list_inventory, create_product, create_category, detail_product
+from .views import (
+    list_inventory, create_product, create_category, detail_product, catalogo_productos,
+    cola_reposicion, api_cola_reposicion, exportar_inventario)
 
 
 urlpatterns = [
     path('lista_inventario/', list_inventory, name='lista_inventario'),
+    path('exportar_inventario/', exportar_inventario, name='exportar_inventario'),
     path('crear_producto/', create_product, name='crear_producto'),
     path('crear_categoria/', create_category, name='crear_categoria'),
     path(
         'detalle_producto/<int:producto_id>', detail_product, name='detalle_producto'),
+    path('api/catalogo/', catalogo_productos, name='api_catalogo'),
+    path('reposicion/', cola_reposicion, name='cola_reposicion'),
+    path('api/reposicion/', api_cola_reposicion, name='api_reposicion'),
 ]
@@ -1,16 +1,30 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.db import transaction
+from django.db.models import Count, Exists, Max, OuterRef, Q
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from .models import Inventario, CategoriaProducto, Producto
-
-
-@login_required
-def list_inventory(request):
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils import timezone
+from django.views.decorators.http import condition, require_GET
+from datetime import datetime, time
+import hashlib
+import json
+from .models import (
+    Almacen, Inventario, CategoriaProducto, Producto, MovimientoStock, ReposicionPendiente)
+from .codigos import prefijo_categoria, siguiente_codigo
+from .services import registrar_movimientos
+from core.busqueda import buscar
+from core.exportacion import respuesta_csv
+from core.paginacion import POR_PAGINA, paginar_keyset
+
+
+def _filtrar_productos(request, producto):
+    """Filtros del listado de inventario (también los usa la exportación)"""
     query = request.GET.get('buscarProducto')
-    producto = Producto.objects.select_related(
-        'categoria').prefetch_related('inventarios').all()
-    categoria = CategoriaProducto.objects.all()
 
     # Filtro categoria
     categoria_id = request.GET.get('buscarCategoria')
@@ -23,11 +37,25 @@ def list_inventory(request):
 
     # Filtrar producto
     if query:
-        producto = producto.filter(nombre__icontains=query)
+        producto = buscar(producto, query)
+
+    return producto, query, categoria_id
+
+
+@login_required
+def list_inventory(request):
+    producto = Producto.objects.select_related('categoria').con_stock()
+    categoria = CategoriaProducto.objects.all()
+
+    producto, query, categoria_id = _filtrar_productos(request, producto)
+    orden = ('-relevancia', '-creado_el') if query else ('-creado_el',)
+
+    pagina = paginar_keyset(request, producto, orden)
 
     # datos para las variables html
     context = {
-        "productos": producto,
+        "productos": pagina.objetos,
+        "pagina": pagina,
         "categorias": categoria,
         "categoria_seleccionada": categoria_id,
     }
@@ -35,6 +63,15 @@ def list_inventory(request):
     return render(request, 'inventario/list_inventory.html', context)
 
 
+@login_required
+@require_GET
+def exportar_inventario(request):
+    """Exporta a CSV (en streaming) el inventario de los productos del listado"""
+    productos, _, _ = _filtrar_productos(request, Producto.objects.all())
+    inventarios = Inventario.objects.filter(producto__in=productos.values('pk'))
+    return respuesta_csv(inventarios, 'inventario')
+
+
 @login_required
 def create_product(request):
     categorias = CategoriaProducto.objects.all()
@@ -64,24 +101,10 @@ def create_product(request):
                     request, 'La categoría seleccionada no es válida.')
                 return render(request, 'inventario/create_product.html', {'categorias': categorias})
 
-            # Generar el código automáticamente
-            prefijo = categoria.nombre_categoria[:2].upper()
-            # Buscar el último producto de esa categoría
-            ultimo_producto = Producto.objects.filter(
-                categoria=categoria,
-                codigo_producto__startswith=prefijo
-            ).order_by('-codigo_producto').first()
-
-            if ultimo_producto:
-                # Extraer el número y sumarle 1
-                ultimo_numero = int(ultimo_producto.codigo_producto[2:])
-                nuevo_numero = ultimo_numero + 1
-            else:
-                nuevo_numero = 1
+            # Generar el código automáticamente (contador atómico por prefijo)
+            codigo_producto = siguiente_codigo(prefijo_categoria(categoria))
 
-            codigo_producto = f"{prefijo}{nuevo_numero:04d}"
-
-            # Verificar que el código no exista (por si acaso)
+            # Verificar que el código no exista (por si se puso a mano)
             if Producto.objects.filter(codigo_producto=codigo_producto).exists():
                 messages.error(
                     request, f'Ya existe un producto con el código "{codigo_producto}".')
@@ -115,14 +138,32 @@ def create_product(request):
     return render(request, 'inventario/create_product.html', context)
 
 
+def _redirigir_detalle(producto_id, almacen):
+    """Vuelve al detalle del producto manteniendo el almacén seleccionado"""
+    url = reverse('detalle_producto', args=[producto_id])
+    if almacen.codigo != Almacen.CODIGO_PRINCIPAL:
+        url = f'{url}?almacen={almacen.id}'
+    return redirect(url)
+
+
 @login_required
 def detail_product(request, producto_id):
     # Obtener el producto o devolver 404 si no existe
     producto = get_object_or_404(Producto, id=producto_id)
 
+    # Almacén cuyo saldo se muestra y se edita (el principal por defecto)
+    almacenes = Almacen.objects.filter(activo=True)
+    almacen_id = request.POST.get('almacen') or request.GET.get('almacen')
+    almacen = None
+    if almacen_id and almacen_id.isdigit():
+        almacen = almacenes.filter(id=almacen_id).first()
+    if almacen is None:
+        almacen = Almacen.principal()
+
     # Obtener el inventario asociado (crear uno si no existe)
     inventario, created = Inventario.objects.get_or_create(
         producto=producto,
+        almacen=almacen,
         defaults={
             'cantidad_actual': 0,
             'cantidad_reservada': 0,
@@ -156,7 +197,7 @@ def detail_product(request, producto_id):
                 except (ValueError, TypeError):
                     messages.error(
                         request, 'Los precios deben ser números válidos.')
-                    return redirect('detalle_producto', producto_id=producto_id)
+                    return _redirigir_detalle(producto_id, almacen)
 
                 # Actualizar stock mínimo
                 try:
@@ -165,12 +206,14 @@ def detail_product(request, producto_id):
                 except (ValueError, TypeError):
                     messages.error(
                         request, 'El stock mínimo debe ser un número entero válido.')
-                    return redirect('detalle_producto', producto_id=producto_id)
+                    return _redirigir_detalle(producto_id, almacen)
 
                 producto.unidad_medida = request.POST.get(
                     'unidad_medida', '').strip()
 
                 # Actualizar datos del inventario
+                cantidad_actual_anterior = inventario.cantidad_actual
+                cantidad_reservada_anterior = inventario.cantidad_reservada
                 try:
                     inventario.cantidad_actual = int(
                         request.POST.get('cantidad_actual', 0))
@@ -179,7 +222,7 @@ def detail_product(request, producto_id):
                 except (ValueError, TypeError):
                     messages.error(
                         request, 'Las cantidades deben ser números enteros válidos.')
-                    return redirect('detalle_producto', producto_id=producto_id)
+                    return _redirigir_detalle(producto_id, almacen)
 
                 inventario.ubicacion_almacen = request.POST.get(
                     'ubicacion_almacen', 'No especificada').strip()
@@ -188,40 +231,50 @@ def detail_product(request, producto_id):
                 if not producto.nombre:
                     messages.error(
                         request, 'El nombre del producto es obligatorio.')
-                    return redirect('detalle_producto', producto_id=producto_id)
+                    return _redirigir_detalle(producto_id, almacen)
 
                 if not producto.codigo_producto:
                     messages.error(
                         request, 'El código del producto es obligatorio.')
-                    return redirect('detalle_producto', producto_id=producto_id)
+                    return _redirigir_detalle(producto_id, almacen)
 
                 if producto.precio_compra < 0 or producto.precio_venta < 0:
                     messages.error(
                         request, 'Los precios no pueden ser negativos.')
-                    return redirect('detalle_producto', producto_id=producto_id)
+                    return _redirigir_detalle(producto_id, almacen)
 
                 if inventario.cantidad_actual < 0 or inventario.cantidad_reservada < 0:
                     messages.error(
                         request, 'Las cantidades no pueden ser negativas.')
-                    return redirect('detalle_producto', producto_id=producto_id)
+                    return _redirigir_detalle(producto_id, almacen)
 
                 if inventario.cantidad_reservada > inventario.cantidad_actual:
                     messages.error(
                         request, 'La cantidad reservada no puede ser mayor que la cantidad actual.')
-                    return redirect('detalle_producto', producto_id=producto_id)
+                    return _redirigir_detalle(producto_id, almacen)
 
                 # Guardar los cambios
                 producto.save()
-                inventario.save()
+                Inventario.objects.filter(pk=inventario.pk).update(
+                    ubicacion_almacen=inventario.ubicacion_almacen)
+
+                # Las cantidades se registran como ajuste en el libro de movimientos
+                registrar_movimientos([MovimientoStock(
+                    producto=producto,
+                    almacen=almacen,
+                    delta_actual=inventario.cantidad_actual - cantidad_actual_anterior,
+                    delta_reservada=inventario.cantidad_reservada - cantidad_reservada_anterior,
+                    tipo_documento='ajuste',
+                )])
 
                 messages.success(
                     request, 'Producto actualizado correctamente.')
-                return redirect('detalle_producto', producto_id=producto_id)
+                return _redirigir_detalle(producto_id, almacen)
 
         except Exception as e:
             messages.error(
                 request, f'Error al actualizar el producto: {str(e)}')
-            return redirect('detalle_producto', producto_id=producto_id)
+            return _redirigir_detalle(producto_id, almacen)
 
     # GET request - mostrar el formulario
     # Obtener todas las categorías para el select
@@ -233,12 +286,18 @@ def detail_product(request, producto_id):
     # Calcular cantidad disponible
     cantidad_disponible = inventario.cantidad_actual - inventario.cantidad_reservada
 
-    # Verificar si está por debajo del stock mínimo
-    stock_bajo = inventario.cantidad_actual <= producto.stock_minimo
+    # Totales del producto en todos los almacenes
+    stock_total = Producto.objects.con_stock().get(pk=producto.pk)
+
+    # Verificar si el total está por debajo del stock mínimo
+    stock_bajo = stock_total.stock_bajo
 
     context = {
         'producto': producto,
         'inventario': inventario,
+        'almacen': almacen,
+        'almacenes': almacenes,
+        'stock_total': stock_total,
         'categorias': categorias,
         'cantidad_disponible': cantidad_disponible,
         'stock_bajo': stock_bajo,
@@ -278,3 +337,157 @@ def create_category(request):
         return redirect('crear_producto')
 
     return render(request, 'inventario/create_product.html')
+
+
+# ================================
+# API DE CATÁLOGO
+# ================================
+
+# Filas que trae cada viaje del cursor del servidor al exportar el catálogo
+TAMANO_LOTE_CATALOGO = 2000
+
+CAMPOS_CATALOGO = (
+    'id', 'codigo_producto', 'nombre', 'categoria_id', 'precio_compra',
+    'precio_venta', 'stock_minimo', 'unidad_medida', 'actualizado_el',
+)
+
+
+def _leer_updated_since(request):
+    """Fecha u hora de ?updated_since= (ISO 8601). None si no se envía"""
+    valor = request.GET.get('updated_since')
+    if not valor:
+        return None
+    momento = parse_datetime(valor)
+    if momento is None:
+        fecha = parse_date(valor)
+        if fecha is None:
+            raise ValueError(valor)
+        momento = datetime.combine(fecha, time.min)
+    if timezone.is_naive(momento):
+        momento = timezone.make_aware(momento)
+    return momento
+
+
+def _catalogo_queryset(request):
+    """
+    Productos del catálogo filtrados por ?updated_since=. Un producto cuenta
+    como modificado si cambió su ficha o el stock de alguno de sus inventarios.
+    """
+    productos = Producto.objects.all()
+    desde = _leer_updated_since(request)
+    if desde is not None:
+        productos = productos.filter(
+            Q(actualizado_el__gt=desde) |
+            Exists(Inventario.objects.filter(
+                producto=OuterRef('pk'), actualizado_el__gt=desde)))
+    return productos
+
+
+def _etag_catalogo(request):
+    """ETag barato: una consulta agregada en lugar de serializar el catálogo"""
+    try:
+        productos = _catalogo_queryset(request)
+    except ValueError:
+        return None
+    resumen = productos.aggregate(
+        total=Count('id', distinct=True),
+        producto=Max('actualizado_el'),
+        inventario=Max('inventarios__actualizado_el'),
+    )
+    firma = f"{request.GET.get('updated_since', '')}|{resumen['total']}|" \
+        f"{resumen['producto']}|{resumen['inventario']}"
+    return hashlib.sha1(firma.encode()).hexdigest()
+
+
+def _serializar_catalogo(productos):
+    yield '{"productos": ['
+    for i, producto in enumerate(productos):
+        yield (',' if i else '') + json.dumps(producto, cls=DjangoJSONEncoder)
+    yield ']}'
+
+
+@login_required
+@require_GET
+@condition(etag_func=_etag_catalogo)
+def catalogo_productos(request):
+    """
+    API de catálogo completo de productos con su stock. La respuesta se
+    genera fila a fila desde un cursor del servidor, así que la memoria no
+    crece con el tamaño del catálogo. Admite ?updated_since=<ISO 8601> para
+    sincronizaciones incrementales y ETag para responder 304 si no hay cambios.
+    """
+    try:
+        productos = _catalogo_queryset(request)
+    except ValueError:
+        return HttpResponseBadRequest('updated_since no es una fecha ISO 8601 válida')
+
+    productos = productos.con_stock().order_by('id').values(*CAMPOS_CATALOGO, 'cantidad_actual', 'cantidad_reservada')
+
+    response = StreamingHttpResponse(
+        _serializar_catalogo(productos.iterator(chunk_size=TAMANO_LOTE_CATALOGO)),
+        content_type='application/json')
+    # Los clientes deben revalidar siempre con If-None-Match
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+# ================================
+# COLA DE REPOSICIÓN
+# ================================
+
+# Más urgentes primero; el índice (faltante, producto) sirve este orden
+ORDEN_REPOSICION = ('-faltante',)
+
+LIMITE_API_REPOSICION = 100
+LIMITE_API_REPOSICION_MAXIMO = 500
+
+
+def _pagina_reposicion(request, por_pagina=POR_PAGINA):
+    """Página de la cola de reposición leída directamente de su índice"""
+    cola = ReposicionPendiente.objects.select_related(
+        'producto', 'producto__categoria')
+    return paginar_keyset(request, cola, ORDEN_REPOSICION, por_pagina=por_pagina)
+
+
+@login_required
+def cola_reposicion(request):
+    """Productos con el disponible en su stock mínimo o por debajo"""
+    pagina = _pagina_reposicion(request)
+
+    context = {
+        'reposiciones': pagina.objetos,
+        'pagina': pagina,
+    }
+    return render(request, 'inventario/cola_reposicion.html', context)
+
+
+@login_required
+@require_GET
+def api_cola_reposicion(request):
+    """
+    API de la cola de reposición, paginada por cursor. Parámetros: limite y
+    cursor (el enlace `siguiente` de la respuesta anterior).
+    """
+    try:
+        limite = min(int(request.GET.get('limite', LIMITE_API_REPOSICION)),
+                     LIMITE_API_REPOSICION_MAXIMO)
+    except ValueError:
+        limite = LIMITE_API_REPOSICION
+
+    pagina = _pagina_reposicion(request, por_pagina=max(limite, 1))
+
+    return JsonResponse({
+        'resultados': [
+            {
+                'producto_id': reposicion.producto_id,
+                'codigo': reposicion.producto.codigo_producto,
+                'nombre': reposicion.producto.nombre,
+                'cantidad_disponible': reposicion.cantidad_disponible,
+                'stock_minimo': reposicion.stock_minimo,
+                'faltante': reposicion.faltante,
+                'detectado_el': reposicion.detectado_el,
+            }
+            for reposicion in pagina
+        ],
+        'siguiente': pagina.url_siguiente,
+    })
@@ -0,0 +1,185 @@
+"""
+Instrumentación por petición: consultas SQL y tiempos.
+
+En las peticiones muestreadas (INSTRUMENTACION_MUESTREO, fracción entre 0 y
+1) se cuentan las consultas y su tiempo con connection.execute_wrapper, se
+añade la cabecera Server-Timing (visible en las herramientas de desarrollo
+del navegador) y se escribe una línea JSON en el logger
+'mystock.peticiones' con el nombre de la vista resuelta. Las peticiones no
+muestreadas no pasan por ningún envoltorio.
+
+MetricasMiddleware, en cambio, actúa en todas las peticiones: solo cuenta
+consultas y observa los histogramas de core.metricas (latencia y consultas
+por vista), que se publican en /metrics. ConsultasLentasMiddleware activa
+el registro opcional de core.consultas_lentas.
+"""
+
+import json
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from core.consultas_lentas import CronometroConsultas, registro
+from core.metricas import CONSULTAS_PETICIONES, LATENCIA_PETICIONES
+
+logger = logging.getLogger('mystock.peticiones')
+
+# Métodos que se usan como etiqueta; el resto se agrupa para acotar las series
+METODOS_HTTP = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+
+class _Medida:
+    """Consultas y tiempo acumulados de una petición"""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.segundos_bd = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.segundos_bd += time.perf_counter() - inicio
+            self.consultas += 1
+
+    def milisegundos_total(self):
+        return (time.perf_counter() - self.inicio) * 1000
+
+
+class _ContenidoMedido:
+    """
+    Contenido de una respuesta en streaming que avisa al cerrarse. Django
+    llama a close() al terminar de enviar la respuesta, también si el
+    cliente se desconecta antes de recibirla entera.
+    """
+
+    def __init__(self, contenido, al_cerrar):
+        self.contenido = contenido
+        self.al_cerrar = al_cerrar
+
+    def __iter__(self):
+        return iter(self.contenido)
+
+    def close(self):
+        self.al_cerrar()
+
+
+class InstrumentacionMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= getattr(settings, 'INSTRUMENTACION_MUESTREO', 0):
+            return self.get_response(request)
+
+        medida = _Medida()
+        connection.execute_wrappers.append(medida)
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            connection.execute_wrappers.remove(medida)
+            raise
+
+        response['Server-Timing'] = (
+            f'db;dur={medida.segundos_bd * 1000:.1f};desc="{medida.consultas} consultas", '
+            f'total;dur={medida.milisegundos_total():.1f}'
+        )
+
+        if response.streaming and not response.is_async:
+            # Las consultas de una respuesta en streaming (exportaciones) se
+            # hacen al enviar el contenido: se cuentan hasta que termina, y
+            # solo el log las incluye porque la cabecera ya se ha enviado
+            response.streaming_content = _ContenidoMedido(
+                response.streaming_content,
+                lambda: self._registrar(request, response, medida))
+        else:
+            self._registrar(request, response, medida)
+        return response
+
+    def _registrar(self, request, response, medida):
+        connection.execute_wrappers.remove(medida)
+        coincidencia = request.resolver_match
+        logger.info(json.dumps({
+            'vista': coincidencia.view_name if coincidencia else None,
+            'metodo': request.method,
+            'ruta': request.path,
+            'estado': response.status_code,
+            'consultas': medida.consultas,
+            'bd_ms': round(medida.segundos_bd * 1000, 1),
+            'total_ms': round(medida.milisegundos_total(), 1),
+        }))
+
+
+class _ContadorConsultas:
+    def __init__(self):
+        self.consultas = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.consultas += 1
+        return execute(sql, params, many, context)
+
+
+class MetricasMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        inicio = time.perf_counter()
+        contador = _ContadorConsultas()
+        connection.execute_wrappers.append(contador)
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            connection.execute_wrappers.remove(contador)
+            raise
+
+        if response.streaming and not response.is_async:
+            response.streaming_content = _ContenidoMedido(
+                response.streaming_content,
+                lambda: self._observar(request, contador, inicio))
+        else:
+            self._observar(request, contador, inicio)
+        return response
+
+    def _observar(self, request, contador, inicio):
+        connection.execute_wrappers.remove(contador)
+        coincidencia = request.resolver_match
+        vista = coincidencia.view_name if coincidencia else 'sin_vista'
+        metodo = request.method if request.method in METODOS_HTTP else 'otro'
+        LATENCIA_PETICIONES.labels(vista, metodo).observe(time.perf_counter() - inicio)
+        CONSULTAS_PETICIONES.labels(vista).observe(contador.consultas)
+
+
+class ConsultasLentasMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        umbral_ms = getattr(settings, 'CONSULTAS_LENTAS_UMBRAL_MS', None)
+        if umbral_ms is None:
+            return self.get_response(request)
+
+        cronometro = CronometroConsultas(request, umbral_ms)
+        connection.execute_wrappers.append(cronometro)
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            connection.execute_wrappers.remove(cronometro)
+            raise
+
+        if response.streaming and not response.is_async:
+            response.streaming_content = _ContenidoMedido(
+                response.streaming_content, lambda: self._terminar(cronometro))
+        else:
+            self._terminar(cronometro)
+        return response
+
+    def _terminar(self, cronometro):
+        # El volcado va fuera del envoltorio: sus consultas no se registran
+        connection.execute_wrappers.remove(cronometro)
+        registro.volcar()
@@ -57,6 +57,9 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'mystock.instrumentacion_middleware.ConsultasLentasMiddleware',
+    'mystock.instrumentacion_middleware.MetricasMiddleware',
+    'mystock.instrumentacion_middleware.InstrumentacionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -69,6 +72,22 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'mystock.urls'
 
+# Fracción de peticiones con cabecera Server-Timing y línea de log con
+# consultas y tiempos (0 = desactivado, 1 = todas)
+INSTRUMENTACION_MUESTREO = float(os.getenv('INSTRUMENTACION_MUESTREO', '0.1'))
+
+# Token para que Prometheus lea /metrics (Authorization: Bearer <token>)
+# sin sesión de staff. Vacío = solo staff
+METRICAS_TOKEN = os.getenv('METRICAS_TOKEN', '')
+
+# Registro de consultas lentas (core/consultas_lentas.py). Sin umbral está
+# desactivado; con 0 se agrupan todas las consultas (útil para ver N+1)
+CONSULTAS_LENTAS_UMBRAL_MS = (
+    float(os.environ['CONSULTAS_LENTAS_UMBRAL_MS'])
+    if os.getenv('CONSULTAS_LENTAS_UMBRAL_MS') else None)
+CONSULTAS_LENTAS_MAXIMO = 500
+CONSULTAS_LENTAS_VOLCADO_SEGUNDOS = 60
+
 BASE_DIR_TEMPLATES_GLOBAL = os.path.dirname(
     os.path.dirname(os.path.abspath(__file__)))
 
@@ -233,12 +252,21 @@ LOGGING = {
             'format': '{levelname} {asctime} {module} {process:d} {thread:d} {message}',
             'style': '{',
         },
+        # Líneas JSON de mystock.peticiones, listas para el agregador de logs
+        'estructurado': {
+            'format': '{message}',
+            'style': '{',
+        },
     },
     'handlers': {
         'console': {
             'class': 'logging.StreamHandler',
             'formatter': 'verbose',
         },
+        'console_estructurado': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'estructurado',
+        },
     },
     'root': {
         'handlers': ['console'],
@@ -260,5 +288,10 @@ LOGGING = {
             'level': 'DEBUG',  # Errores de templates
             'propagate': False,
         },
+        'mystock.peticiones': {
+            'handlers': ['console_estructurado'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
@@ -17,7 +17,8 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from django.contrib.auth import views as auth_views
-from .views import home_view, legal_page, locked_start, policy_cookies
+from core.views import consultas_lentas
+from .views import home_view, legal_page, locked_start, metricas, policy_cookies
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -31,4 +32,6 @@ urlpatterns = [
     path('pedidos/', include('pedidos.urls')),
     path('terminos_condiciones', legal_page, name='terminos_condiciones'),
     path('politica_cookies', policy_cookies, name='politica_cookies'),
+    path('metrics', metricas, name='metricas'),
+    path('consultas-lentas/', consultas_lentas, name='consultas_lentas'),
 ]
@@ -1,4 +1,12 @@
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
 from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+
+from core.metricas import exponer_metricas
 
 
 def home_view(request):
@@ -15,3 +23,21 @@ def policy_cookies(request):
 
 def locked_start(request):
     return render(request, 'locked_start.html')
+
+
+@require_GET
+def metricas(request):
+    """
+    Métricas en formato de texto de Prometheus. Acceso para staff con sesión
+    o con la cabecera Authorization: Bearer METRICAS_TOKEN
+    """
+    token = settings.METRICAS_TOKEN
+    con_token = bool(token) and constant_time_compare(
+        request.headers.get('Authorization', ''), f'Bearer {token}')
+    if not (con_token or request.user.is_staff):
+        if not request.user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        raise PermissionDenied
+
+    contenido, content_type = exponer_metricas()
+    return HttpResponse(contenido, content_type=content_type)
@@ -1,4 +1,5 @@
 from django.contrib import admin
+from core.exportacion import exportar_csv
 from .models import PedidoProveedor, DetallePedidoProveedor, OrdenVenta, DetalleOrdenVenta
 
 
@@ -16,6 +17,7 @@ class PedidoProveedorAdmin(admin.ModelAdmin):
     date_hierarchy = "fecha_pedido"
     inlines = [DetallePedidoProveedorInline]
     readonly_fields = ("numero_pedido", "creado_el", "actualizado_el")
+    actions = [exportar_csv]
 
 
 class DetalleOrdenVentaInline(admin.TabularInline):
@@ -32,6 +34,7 @@ class OrdenVentaAdmin(admin.ModelAdmin):
     date_hierarchy = "fecha_orden"
     inlines = [DetalleOrdenVentaInline]
     readonly_fields = ("numero_orden", "creado_el", "actualizado_el")
+    actions = [exportar_csv]
 
 
 @admin.register(DetallePedidoProveedor)
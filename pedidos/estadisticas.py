@@ -0,0 +1,57 @@
+"""
+Estadísticas del dashboard de pedidos.
+
+Los contadores se calculan con un único aggregate por modelo
+(Count con filter=Q(...)) y, junto con los documentos recientes, se guardan
+en caché unos segundos. Cualquier escritura en pedidos u órdenes invalida
+la caché, así que el dashboard nunca muestra datos de antes de un cambio.
+"""
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from .models import OrdenVenta, PedidoProveedor
+
+CLAVE_CACHE_DASHBOARD = 'pedidos:dashboard'
+
+# Segundos que se reutilizan las estadísticas si no hay cambios
+DURACION_CACHE_DASHBOARD = 60
+
+# Documentos recientes que muestra el dashboard
+NUMERO_RECIENTES = 5
+
+
+def _calcular_estadisticas():
+    stats_pedidos = PedidoProveedor.objects.aggregate(
+        total=Count('id'),
+        pendientes=Count('id', filter=Q(estado='pendiente')),
+        enviados=Count('id', filter=Q(estado='enviado')),
+        recibidos=Count('id', filter=Q(
+            estado__in=['recibido_parcial', 'recibido_completo'])),
+    )
+    stats_ordenes = OrdenVenta.objects.aggregate(
+        total=Count('id'),
+        pendientes=Count('id', filter=Q(estado='pendiente')),
+        procesando=Count('id', filter=Q(estado='procesando')),
+        entregadas=Count('id', filter=Q(estado='entregado')),
+    )
+
+    return {
+        'stats_pedidos': stats_pedidos,
+        'stats_ordenes': stats_ordenes,
+        'pedidos_recientes': list(PedidoProveedor.objects.select_related(
+            'proveedor').order_by('-fecha_pedido', '-pk')[:NUMERO_RECIENTES]),
+        'ordenes_recientes': list(OrdenVenta.objects.select_related(
+            'cliente').order_by('-fecha_orden', '-pk')[:NUMERO_RECIENTES]),
+    }
+
+
+def estadisticas_dashboard():
+    """Contadores y documentos recientes del dashboard (desde la caché si existe)"""
+    return cache.get_or_set(
+        CLAVE_CACHE_DASHBOARD, _calcular_estadisticas, DURACION_CACHE_DASHBOARD)
+
+
+def invalidar_estadisticas_dashboard():
+    """Borra la caché del dashboard cuando se confirma la transacción actual"""
+    transaction.on_commit(lambda: cache.delete(CLAVE_CACHE_DASHBOARD))
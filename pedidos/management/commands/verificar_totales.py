@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from pedidos.models import OrdenVenta, PedidoProveedor
+from pedidos.services import (
+    recalcular_totales_orden_venta, recalcular_totales_pedido_proveedor,
+    totales_descuadrados)
+
+
+class Command(BaseCommand):
+    help = ('Comprueba que los totales de órdenes y pedidos (mantenidos por '
+            'deltas) coinciden con la suma de sus líneas')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--corregir',
+            action='store_true',
+            help='Recalcula desde las líneas los totales descuadrados'
+        )
+
+    def handle(self, *args, **options):
+        documentos = [
+            ('Orden', 'numero_orden', OrdenVenta, recalcular_totales_orden_venta),
+            ('Pedido', 'numero_pedido', PedidoProveedor,
+             recalcular_totales_pedido_proveedor),
+        ]
+        total_descuadres = 0
+
+        for nombre, campo_numero, modelo, recalcular in documentos:
+            descuadradas = totales_descuadrados(modelo)
+            total_descuadres += len(descuadradas)
+
+            for cabecera in descuadradas:
+                self.stdout.write(self.style.WARNING(
+                    f'⚠️  {nombre} {getattr(cabecera, campo_numero)}: '
+                    f'subtotal {cabecera.subtotal} (esperado {cabecera.subtotal_calculado:.2f}), '
+                    f'impuestos {cabecera.impuestos} (esperado {cabecera.impuestos_calculado:.2f}), '
+                    f'total {cabecera.total}'))
+
+                if options['corregir']:
+                    with transaction.atomic():
+                        recalcular(cabecera)
+
+        if not total_descuadres:
+            self.stdout.write(self.style.SUCCESS(
+                '✅ Todos los totales cuadran con sus líneas'))
+        elif options['corregir']:
+            self.stdout.write(self.style.SUCCESS(
+                f'✅ {total_descuadres} documento(s) corregido(s)'))
+        else:
+            self.stdout.write(self.style.ERROR(
+                f'❌ {total_descuadres} documento(s) descuadrado(s). '
+                'Ejecuta con --corregir para recalcularlos'))
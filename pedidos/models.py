@@ -1,12 +1,16 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from proveedores.models import Proveedor
 from clientes.models import Cliente
 from inventario.models import Producto
 from django.core.exceptions import ValidationError
+from core.models import CamposRastreadosMixin
+from core.numeracion import siguiente_numero
 import uuid
 
 
+# Ya no se usan como default (ver core.numeracion), pero las migraciones
+# generadas antes del cambio las siguen referenciando
 def generar_codigo_pedido():
     """ Esta funcion generara un codigo unico """
 
@@ -19,7 +23,12 @@ def generar_codigo_orden():
     return f"PED-{uuid.uuid4().hex[:8].upper()}"
 
 
-class PedidoProveedor(models.Model):
+class PedidoProveedor(CamposRastreadosMixin, models.Model):
+    # Valores originales que usan los signals de inventario
+    campos_rastreados = ('estado',)
+
+    # Serie de la numeración: ORD-2026-000001
+    SERIE_NUMERACION = 'ORD'
 
     ESTADOS = [
         ("pendiente", "Pendiente"),
@@ -30,8 +39,8 @@ class PedidoProveedor(models.Model):
 
     numero_pedido = models.CharField(
         max_length=40,
-        default=generar_codigo_pedido,
         unique=True,
+        blank=True,
         editable=False,
         verbose_name="Número de Pedido"
     )
@@ -83,15 +92,37 @@ class PedidoProveedor(models.Model):
                 f'Un pedido en estado "{self.get_estado_display()}" debe tener al menos un producto.'
             )
 
+    def save(self, *args, **kwargs):
+        if self.numero_pedido:
+            return super().save(*args, **kwargs)
+        # El número se reserva en la misma transacción que el INSERT
+        using = kwargs.get('using') or 'default'
+        with transaction.atomic(using=using, savepoint=False):
+            # La serie del año del documento, no la del día en que se registra
+            fecha = self._meta.get_field('fecha_pedido').to_python(self.fecha_pedido)
+            self.numero_pedido = siguiente_numero(
+                self.SERIE_NUMERACION, anio=fecha and fecha.year, using=using)
+            super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = 'Pedido a Proveedor'
         verbose_name_plural = 'Pedidos a Proveedores'
+        indexes = [
+            # Paginación keyset del listado
+            models.Index(fields=['fecha_pedido', 'id']),
+            # Búsqueda por prefijo del número (LIKE 'ORD-2026-%') en PostgreSQL
+            models.Index(fields=['numero_pedido'], name='pedido_numero_patron_idx',
+                         opclasses=['varchar_pattern_ops']),
+        ]
 
     def __str__(self):
         return f"Número pedido: {self.numero_pedido} al proveedor: {self.proveedor}"
 
 
-class DetallePedidoProveedor(models.Model):
+class DetallePedidoProveedor(CamposRastreadosMixin, models.Model):
+    # Valores originales que usan los signals de inventario
+    campos_rastreados = ('producto', 'cantidad_pedida', 'cantidad_recibida')
+
     pedido = models.ForeignKey(
         PedidoProveedor, on_delete=models.CASCADE, related_name="detalles", verbose_name="Pedido")
     producto = models.ForeignKey(
@@ -126,7 +157,13 @@ class DetallePedidoProveedor(models.Model):
         return f"Número de pedido: {self.pedido} creado por: {self.empleado_creador}"
 
 
-class OrdenVenta(models.Model):
+class OrdenVenta(CamposRastreadosMixin, models.Model):
+    # Valores originales que usan los signals de inventario
+    campos_rastreados = ('estado',)
+
+    # Serie de la numeración: PED-2026-000001
+    SERIE_NUMERACION = 'PED'
+
     ESTADOS = [
         ("pendiente", "Pendiente"),
         ("procesando", "Procesando"),
@@ -136,8 +173,8 @@ class OrdenVenta(models.Model):
 
     numero_orden = models.CharField(
         max_length=40,
-        default=generar_codigo_orden,
         unique=True,
+        blank=True,
         editable=False,
         verbose_name="Número de Orden"
     )
@@ -165,15 +202,36 @@ class OrdenVenta(models.Model):
     actualizado_el = models.DateTimeField(
         auto_now=True, verbose_name="Actualizado el")
 
+    def save(self, *args, **kwargs):
+        if self.numero_orden:
+            return super().save(*args, **kwargs)
+        # El número se reserva en la misma transacción que el INSERT
+        using = kwargs.get('using') or 'default'
+        with transaction.atomic(using=using, savepoint=False):
+            # La serie del año del documento, no la del día en que se registra
+            fecha = self._meta.get_field('fecha_orden').to_python(self.fecha_orden)
+            self.numero_orden = siguiente_numero(
+                self.SERIE_NUMERACION, anio=fecha and fecha.year, using=using)
+            super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = 'Orden de Venta'
         verbose_name_plural = 'Órdenes de Venta'
+        indexes = [
+            # Paginación keyset del listado
+            models.Index(fields=['fecha_orden', 'id']),
+            # Búsqueda por prefijo del número (LIKE 'PED-2026-%') en PostgreSQL
+            models.Index(fields=['numero_orden'], name='orden_numero_patron_idx',
+                         opclasses=['varchar_pattern_ops']),
+        ]
 
     def __str__(self):
         return f"Número de orden: {self.numero_orden} para el cliente: {self.cliente}"
 
 
-class DetalleOrdenVenta(models.Model):
+class DetalleOrdenVenta(CamposRastreadosMixin, models.Model):
+    # Valores originales que usan los signals de inventario
+    campos_rastreados = ('producto', 'cantidad')
 
     empleado_creador = models.ForeignKey(
         User, on_delete=models.PROTECT, null=True, verbose_name="Empleado Creador")
@@ -0,0 +1,360 @@
+"""
+Operaciones en bloque sobre pedidos y órdenes de venta.
+
+Estas funciones trabajan con todas las líneas de un documento a la vez
+(bulk_create / bulk_update) y aplican el efecto en inventario con un único
+movimiento por producto, en lugar de guardar línea a línea y depender de
+los signals de cada detalle.
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
+from django.utils import timezone
+from inventario.models import Producto, MovimientoStock
+from inventario.services import registrar_movimientos
+from .models import DetalleOrdenVenta, DetallePedidoProveedor, OrdenVenta, PedidoProveedor
+from .estadisticas import invalidar_estadisticas_dashboard
+from .signals import (
+    ESTADOS_CON_RESERVA, reservar_stock_orden, stock_aportado_pedido_proveedor)
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Filas por sentencia INSERT/UPDATE en las operaciones masivas
+TAMANO_LOTE_INSERT = 500
+
+CENTIMO = Decimal('0.01')
+
+# Estados a los que puede llevar una recepción de mercancía
+ESTADOS_RECEPCION = ['recibido_parcial', 'recibido_completo']
+
+# Pedidos que ya no admiten recepciones
+ESTADOS_FINALES_PEDIDO = ['recibido_completo', 'cancelado']
+
+
+def validar_productos(producto_ids):
+    """Comprueba en una sola consulta que todos los productos existen"""
+    producto_ids = {int(producto_id) for producto_id in producto_ids}
+    existentes = set(Producto.objects.filter(
+        id__in=producto_ids).values_list('id', flat=True))
+    faltantes = producto_ids - existentes
+    if faltantes:
+        raise ValueError(
+            f"Productos inexistentes: {', '.join(str(p) for p in sorted(faltantes))}")
+
+
+def crear_detalles_orden_venta(orden, lineas, empleado=None):
+    """
+    Crea todas las líneas de una orden con bulk_create y reserva el stock
+    con un movimiento por producto. Cada línea es un diccionario con
+    producto_id, cantidad, precio_unitario, descuento_linea e igic_porcentaje.
+    """
+    return guardar_detalles_orden_venta(
+        orden, preparar_detalles_orden_venta(lineas, empleado))
+
+
+def preparar_detalles_orden_venta(lineas, empleado=None):
+    """
+    Valida las líneas y calcula sus importes sin guardarlas ni asignarles
+    orden, para poder crear la cabecera ya con sus totales
+    """
+    if not lineas:
+        return []
+
+    validar_productos(linea['producto_id'] for linea in lineas)
+
+    detalles = []
+    for linea in lineas:
+        cantidad = linea['cantidad']
+        precio_unitario = Decimal(str(linea['precio_unitario']))
+        descuento_linea = Decimal(str(linea.get('descuento_linea') or 0))
+        igic_porcentaje = Decimal(str(linea['igic_porcentaje']))
+
+        if cantidad <= 0:
+            raise ValueError('La cantidad de cada línea debe ser mayor que 0')
+
+        # Subtotal sin IGIC, IGIC de la línea y subtotal final (con IGIC),
+        # redondeados a céntimos como las líneas que se añaden una a una
+        subtotal_sin_igic = (cantidad * precio_unitario) - descuento_linea
+        igic_importe = redondear_importe(subtotal_sin_igic * igic_porcentaje / 100)
+
+        detalles.append(DetalleOrdenVenta(
+            producto_id=linea['producto_id'],
+            empleado_creador=empleado,
+            cantidad=cantidad,
+            precio_unitario=precio_unitario,
+            descuento_linea=descuento_linea,
+            igic_porcentaje=igic_porcentaje,
+            igic_importe=igic_importe,
+            subtotal=redondear_importe(subtotal_sin_igic + igic_importe),
+        ))
+    return detalles
+
+
+def guardar_detalles_orden_venta(orden, detalles):
+    """Guarda con bulk_create las líneas preparadas y reserva su stock"""
+    if not detalles:
+        return []
+
+    for detalle in detalles:
+        detalle.orden = orden
+
+    with transaction.atomic():
+        detalles = DetalleOrdenVenta.objects.bulk_create(
+            detalles, batch_size=TAMANO_LOTE_INSERT)
+
+        # bulk_create no dispara los signals: la reserva se hace aquí en bloque
+        if orden.estado in ESTADOS_CON_RESERVA:
+            reservar_stock_orden(orden, detalles)
+
+    logger.info(
+        f"Orden {orden.pk}: {len(detalles)} líneas creadas en bloque")
+    return detalles
+
+
+class RecepcionInvalida(ValueError):
+    """Recepción rechazada sin aplicar nada; `errores` tiene un mensaje por línea"""
+
+    def __init__(self, errores):
+        super().__init__(' '.join(errores))
+        self.errores = errores
+
+
+def registrar_recepcion_pedido_proveedor(pedido, cantidades_recibidas,
+                                         estado='recibido_parcial', notas=None,
+                                         almacen_id=None):
+    """
+    Registra una recepción de mercancía completa. `cantidades_recibidas` es
+    {detalle_id: cantidad_recibida} (el total recibido de cada línea, no el
+    incremento). Actualiza las líneas con un bulk_update, el inventario con un
+    movimiento por producto y el estado del pedido, sin pasar por los signals
+    de cada detalle. La mercancía entra en `almacen_id` (el principal si no
+    se indica). Todas las líneas se validan antes de escribir: si alguna es
+    inválida, o el pedido ya está recibido por completo o cancelado, se lanza
+    RecepcionInvalida y no se aplica nada. Devuelve las líneas actualizadas.
+    """
+    if estado not in ESTADOS_RECEPCION:
+        raise ValueError(f'Estado de recepción no válido: {estado}')
+
+    ahora = timezone.now()
+
+    with transaction.atomic():
+        # Bloquear el pedido serializa dos recepciones simultáneas del mismo pedido
+        pedido_bloqueado = PedidoProveedor.objects.select_for_update().get(pk=pedido.pk)
+        estado_anterior = pedido_bloqueado.estado
+        if estado_anterior in ESTADOS_FINALES_PEDIDO:
+            raise RecepcionInvalida([
+                f'El pedido está {pedido_bloqueado.get_estado_display().lower()} '
+                f'y no admite recepciones.'])
+        detalles = {detalle.id: detalle for detalle in pedido_bloqueado.detalles.all()}
+
+        errores = [
+            f'Cantidad inválida para la línea {detalle_id} (máximo {detalles[detalle_id].cantidad_pedida}).'
+            for detalle_id, cantidad in sorted(cantidades_recibidas.items())
+            if detalle_id in detalles
+            and not 0 <= cantidad <= detalles[detalle_id].cantidad_pedida
+        ]
+        desconocidos = set(cantidades_recibidas) - set(detalles)
+        if desconocidos:
+            errores.append(
+                f"Líneas que no pertenecen al pedido: {', '.join(str(d) for d in sorted(desconocidos))}.")
+        if errores:
+            raise RecepcionInvalida(errores)
+
+        deltas = {}
+        actualizados = []
+        for detalle in detalles.values():
+            cantidad_anterior = detalle.cantidad_recibida
+            if estado == 'recibido_completo':
+                cantidad_nueva = detalle.cantidad_pedida
+            else:
+                cantidad_nueva = cantidades_recibidas.get(detalle.id, cantidad_anterior)
+
+            aportado_antes = stock_aportado_pedido_proveedor(
+                estado_anterior, detalle.cantidad_pedida, cantidad_anterior)
+            aportado_despues = stock_aportado_pedido_proveedor(
+                estado, detalle.cantidad_pedida, cantidad_nueva)
+            if aportado_despues != aportado_antes:
+                deltas[detalle.producto_id] = deltas.get(
+                    detalle.producto_id, 0) + aportado_despues - aportado_antes
+
+            if cantidad_nueva != cantidad_anterior:
+                detalle.cantidad_recibida = cantidad_nueva
+                detalle.actualizado_el = ahora
+                actualizados.append(detalle)
+
+        if actualizados:
+            DetallePedidoProveedor.objects.bulk_update(
+                actualizados, ['cantidad_recibida', 'actualizado_el'], batch_size=TAMANO_LOTE_INSERT)
+
+        registrar_movimientos([
+            MovimientoStock(
+                producto_id=producto_id,
+                almacen_id=almacen_id,
+                delta_actual=delta_actual,
+                tipo_documento='pedido_proveedor',
+                documento_id=pedido.pk,
+            )
+            for producto_id, delta_actual in sorted(deltas.items())
+        ])
+
+        # El cambio de estado ya está aplicado en inventario: update() sin signals
+        campos = {'estado': estado, 'actualizado_el': ahora}
+        if notas is not None:
+            campos['notas'] = notas
+        PedidoProveedor.objects.filter(pk=pedido.pk).update(**campos)
+        invalidar_estadisticas_dashboard()
+
+    pedido.refresh_from_db(fields=list(campos))
+
+    logger.info(
+        f"Recepción del pedido {pedido.pk}: {len(actualizados)} líneas, "
+        f"{len(deltas)} producto(s), Estado: {estado_anterior} -> {estado}")
+    return actualizados
+
+
+def _importe(expresion):
+    """Envuelve una expresión de importe para que la BD la devuelva como Decimal"""
+    return ExpressionWrapper(
+        expresion, output_field=DecimalField(max_digits=14, decimal_places=4))
+
+
+def redondear_importe(importe):
+    """Redondea a céntimos como lo hace PostgreSQL con numeric (mitad hacia arriba)"""
+    return Decimal(importe).quantize(CENTIMO, rounding=ROUND_HALF_UP)
+
+
+def recalcular_totales_orden_venta(orden):
+    """
+    Recalcula subtotal, impuestos y total de la orden con un único SELECT
+    agregado sobre sus líneas y un único UPDATE de la cabecera.
+    """
+    totales = orden.detalles.aggregate(
+        subtotal=Sum(_importe(
+            F('cantidad') * F('precio_unitario') - F('descuento_linea')),
+            default=Decimal('0')),
+        impuestos=Sum('igic_importe', default=Decimal('0')),
+    )
+
+    # El descuento general solo se aplica al subtotal sin IGIC
+    orden.subtotal = redondear_importe(totales['subtotal'])
+    orden.impuestos = redondear_importe(totales['impuestos'])
+    orden.total = orden.subtotal - \
+        Decimal(str(orden.descuento or 0)) + orden.impuestos
+
+    OrdenVenta.objects.filter(pk=orden.pk).update(
+        subtotal=orden.subtotal,
+        impuestos=orden.impuestos,
+        total=orden.total,
+        actualizado_el=timezone.now(),
+    )
+    invalidar_estadisticas_dashboard()
+    return orden
+
+
+def recalcular_totales_pedido_proveedor(pedido):
+    """
+    Recalcula subtotal (sin IGIC), impuestos y total del pedido con un único
+    SELECT agregado sobre sus líneas y un único UPDATE de la cabecera.
+    """
+    totales = pedido.detalles.aggregate(
+        subtotal=Sum(_importe(
+            F('cantidad_pedida') * F('precio_unitario')), default=Decimal('0')),
+        impuestos=Sum('igic_importe', default=Decimal('0')),
+    )
+
+    pedido.subtotal = redondear_importe(totales['subtotal'])
+    pedido.impuestos = redondear_importe(totales['impuestos'])
+    pedido.total = pedido.subtotal + pedido.impuestos
+
+    PedidoProveedor.objects.filter(pk=pedido.pk).update(
+        subtotal=pedido.subtotal,
+        impuestos=pedido.impuestos,
+        total=pedido.total,
+        actualizado_el=timezone.now(),
+    )
+    invalidar_estadisticas_dashboard()
+    return pedido
+
+
+def _valor_guardado(instancia, campo):
+    """Valor Decimal tal y como lo guarda la BD (mismo redondeo que el campo)"""
+    field = instancia._meta.get_field(campo)
+    valor = field.to_python(getattr(instancia, campo) or 0)
+    return valor.quantize(Decimal(1).scaleb(-field.decimal_places), rounding=ROUND_HALF_UP)
+
+
+def importes_linea_orden_venta(detalle):
+    """Aportación de una línea a la cabecera: (subtotal sin IGIC, IGIC)"""
+    subtotal = detalle.cantidad * _valor_guardado(detalle, 'precio_unitario') - \
+        _valor_guardado(detalle, 'descuento_linea')
+    return subtotal, _valor_guardado(detalle, 'igic_importe')
+
+
+def importes_linea_pedido_proveedor(detalle):
+    """Aportación de una línea a la cabecera: (subtotal sin IGIC, IGIC)"""
+    subtotal = detalle.cantidad_pedida * \
+        _valor_guardado(detalle, 'precio_unitario')
+    return subtotal, _valor_guardado(detalle, 'igic_importe')
+
+
+def _aplicar_delta_totales(modelo, pk, subtotal, impuestos):
+    """UPDATE atómico de la cabecera: SET subtotal = subtotal + delta, ..."""
+    modelo.objects.filter(pk=pk).update(
+        subtotal=F('subtotal') + subtotal,
+        impuestos=F('impuestos') + impuestos,
+        total=F('total') + subtotal + impuestos,
+        actualizado_el=timezone.now(),
+    )
+    invalidar_estadisticas_dashboard()
+
+
+def sumar_linea_orden_venta(detalle, signo=1):
+    """
+    Ajusta los totales de la orden con la aportación de una sola línea
+    (signo=-1 al eliminarla), sin volver a leer el resto de líneas.
+    """
+    subtotal, impuestos = importes_linea_orden_venta(detalle)
+    _aplicar_delta_totales(
+        OrdenVenta, detalle.orden_id, signo * subtotal, signo * impuestos)
+
+
+def sumar_linea_pedido_proveedor(detalle, signo=1):
+    """
+    Ajusta los totales del pedido con la aportación de una sola línea
+    (signo=-1 al eliminarla), sin volver a leer el resto de líneas.
+    """
+    subtotal, impuestos = importes_linea_pedido_proveedor(detalle)
+    _aplicar_delta_totales(
+        PedidoProveedor, detalle.pedido_id, signo * subtotal, signo * impuestos)
+
+
+def totales_descuadrados(modelo):
+    """
+    Compara los totales guardados de cada cabecera con los recalculados a
+    partir de sus líneas, en una sola consulta agregada. Devuelve la lista
+    de cabeceras descuadradas con los atributos subtotal_calculado e
+    impuestos_calculado.
+    """
+    if modelo is OrdenVenta:
+        importe_linea = F('detalles__cantidad') * F('detalles__precio_unitario') - \
+            F('detalles__descuento_linea')
+    else:
+        importe_linea = F('detalles__cantidad_pedida') * \
+            F('detalles__precio_unitario')
+
+    cabeceras = modelo.objects.annotate(
+        subtotal_calculado=Sum(_importe(importe_linea), default=Decimal('0')),
+        impuestos_calculado=Sum('detalles__igic_importe', default=Decimal('0')),
+    ).order_by('pk')
+
+    descuadradas = []
+    for cabecera in cabeceras.iterator(chunk_size=TAMANO_LOTE_INSERT):
+        subtotal = redondear_importe(cabecera.subtotal_calculado)
+        impuestos = redondear_importe(cabecera.impuestos_calculado)
+        descuento = getattr(cabecera, 'descuento', None) or Decimal('0')
+        if (cabecera.subtotal != subtotal or cabecera.impuestos != impuestos
+                or cabecera.total != subtotal - descuento + impuestos):
+            descuadradas.append(cabecera)
+    return descuadradas
@@ -6,15 +6,21 @@ Nota: estado enviado no se refleja en los flujos visuales se mantiene en los
 signasl para un futuro uso
 """
 
-from django.db.models.signals import post_save, pre_save, pre_delete, post_delete
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
 from django.db import transaction
+from django.db.models import Sum
 from .models import OrdenVenta, DetalleOrdenVenta, PedidoProveedor, DetallePedidoProveedor
-from inventario.models import Inventario, Producto
+from .estadisticas import invalidar_estadisticas_dashboard
+from inventario.models import Inventario, MovimientoStock, StockProducto
+from inventario.services import bloquear_inventarios, registrar_movimientos
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Estados de la orden de venta en los que sus líneas mantienen stock reservado
+ESTADOS_CON_RESERVA = ['pendiente', 'procesando']
+
 # ===========================================
 # SIGNALS PARA ÓRDENES DE VENTA
 # ===========================================
@@ -25,7 +31,7 @@ def detalle_orden_venta_post_save(sender, instance, created, **kwargs):
     """Maneja la creación y modificación de detalles de orden de venta"""
     try:
         # Solo procesar si la orden está en estado que requiere reserva
-        if instance.orden.estado not in ['pendiente', 'procesando']:
+        if instance.orden.estado not in ESTADOS_CON_RESERVA:
             logger.info(
                 f"Orden en estado '{instance.orden.estado}' - No se procesa reserva para detalle")
             return
@@ -33,19 +39,20 @@ def detalle_orden_venta_post_save(sender, instance, created, **kwargs):
         if created:
             # NUEVO DETALLE: Reservar stock (ahora siempre se puede)
             logger.info(
-                f"Creando nuevo detalle - Producto: {instance.producto.nombre}, Cantidad: {instance.cantidad}")
+                f"Creando nuevo detalle - Producto: {instance.producto_id}, Cantidad: {instance.cantidad}")
             reservar_stock_detalle_orden(instance)
         else:
-            # DETALLE MODIFICADO: Ajustar reservas
-            cantidad_anterior = getattr(instance, '_cantidad_anterior', 0)
-            producto_anterior = getattr(instance, '_producto_anterior', None)
+            # DETALLE MODIFICADO: Ajustar reservas (valores originales de from_db)
+            cantidad_anterior = instance.previous('cantidad') or 0
+            producto_anterior_id = instance.previous('producto')
 
             # Caso 1: Cambió el producto
-            if producto_anterior and producto_anterior != instance.producto:
+            if producto_anterior_id and instance.has_changed('producto'):
                 logger.info(
-                    f"Cambio de producto: {producto_anterior.nombre} -> {instance.producto.nombre}")
+                    f"Cambio de producto: {producto_anterior_id} -> {instance.producto_id}")
                 # Liberar reserva del producto anterior
-                liberar_reserva_producto(producto_anterior, cantidad_anterior)
+                liberar_reserva_producto(
+                    producto_anterior_id, cantidad_anterior, instance.orden_id)
                 # Reservar para el nuevo producto
                 reservar_stock_detalle_orden(instance)
 
@@ -53,7 +60,7 @@ def detalle_orden_venta_post_save(sender, instance, created, **kwargs):
             elif cantidad_anterior != instance.cantidad:
                 diferencia = instance.cantidad - cantidad_anterior
                 logger.info(
-                    f"Cambio de cantidad para {instance.producto.nombre}: {cantidad_anterior} -> {instance.cantidad} (diferencia: {diferencia})")
+                    f"Cambio de cantidad para {instance.producto_id}: {cantidad_anterior} -> {instance.cantidad} (diferencia: {diferencia})")
 
                 if diferencia > 0:
                     # Aumentó la cantidad - Reservar más stock
@@ -67,31 +74,16 @@ def detalle_orden_venta_post_save(sender, instance, created, **kwargs):
         raise
 
 
-@receiver(pre_save, sender=DetalleOrdenVenta)
-def detalle_orden_venta_pre_save(sender, instance, **kwargs):
-    """Captura la cantidad anterior del detalle antes de guardar"""
-    if instance.pk:
-        try:
-            detalle_anterior = DetalleOrdenVenta.objects.get(pk=instance.pk)
-            instance._cantidad_anterior = detalle_anterior.cantidad
-            instance._producto_anterior = detalle_anterior.producto
-        except DetalleOrdenVenta.DoesNotExist:
-            instance._cantidad_anterior = 0
-            instance._producto_anterior = None
-    else:
-        instance._cantidad_anterior = 0
-        instance._producto_anterior = None
-
-
 @receiver(pre_delete, sender=DetalleOrdenVenta)
 def detalle_orden_venta_pre_delete(sender, instance, **kwargs):
     """Libera el stock reservado cuando se elimina un detalle"""
     try:
         # Solo procesar si la orden está en estado que requiere reserva
-        if instance.orden.estado in ['pendiente', 'procesando']:
+        if instance.orden.estado in ESTADOS_CON_RESERVA:
             logger.info(
-                f"Eliminando detalle - Producto: {instance.producto.nombre}, Cantidad: {instance.cantidad}")
-            liberar_reserva_producto(instance.producto, instance.cantidad)
+                f"Eliminando detalle - Producto: {instance.producto_id}, Cantidad: {instance.cantidad}")
+            liberar_reserva_producto(
+                instance.producto_id, instance.cantidad, instance.orden_id)
         else:
             logger.info(
                 f"Eliminando detalle de orden en estado '{instance.orden.estado}' - No se libera reserva")
@@ -101,21 +93,6 @@ def detalle_orden_venta_pre_delete(sender, instance, **kwargs):
         # No hacer raise aquí para no bloquear la eliminación
 
 
-@receiver(pre_save, sender=OrdenVenta)
-def orden_venta_pre_save(sender, instance, **kwargs):
-    """Captura el estado anterior de la orden antes de guardar"""
-    if instance.pk:
-        try:
-            orden_anterior = OrdenVenta.objects.get(pk=instance.pk)
-            instance._estado_anterior = orden_anterior.estado
-            logger.info(
-                f"Estado anterior capturado: {orden_anterior.estado} -> {instance.estado}")
-        except OrdenVenta.DoesNotExist:
-            instance._estado_anterior = None
-    else:
-        instance._estado_anterior = None
-
-
 @receiver(post_save, sender=OrdenVenta)
 def orden_venta_post_save(sender, instance, created, **kwargs):
     """Maneja los cambios de estado en órdenes de venta"""
@@ -125,7 +102,7 @@ def orden_venta_post_save(sender, instance, created, **kwargs):
         logger.info(f"Orden de venta creada: {instance.id}")
         return
 
-    estado_anterior = getattr(instance, '_estado_anterior', None)
+    estado_anterior = instance.previous('estado')
     estado_actual = instance.estado
 
     logger.info(
@@ -135,69 +112,71 @@ def orden_venta_post_save(sender, instance, created, **kwargs):
         logger.info("No hubo cambio de estado, saltando procesamiento")
         return  # No hubo cambio de estado
 
-    # Procesar cada detalle de la orden
-
-    for detalle in instance.detalles.all():
-        procesar_cambio_estado_orden_venta(
-            detalle, estado_anterior, estado_actual)
-
-
-def procesar_cambio_estado_orden_venta(detalle, estado_anterior, estado_actual):
-    """Procesa el cambio de estado para un detalle específico de orden de venta - SIMPLIFICADO"""
+    # Procesar toda la orden en una sola operación
+    procesar_cambio_estado_orden_venta(instance, estado_anterior, estado_actual)
+
+
+# Efecto de cada estado sobre el inventario por unidad vendida:
+# (cantidad_actual, cantidad_reservada). Los estados reservan o consumen stock;
+# 'cancelado' (o una orden sin estado previo) no tiene efecto.
+EFECTO_ESTADO_ORDEN_VENTA = {
+    'pendiente': (0, 1),
+    'procesando': (0, 1),
+    'enviado': (-1, 0),
+    'entregado': (-1, 0),
+    'cancelado': (0, 0),
+}
+
+
+def delta_cambio_estado_orden_venta(estado_anterior, estado_actual):
+    """Variación por unidad (actual, reservada) al pasar de un estado a otro"""
+    actual_anterior, reservada_anterior = EFECTO_ESTADO_ORDEN_VENTA.get(
+        estado_anterior, (0, 0))
+    actual_nuevo, reservada_nuevo = EFECTO_ESTADO_ORDEN_VENTA.get(
+        estado_actual, (0, 0))
+    return actual_nuevo - actual_anterior, reservada_nuevo - reservada_anterior
+
+
+def procesar_cambio_estado_orden_venta(orden, estado_anterior, estado_actual,
+                                       almacen_id=None):
+    """
+    Procesa el cambio de estado de una orden de venta completa: agrupa las
+    líneas por producto y aplica los deltas en bloque en una sola transacción,
+    en el almacén indicado (el principal si no se indica)
+    """
     try:
-        with transaction.atomic():
-            inventario, created = Inventario.objects.select_for_update().get_or_create(
-                producto=detalle.producto,
-                defaults={'cantidad_actual': 0, 'cantidad_reservada': 0}
-            )
-
-            if created:
-                logger.info(
-                    f"Inventario creado automáticamente para {detalle.producto.nombre}")
-
-            cantidad = detalle.cantidad
-
-            logger.info(f"Procesando detalle - Producto: {detalle.producto.nombre}, "
-                        f"Cantidad: {cantidad}, Estado: {estado_anterior} -> {estado_actual}")
-
-            # 1. LIBERAR RESERVAS DEL ESTADO ANTERIOR
-            if estado_anterior in ['pendiente', 'procesando']:
-                # Estaba reservado, liberar reserva
-                inventario.cantidad_reservada -= cantidad
-                logger.info(f"Liberando reserva de {cantidad} unidades")
-
-            # 2. DEVOLVER STOCK SI VENÍA DE ENVIADO/ENTREGADO
-            if estado_anterior in ['enviado', 'entregado']:
-                # Estaba consumido, devolver al stock
-                inventario.cantidad_actual += cantidad
-                logger.info(f"Devolviendo {cantidad} unidades al stock actual")
-
-            # 3. APLICAR NUEVO ESTADO
-            if estado_actual in ['pendiente', 'procesando']:
-                # Debe estar reservado
-                inventario.cantidad_reservada += cantidad
-                logger.info(f"Reservando {cantidad} unidades")
-
-            elif estado_actual in ['enviado', 'entregado']:
-                # Debe consumir stock actual
-                inventario.cantidad_actual -= cantidad
-                logger.info(
-                    f"Consumiendo {cantidad} unidades del stock actual")
-
-            # Para 'cancelado' no hace nada adicional, solo libera lo que tenía antes
-
-            inventario.save()
-
+        factor_actual, factor_reservada = delta_cambio_estado_orden_venta(
+            estado_anterior, estado_actual)
+        if not factor_actual and not factor_reservada:
             logger.info(
-                f"✅ Inventario actualizado para {detalle.producto.nombre}: "
-                f"Actual: {inventario.cantidad_actual}, Reservada: {inventario.cantidad_reservada}")
+                f"Cambio {estado_anterior} -> {estado_actual} sin efecto en inventario")
+            return
+
+        with transaction.atomic():
+            cantidades = orden.detalles.values('producto_id').annotate(
+                cantidad_total=Sum('cantidad')).order_by('producto_id')
+
+            movimientos = [
+                MovimientoStock(
+                    producto_id=linea['producto_id'],
+                    almacen_id=almacen_id,
+                    delta_actual=factor_actual * linea['cantidad_total'],
+                    delta_reservada=factor_reservada * linea['cantidad_total'],
+                    tipo_documento='orden_venta',
+                    documento_id=orden.pk,
+                )
+                for linea in cantidades
+            ]
+            registrar_movimientos(movimientos)
+
+        logger.info(
+            f"✅ Inventario actualizado para la orden {orden.pk}: "
+            f"{len(movimientos)} producto(s), Estado: {estado_anterior} -> {estado_actual}")
 
     except Exception as e:
         logger.error(
             f"❌ Error procesando cambio de estado orden venta: {str(e)}")
-        logger.error(
-            f"Detalle: Producto={detalle.producto.nombre}, Cantidad={detalle.cantidad}")
-        logger.error(f"Estados: {estado_anterior} -> {estado_actual}")
+        logger.error(f"Orden: {orden.pk}, Estados: {estado_anterior} -> {estado_actual}")
         raise
 
 
@@ -206,123 +185,151 @@ def procesar_cambio_estado_orden_venta(detalle, estado_anterior, estado_actual):
 # ===========================================
 
 
-def reservar_stock_detalle_orden(detalle):
+def _movimiento_orden(detalle, producto_id=None, delta_actual=0, delta_reservada=0,
+                      almacen_id=None):
+    """Construye el movimiento de stock asociado a una línea de orden de venta"""
+    return MovimientoStock(
+        producto_id=producto_id or detalle.producto_id,
+        almacen_id=almacen_id,
+        delta_actual=delta_actual,
+        delta_reservada=delta_reservada,
+        tipo_documento='orden_venta',
+        documento_id=detalle.orden_id,
+    )
+
+
+def reservar_stock_detalle_orden(detalle, almacen_id=None):
     """Reserva stock cuando se agrega un detalle a una orden (ahora siempre posible)"""
     try:
-        with transaction.atomic():
-            inventario, created = Inventario.objects.select_for_update().get_or_create(
-                producto=detalle.producto,
-                defaults={'cantidad_actual': 0, 'cantidad_reservada': 0}
-            )
+        cantidad = detalle.cantidad
 
-            if created:
-                logger.info(
-                    f"Inventario creado automáticamente para {detalle.producto.nombre}")
+        # Ahora siempre reservamos, sin importar el stock disponible
+        registrar_movimientos([_movimiento_orden(
+            detalle, delta_reservada=cantidad, almacen_id=almacen_id)])
+
+        logger.info(
+            f"✅ Stock reservado - Producto: {detalle.producto_id}, "
+            f"Cantidad: {cantidad}")
 
-            cantidad = detalle.cantidad
+    except Exception as e:
+        logger.error(f"❌ Error reservando stock: {str(e)}")
+        raise
 
-            # Ahora siempre reservamos, sin importar el stock disponible
-            inventario.cantidad_reservada += cantidad
-            inventario.save()
 
-            logger.info(
-                f"✅ Stock reservado - Producto: {detalle.producto.nombre}, "
-                f"Cantidad: {cantidad}, "
-                f"Actual: {inventario.cantidad_actual}, Reservada: {inventario.cantidad_reservada}")
+def reservar_stock_orden(orden, detalles, almacen_id=None):
+    """Reserva en bloque el stock de varias líneas: un movimiento por producto"""
+    try:
+        cantidades = {}
+        for detalle in detalles:
+            cantidades[detalle.producto_id] = cantidades.get(
+                detalle.producto_id, 0) + detalle.cantidad
+
+        registrar_movimientos([
+            MovimientoStock(
+                producto_id=producto_id,
+                almacen_id=almacen_id,
+                delta_reservada=cantidad,
+                tipo_documento='orden_venta',
+                documento_id=orden.pk,
+            )
+            for producto_id, cantidad in sorted(cantidades.items())
+        ])
+
+        logger.info(
+            f"✅ Stock reservado en bloque - Orden: {orden.pk}, "
+            f"Productos: {len(cantidades)}, Líneas: {len(detalles)}")
 
     except Exception as e:
-        logger.error(f"❌ Error reservando stock: {str(e)}")
+        logger.error(f"❌ Error reservando stock de la orden: {str(e)}")
         raise
 
 
-def reservar_stock_adicional(detalle, cantidad_adicional):
+def reservar_stock_adicional(detalle, cantidad_adicional, almacen_id=None):
     """Reserva stock adicional cuando se aumenta la cantidad de un detalle"""
     try:
-        with transaction.atomic():
-            inventario = Inventario.objects.select_for_update().get(producto=detalle.producto)
+        # Ahora siempre reservamos la cantidad adicional
+        registrar_movimientos([_movimiento_orden(
+            detalle, delta_reservada=cantidad_adicional, almacen_id=almacen_id)])
 
-            # Ahora siempre reservamos la cantidad adicional
-            inventario.cantidad_reservada += cantidad_adicional
-            inventario.save()
-
-            logger.info(
-                f"✅ Stock adicional reservado - Producto: {detalle.producto.nombre}, "
-                f"Cantidad adicional: {cantidad_adicional}, "
-                f"Reservada total: {inventario.cantidad_reservada}")
+        logger.info(
+            f"✅ Stock adicional reservado - Producto: {detalle.producto_id}, "
+            f"Cantidad adicional: {cantidad_adicional}")
 
     except Exception as e:
         logger.error(f"❌ Error reservando stock adicional: {str(e)}")
         raise
 
 
-def ajustar_reserva_detalle_orden(detalle, diferencia_cantidad):
-    """Ajusta la reserva cuando se modifica la cantidad de un detalle"""
+def ajustar_reserva_detalle_orden(detalle, diferencia_cantidad, almacen_id=None):
+    """
+    Ajusta la reserva cuando se modifica la cantidad de un detalle. Sin
+    almacén se comprueba el disponible total del producto
+    """
     try:
         with transaction.atomic():
-            inventario = Inventario.objects.select_for_update().get(producto=detalle.producto)
-
             if diferencia_cantidad > 0:
-                # Se aumentó la cantidad, verificar stock disponible
-                stock_disponible = inventario.cantidad_actual - inventario.cantidad_reservada
-                if stock_disponible >= diferencia_cantidad:
-                    inventario.cantidad_reservada += diferencia_cantidad
-                else:
+                # Se aumentó la cantidad, verificar stock disponible con la fila bloqueada
+                inventario = bloquear_inventarios(
+                    [detalle.producto_id], almacen_id).get(detalle.producto_id)
+                stock_disponible = (inventario.cantidad_actual - inventario.cantidad_reservada
+                                    if inventario else 0)
+                if stock_disponible < diferencia_cantidad:
                     raise ValueError(
                         f"Stock insuficiente para aumentar cantidad de {detalle.producto.nombre}")
-            else:
-                # Se redujo la cantidad, liberar reserva
-                inventario.cantidad_reservada += diferencia_cantidad  # diferencia es negativa
 
-            inventario.save()
+            # Si se redujo la cantidad la diferencia es negativa y libera reserva
+            registrar_movimientos([_movimiento_orden(
+                detalle, delta_reservada=diferencia_cantidad, almacen_id=almacen_id)])
 
             logger.info(
-                f"Reserva ajustada para {detalle.producto.nombre}: "
-                f"Cambio: {diferencia_cantidad}, "
-                f"Reservada total: {inventario.cantidad_reservada}")
+                f"Reserva ajustada para {detalle.producto_id}: "
+                f"Cambio: {diferencia_cantidad}")
 
     except Exception as e:
         logger.error(f"Error ajustando reserva detalle orden: {str(e)}")
         raise
 
 
-def liberar_stock_detalle(detalle, cantidad_a_liberar):
+def liberar_stock_detalle(detalle, cantidad_a_liberar, almacen_id=None):
     """Libera stock cuando se reduce la cantidad de un detalle"""
     try:
-        with transaction.atomic():
-            inventario = Inventario.objects.select_for_update().get(producto=detalle.producto)
+        # Simplemente liberamos la cantidad solicitada (puede generar reservas negativas)
+        registrar_movimientos([_movimiento_orden(
+            detalle, delta_reservada=-cantidad_a_liberar, almacen_id=almacen_id)])
 
-            # Simplemente liberamos la cantidad solicitada (puede generar reservas negativas)
-            inventario.cantidad_reservada -= cantidad_a_liberar
-            inventario.save()
-
-            logger.info(
-                f"✅ Stock liberado - Producto: {detalle.producto.nombre}, "
-                f"Cantidad liberada: {cantidad_a_liberar}, "
-                f"Reservada restante: {inventario.cantidad_reservada}")
+        logger.info(
+            f"✅ Stock liberado - Producto: {detalle.producto_id}, "
+            f"Cantidad liberada: {cantidad_a_liberar}")
 
     except Exception as e:
         logger.error(f"❌ Error liberando stock: {str(e)}")
         raise
 
 
-def liberar_reserva_producto(producto, cantidad):
+def liberar_reserva_producto(producto_id, cantidad, orden_id=None, almacen_id=None):
     """Libera la reserva completa de un producto (para eliminación o cambio de producto)"""
     try:
-        with transaction.atomic():
-            inventario = Inventario.objects.select_for_update().get(producto=producto)
+        inventarios = Inventario.objects.filter(producto_id=producto_id)
+        if almacen_id is not None:
+            inventarios = inventarios.filter(almacen_id=almacen_id)
+        if not inventarios.exists():
+            logger.warning(
+                f"⚠️ No se encontró inventario para liberar del producto {producto_id}")
+            return
 
-            # Simplemente liberamos la cantidad solicitada
-            inventario.cantidad_reservada -= cantidad
-            inventario.save()
+        # Simplemente liberamos la cantidad solicitada
+        registrar_movimientos([MovimientoStock(
+            producto_id=producto_id,
+            almacen_id=almacen_id,
+            delta_reservada=-cantidad,
+            tipo_documento='orden_venta',
+            documento_id=orden_id,
+        )])
 
-            logger.info(
-                f"✅ Reserva liberada - Producto: {producto.nombre}, "
-                f"Cantidad liberada: {cantidad}, "
-                f"Reservada restante: {inventario.cantidad_reservada}")
+        logger.info(
+            f"✅ Reserva liberada - Producto: {producto_id}, "
+            f"Cantidad liberada: {cantidad}")
 
-    except Inventario.DoesNotExist:
-        logger.warning(
-            f"⚠️ No se encontró inventario para liberar del producto {producto.nombre}")
     except Exception as e:
         logger.error(f"❌ Error liberando reserva: {str(e)}")
         raise
@@ -332,10 +339,17 @@ def liberar_reserva_producto(producto, cantidad):
 # FUNCIÓN PARA OBTENER ESTADO DEL INVENTARIO
 # ===========================================
 
-def obtener_estado_inventario(producto):
-    """Función auxiliar para obtener el estado actual del inventario"""
+def obtener_estado_inventario(producto, almacen_id=None):
+    """
+    Función auxiliar para obtener el estado actual del inventario: el de un
+    almacén si se indica o el total del producto en todos ellos
+    """
     try:
-        inventario = Inventario.objects.get(producto=producto)
+        if almacen_id is None:
+            inventario = StockProducto.objects.get(producto=producto)
+        else:
+            inventario = Inventario.objects.get(
+                producto=producto, almacen_id=almacen_id)
         stock_disponible = inventario.cantidad_actual - inventario.cantidad_reservada
 
         return {
@@ -345,7 +359,7 @@ def obtener_estado_inventario(producto):
             'stock_disponible': stock_disponible,
             'inventario_negativo': inventario.cantidad_actual < 0 or inventario.cantidad_reservada < 0
         }
-    except Inventario.DoesNotExist:
+    except (Inventario.DoesNotExist, StockProducto.DoesNotExist):
         return {
             'existe': False,
             'cantidad_actual': 0,
@@ -360,35 +374,21 @@ def obtener_estado_inventario(producto):
 # ===========================================
 
 
-@receiver(pre_save, sender=PedidoProveedor)
-def pedido_proveedor_pre_save(sender, instance, **kwargs):
-    """Captura el estado anterior del pedido a proveedor antes de guardar"""
-    if instance.pk:
-        try:
-            instance._estado_anterior = PedidoProveedor.objects.get(
-                pk=instance.pk).estado
-        except PedidoProveedor.DoesNotExist:
-            instance._estado_anterior = None
-    else:
-        instance._estado_anterior = None
-
-
 @receiver(post_save, sender=PedidoProveedor)
 def pedido_proveedor_post_save(sender, instance, created, **kwargs):
     """Maneja los cambios de estado en pedidos a proveedores"""
     if created:
         return
 
-    estado_anterior = getattr(instance, '_estado_anterior', None)
+    estado_anterior = instance.previous('estado')
     estado_actual = instance.estado
 
     if estado_anterior == estado_actual:
         return
 
-    # Procesar cada detalle del pedido
-    for detalle in instance.detalles.all():
-        procesar_cambio_estado_pedido_proveedor(
-            detalle, estado_anterior, estado_actual)
+    # Procesar todo el pedido en una sola operación
+    procesar_cambio_estado_pedido_proveedor(
+        instance, estado_anterior, estado_actual)
 
 
 @receiver(post_save, sender=DetallePedidoProveedor)
@@ -401,96 +401,87 @@ def detalle_pedido_proveedor_post_save(sender, instance, created, **kwargs):
     if instance.pedido.estado != 'recibido_parcial':
         return
 
-    cantidad_recibida_anterior = getattr(
-        instance, '_cantidad_recibida_anterior', 0)
+    cantidad_recibida_anterior = instance.previous('cantidad_recibida') or 0
     cantidad_recibida_actual = instance.cantidad_recibida
 
     if cantidad_recibida_anterior != cantidad_recibida_actual:
         diferencia = cantidad_recibida_actual - cantidad_recibida_anterior
 
         if diferencia != 0:
-            actualizar_inventario_por_recepcion(instance.producto, diferencia)
-
-
-@receiver(pre_save, sender=DetallePedidoProveedor)
-def detalle_pedido_proveedor_pre_save(sender, instance, **kwargs):
-    """Captura valores anteriores del detalle de pedido a proveedor"""
-    if instance.pk:
-        try:
-            detalle_anterior = DetallePedidoProveedor.objects.get(
-                pk=instance.pk)
-            instance._cantidad_recibida_anterior = detalle_anterior.cantidad_recibida
-            instance._cantidad_pedida_anterior = detalle_anterior.cantidad_pedida
-            instance._producto_anterior = detalle_anterior.producto
-        except DetallePedidoProveedor.DoesNotExist:
-            instance._cantidad_recibida_anterior = 0
-            instance._cantidad_pedida_anterior = 0
-            instance._producto_anterior = None
-    else:
-        instance._cantidad_recibida_anterior = 0
-        instance._cantidad_pedida_anterior = 0
-        instance._producto_anterior = None
-
-
-def procesar_cambio_estado_pedido_proveedor(detalle, estado_anterior, estado_actual):
-    """Procesa el cambio de estado para un detalle específico de pedido a proveedor"""
+            actualizar_inventario_por_recepcion(
+                instance.producto_id, diferencia, instance.pedido_id)
+
+
+def _movimiento_pedido(detalle, delta_actual, almacen_id=None):
+    """Construye el movimiento de stock asociado a una línea de pedido a proveedor"""
+    return MovimientoStock(
+        producto_id=detalle.producto_id,
+        almacen_id=almacen_id,
+        delta_actual=delta_actual,
+        tipo_documento='pedido_proveedor',
+        documento_id=detalle.pedido_id,
+    )
+
+
+def stock_aportado_pedido_proveedor(estado, cantidad_pedida, cantidad_recibida):
+    """
+    Unidades que una línea de pedido ha sumado al inventario en un estado dado:
+    todo lo pedido si está recibido completo, lo recibido si es parcial y
+    nada en pendiente, enviado o cancelado
+    """
+    if estado == 'recibido_completo':
+        return cantidad_pedida
+    if estado == 'recibido_parcial':
+        return cantidad_recibida
+    return 0
+
+
+def procesar_cambio_estado_pedido_proveedor(pedido, estado_anterior, estado_actual,
+                                            almacen_id=None):
+    """
+    Procesa el cambio de estado de un pedido a proveedor completo. Las
+    cantidades recibidas se actualizan con bulk_update (sin volver a disparar
+    los signals de cada detalle) y el inventario con un movimiento por producto
+    en el almacén de recepción (el principal si no se indica)
+    """
     try:
         with transaction.atomic():
-            inventario, created = Inventario.objects.select_for_update().get_or_create(
-                producto=detalle.producto,
-                defaults={'cantidad_actual': 0, 'cantidad_reservada': 0}
-            )
+            detalles = list(pedido.detalles.all())
+            deltas = {}
+            recibidos = []
 
-            if created:
-                logger.info(
-                    f"Inventario creado automáticamente para {detalle.producto.nombre}")
-
-            # Lógica según el cambio de estado
-            if estado_actual == 'recibido_completo':
-                if estado_anterior == 'recibido_parcial':
-                    # Sumar solo lo que falta por recibir
-                    cantidad_pendiente = detalle.cantidad_pedida - detalle.cantidad_recibida
-                    inventario.cantidad_actual += cantidad_pendiente
-                    # Actualizar cantidad_recibida para que coincida con cantidad_pedida
-                    detalle.cantidad_recibida = detalle.cantidad_pedida
-                    detalle.save()
-                elif estado_anterior in ['pendiente', 'enviado']:
-                    # Sumar toda la cantidad pedida
-                    inventario.cantidad_actual += detalle.cantidad_pedida
+            for detalle in detalles:
+                aportado_antes = stock_aportado_pedido_proveedor(
+                    estado_anterior, detalle.cantidad_pedida, detalle.cantidad_recibida)
+
+                # Al recibir completo, cantidad_recibida coincide con cantidad_pedida
+                if (estado_actual == 'recibido_completo' and
+                        detalle.cantidad_recibida != detalle.cantidad_pedida):
                     detalle.cantidad_recibida = detalle.cantidad_pedida
-                    detalle.save()
-                elif estado_anterior == 'cancelado':
-                    # Restar lo que se había restado al cancelar y sumar lo nuevo
-                    if estado_anterior == 'cancelado':
-                        # El inventario ya estaba ajustado, solo sumar lo recibido
-                        inventario.cantidad_actual += detalle.cantidad_pedida
-                        detalle.cantidad_recibida = detalle.cantidad_pedida
-                        detalle.save()
-
-            elif estado_actual == 'recibido_parcial':
-                if estado_anterior == 'recibido_completo':
-                    # Restar la diferencia entre lo que se había sumado y lo realmente recibido
-                    cantidad_a_restar = detalle.cantidad_pedida - detalle.cantidad_recibida
-                    inventario.cantidad_actual -= cantidad_a_restar
-                elif estado_anterior in ['pendiente', 'enviado']:
-                    # Sumar solo lo recibido hasta ahora
-                    inventario.cantidad_actual += detalle.cantidad_recibida
-                elif estado_anterior == 'cancelado':
-                    # Sumar lo recibido
-                    inventario.cantidad_actual += detalle.cantidad_recibida
-
-            elif estado_actual == 'cancelado' or estado_actual == 'pendiente':
-                # Restar según lo que se había sumado en el estado anterior
-                if estado_anterior == 'recibido_completo':
-                    inventario.cantidad_actual -= detalle.cantidad_pedida
-                elif estado_anterior == 'recibido_parcial':
-                    inventario.cantidad_actual -= detalle.cantidad_recibida
-                # Si venía de pendiente o enviado, no hay nada que restar
-
-            inventario.save()
-
-            logger.info(f"Inventario actualizado para {detalle.producto.nombre}: "
-                        f"Cantidad actual: {inventario.cantidad_actual}")
+                    recibidos.append(detalle)
+
+                aportado_despues = stock_aportado_pedido_proveedor(
+                    estado_actual, detalle.cantidad_pedida, detalle.cantidad_recibida)
+                deltas[detalle.producto_id] = deltas.get(
+                    detalle.producto_id, 0) + aportado_despues - aportado_antes
+
+            if recibidos:
+                DetallePedidoProveedor.objects.bulk_update(
+                    recibidos, ['cantidad_recibida'])
+
+            registrar_movimientos([
+                MovimientoStock(
+                    producto_id=producto_id,
+                    almacen_id=almacen_id,
+                    delta_actual=delta_actual,
+                    tipo_documento='pedido_proveedor',
+                    documento_id=pedido.pk,
+                )
+                for producto_id, delta_actual in sorted(deltas.items())
+            ])
+
+            logger.info(f"Inventario actualizado para el pedido {pedido.pk}: "
+                        f"{len(deltas)} producto(s), Estado: {estado_anterior} -> {estado_actual}")
 
     except Exception as e:
         logger.error(
@@ -498,26 +489,16 @@ def procesar_cambio_estado_pedido_proveedor(detalle, estado_anterior, estado_act
         raise
 
 
-def actualizar_inventario_pedido_proveedor(detalle, cantidad_cambio):
+def actualizar_inventario_pedido_proveedor(detalle, cantidad_cambio, almacen_id=None):
     """Actualiza el inventario para pedidos a proveedores (permite inventarios negativos)"""
     try:
-        with transaction.atomic():
-            inventario, created = Inventario.objects.select_for_update().get_or_create(
-                producto=detalle.producto,
-                defaults={'cantidad_actual': 0, 'cantidad_reservada': 0}
-            )
-
-            if created:
-                logger.info(
-                    f"Inventario creado automáticamente para {detalle.producto.nombre}")
+        # Sumar o restar según el cambio (ahora permite inventarios negativos)
+        registrar_movimientos(
+            [_movimiento_pedido(detalle, cantidad_cambio, almacen_id)])
 
-            # Sumar o restar según el cambio (ahora permite inventarios negativos)
-            inventario.cantidad_actual += cantidad_cambio
-            inventario.save()
-
-            logger.info(
-                f"Inventario actualizado para {detalle.producto.nombre}: "
-                f"Cantidad actual: {inventario.cantidad_actual} (cambio: {cantidad_cambio})")
+        logger.info(
+            f"Inventario actualizado para {detalle.producto_id}: "
+            f"Cambio: {cantidad_cambio}")
 
     except Exception as e:
         logger.error(
@@ -525,26 +506,35 @@ def actualizar_inventario_pedido_proveedor(detalle, cantidad_cambio):
         raise
 
 
-def actualizar_inventario_por_recepcion(producto, diferencia_cantidad):
+def actualizar_inventario_por_recepcion(producto_id, diferencia_cantidad, pedido_id=None,
+                                        almacen_id=None):
     """Actualiza el inventario cuando cambia la cantidad_recibida en recepciones parciales"""
     try:
-        with transaction.atomic():
-            inventario, created = Inventario.objects.select_for_update().get_or_create(
-                producto=producto,
-                defaults={'cantidad_actual': 0, 'cantidad_reservada': 0}
-            )
-
-            if created:
-                logger.info(
-                    f"Inventario creado automáticamente para {producto.nombre}")
-
-            inventario.cantidad_actual += diferencia_cantidad
-            inventario.save()
-
-            logger.info(
-                f"Inventario actualizado por cambio en recepción - Producto: {producto.nombre}, "
-                f"Diferencia: {diferencia_cantidad}, Cantidad actual: {inventario.cantidad_actual}")
+        registrar_movimientos([MovimientoStock(
+            producto_id=producto_id,
+            almacen_id=almacen_id,
+            delta_actual=diferencia_cantidad,
+            tipo_documento='pedido_proveedor',
+            documento_id=pedido_id,
+        )])
+
+        logger.info(
+            f"Inventario actualizado por cambio en recepción - Producto: {producto_id}, "
+            f"Diferencia: {diferencia_cantidad}")
 
     except Exception as e:
         logger.error(f"Error actualizando inventario por recepción: {str(e)}")
         raise
+
+
+# ================================
+# CACHÉ DEL DASHBOARD
+# ================================
+
+@receiver(post_save, sender=PedidoProveedor)
+@receiver(post_delete, sender=PedidoProveedor)
+@receiver(post_save, sender=OrdenVenta)
+@receiver(post_delete, sender=OrdenVenta)
+def invalidar_dashboard(sender, instance, **kwargs):
+    """Cualquier alta, cambio o borrado de cabeceras invalida el dashboard"""
+    invalidar_estadisticas_dashboard()
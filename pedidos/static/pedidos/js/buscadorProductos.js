@@ -0,0 +1,84 @@
+/**
+ * Carga de productos bajo demanda para los formularios de pedidos y órdenes.
+ *
+ * Los selects de producto ya no traen todo el catálogo en el HTML: se rellenan
+ * desde la API de autocompletado (data-url) con una página de resultados,
+ * filtrada por la búsqueda escrita y la categoría elegida. Las opciones mantienen
+ * los atributos data-precio, data-categoria, cantActual y cantReservada que usan
+ * los scripts de cada formulario.
+ */
+const BuscadorProductos = {
+    LIMITE: 20,
+    ESPERA_MS: 250,
+
+    crearOpcion(prod, campoPrecio) {
+        const opcion = document.createElement('option');
+        opcion.value = prod.id;
+        opcion.textContent = `${prod.nombre} (${prod.codigo})`;
+        opcion.setAttribute('data-precio', prod[campoPrecio] || '0.00');
+        opcion.setAttribute('data-categoria', prod.categoria);
+        opcion.setAttribute('cantActual', prod.cantidad_actual);
+        opcion.setAttribute('cantReservada', prod.cantidad_reservada);
+        return opcion;
+    },
+
+    /**
+     * Sustituye las opciones del select por los resultados de la API
+     * @param {HTMLSelectElement} select - Select con data-url y data-precio
+     * @param {Object} filtros - { q, categoria }
+     */
+    async cargar(select, { q = '', categoria = '' } = {}) {
+        const url = new URL(select.dataset.url, window.location.origin);
+        url.searchParams.set('limite', this.LIMITE);
+        if (q) url.searchParams.set('q', q);
+        if (categoria) url.searchParams.set('categoria', categoria);
+
+        try {
+            const respuesta = await fetch(url, { headers: { 'X-Requested-With': 'XMLHttpRequest' } });
+            if (!respuesta.ok) throw new Error(`HTTP ${respuesta.status}`);
+            const datos = await respuesta.json();
+
+            select.innerHTML = '<option value="">Selecciona un producto</option>';
+            datos.resultados.forEach(prod => {
+                select.appendChild(this.crearOpcion(prod, select.dataset.precio || 'precio_venta'));
+            });
+
+            if (datos.siguiente) {
+                const aviso = document.createElement('option');
+                aviso.disabled = true;
+                aviso.textContent = 'Hay más productos: escribe para afinar la búsqueda';
+                select.appendChild(aviso);
+            }
+        } catch (error) {
+            console.error('Error al cargar productos:', error);
+        }
+    },
+
+    /**
+     * Conecta el buscador y el filtro de categoría de una fila con su select
+     * @param {Object} elementos - { select, buscador, categoria, alRecargar }
+     */
+    conectar({ select, buscador, categoria, alRecargar }) {
+        if (!select) return;
+        let temporizador;
+
+        const recargar = () => this.cargar(select, {
+            q: buscador ? buscador.value.trim() : '',
+            categoria: categoria ? categoria.value : '',
+        }).then(() => {
+            if (alRecargar) alRecargar();
+        });
+
+        if (buscador) {
+            buscador.addEventListener('input', () => {
+                clearTimeout(temporizador);
+                temporizador = setTimeout(recargar, this.ESPERA_MS);
+            });
+        }
+        if (categoria) {
+            categoria.addEventListener('change', recargar);
+        }
+
+        recargar();
+    },
+};
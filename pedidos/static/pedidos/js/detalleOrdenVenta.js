@@ -3,34 +3,18 @@ document.addEventListener('DOMContentLoaded', function () {
     const productoSelect = document.getElementById('id_producto_orden');
     const stockSpan = document.getElementById('stock-orden-0');
     const precioUnitarioInputOrden = document.getElementById('id_precio_unitario_orden');
-
-    // Guardar copia de todas las opciones al inicio
-    const allOptions = Array.from(productoSelect.options);
-
-    // Filtrar productos al cambiar categoría
-    if (categoriaFilter && productoSelect) {
-        categoriaFilter.addEventListener('change', function () {
-            const categoriaSeleccionada = this.value;
-
-            // Limpiar el select
-            productoSelect.innerHTML = '';
-
-            // Agregar solo las opciones que coincidan con la categoría seleccionada
-            allOptions.forEach(option => {
-                const categoriaProducto = option.getAttribute('data-categoria');
-                const esOpcionValida = !categoriaSeleccionada || !categoriaProducto || categoriaProducto === categoriaSeleccionada;
-
-                if (esOpcionValida) {
-                    productoSelect.appendChild(option.cloneNode(true));
-                }
-            });
-
-            // Reiniciar valores
-            productoSelect.value = "";
+    const buscador = document.getElementById('buscar-producto-orden');
+
+    // Cargar productos desde la API según la búsqueda y la categoría
+    BuscadorProductos.conectar({
+        select: productoSelect,
+        buscador: buscador,
+        categoria: categoriaFilter,
+        alRecargar: () => {
             if (precioUnitarioInputOrden) precioUnitarioInputOrden.value = "0.00";
             if (stockSpan) stockSpan.textContent = "Stock disponible: 0";
-        });
-    }
+        },
+    });
 
     // Mostrar stock disponible y actualizar precio al seleccionar producto
     if (productoSelect && stockSpan) {
@@ -3,33 +3,18 @@ document.addEventListener('DOMContentLoaded', function () {
     const precioUnitarioInput = document.getElementById('id_precio_unitario');
     const categoriaFilter = document.getElementById('categoria-filter');
     const stockSpan = document.getElementById('stock-orden-0');
+    const buscador = document.getElementById('buscar-producto');
 
-    // Guardar copia de todas las opciones del select
-    const allOptions = Array.from(productSelect.options);
-
-    // Filtrado de productos por categoría (iOS compatible)
-    if (categoriaFilter && productSelect) {
-        categoriaFilter.addEventListener('change', function () {
-            const categoriaSeleccionada = this.value;
-
-            // Limpiar y reconstruir opciones según categoría
-            productSelect.innerHTML = '';
-
-            allOptions.forEach(option => {
-                const categoriaProducto = option.getAttribute('data-categoria');
-                const mostrar = !categoriaSeleccionada || categoriaProducto === categoriaSeleccionada;
-
-                if (mostrar) {
-                    productSelect.appendChild(option.cloneNode(true));
-                }
-            });
-
-            // Reiniciar valores visuales
-            productSelect.value = "";
+    // Cargar productos desde la API según la búsqueda y la categoría
+    BuscadorProductos.conectar({
+        select: productSelect,
+        buscador: buscador,
+        categoria: categoriaFilter,
+        alRecargar: () => {
             if (precioUnitarioInput) precioUnitarioInput.value = "0.00";
             if (stockSpan) stockSpan.textContent = "Stock disponible: 0";
-        });
-    }
+        },
+    });
 
     // Mostrar el stock y precio del producto seleccionado
     if (productSelect && precioUnitarioInput) {
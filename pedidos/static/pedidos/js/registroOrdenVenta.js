@@ -3,17 +3,16 @@ document.addEventListener('DOMContentLoaded', function () {
     const addProductBtnOrden = document.getElementById('add-product-btn-orden');
     let productCountOrden = 1;
 
-    const originalProductSelect = document.querySelector('.product-select-orden');
-    const originalProductOptionsHTML = originalProductSelect ? originalProductSelect.innerHTML : '';
-    const allProductOptions = Array.from(originalProductSelect.options);
-
-    function filtrarProductosPorCategoria(selectElement, categoriaSeleccionada) {
-        selectElement.innerHTML = '';
-        allProductOptions.forEach(opt => {
-            const categoria = opt.getAttribute('data-categoria');
-            if (!categoriaSeleccionada || categoria === categoriaSeleccionada || opt.value === "") {
-                selectElement.appendChild(opt.cloneNode(true));
-            }
+    // Los productos se cargan desde la API al buscar o cambiar de categoría
+    function conectarBuscador(selectElement, buscador, categoriaFilter, priceInput, stockSpan) {
+        BuscadorProductos.conectar({
+            select: selectElement,
+            buscador: buscador,
+            categoria: categoriaFilter,
+            alRecargar: () => {
+                priceInput.value = "0.00";
+                if (stockSpan) stockSpan.textContent = 'Stock disponible: 0';
+            },
         });
     }
 
@@ -52,10 +51,12 @@ document.addEventListener('DOMContentLoaded', function () {
 
         const newSelect = newRow.querySelector('.product-select-orden');
         const newCategoryFilter = newRow.querySelector('#categoria-filter');
+        const newSearchInput = newRow.querySelector('.buscar-producto-orden');
         const newPriceInput = newRow.querySelector('.precio-unitario-input-orden');
         const stockSpan = newRow.querySelector('small[id^="stock-orden-"]');
 
-        newSelect.innerHTML = originalProductOptionsHTML;
+        newSelect.innerHTML = '<option value="">Selecciona un producto</option>';
+        if (newSearchInput) newSearchInput.value = "";
 
         if (stockSpan) {
             stockSpan.id = `stock-orden-${index}`;
@@ -67,15 +68,7 @@ document.addEventListener('DOMContentLoaded', function () {
         newRow.querySelector('.cantidad-input-orden').value = "1";
         newRow.querySelector('.descuento-linea-input-orden').value = "0.00";
 
-        if (newCategoryFilter && newSelect) {
-            newCategoryFilter.addEventListener('change', function () {
-                const categoriaSeleccionada = this.value;
-                filtrarProductosPorCategoria(newSelect, categoriaSeleccionada);
-                newSelect.value = "";
-                newPriceInput.value = "0.00";
-                if (stockSpan) stockSpan.textContent = 'Stock disponible: 0';
-            });
-        }
+        conectarBuscador(newSelect, newSearchInput, newCategoryFilter, newPriceInput, stockSpan);
 
         newSelect.addEventListener('change', function () {
             updateProductPrice(this, newPriceInput);
@@ -106,6 +99,7 @@ document.addEventListener('DOMContentLoaded', function () {
     const initialProductSelect = document.getElementById('product-select-orden-0');
     const initialPriceInput = document.getElementById('precio-unitario-orden-0');
     const initialCategoryFilter = document.getElementById('categoria-filter');
+    const initialSearchInput = document.getElementById('buscar-producto-orden-0');
     const initialStockSpan = document.getElementById('stock-orden-0');
 
     if (initialProductSelect) {
@@ -114,14 +108,8 @@ document.addEventListener('DOMContentLoaded', function () {
         });
     }
 
-    if (initialCategoryFilter) {
-        initialCategoryFilter.addEventListener('change', function () {
-            const categoriaSeleccionada = this.value;
-            filtrarProductosPorCategoria(initialProductSelect, categoriaSeleccionada);
-            initialProductSelect.value = "";
-            initialPriceInput.value = "0.00";
-            if (initialStockSpan) initialStockSpan.textContent = 'Stock disponible: 0';
-        });
+    if (initialProductSelect) {
+        conectarBuscador(initialProductSelect, initialSearchInput, initialCategoryFilter, initialPriceInput, initialStockSpan);
     }
 
     updateRemoveButtonsOrden();
@@ -7,7 +7,8 @@ class PedidoProveedorManager {
         this.productDetailsContainer = document.getElementById('product-details-container');
         this.addProductBtn = document.getElementById('add-product-btn');
         this.productCount = 1; // Contador para IDs únicos
-        this.productosData = window.productosData || [];
+        const selectInicial = document.querySelector('.product-select');
+        this.urlProductos = selectInicial ? selectInicial.dataset.url : '';
 
         this.init();
     }
@@ -65,12 +66,8 @@ class PedidoProveedorManager {
 
 
     createProductOptions() {
-        let options = '<option value="">Selecciona un producto</option>';
-        this.productosData.forEach(function (prod) {
-            options += `<option value="${prod.id}" 
-                data-precio="${prod.precio}" data-categoria="${prod.categoria}" cantActual="${prod.cantActual}" cantReservada="${prod.cantReservada}" >${prod.nombre}</option>`;
-        });
-        return options;
+        // Las opciones se cargan desde la API al configurar la fila
+        return '<option value="">Selecciona un producto</option>';
     }
 
     /**
@@ -89,7 +86,8 @@ class PedidoProveedorManager {
                 </div>
                 <div class="col-md-4">
                     <label for="product-select-${index}" class="form-label">Producto - <small id="stock-orden-0" class="text-muted">Stock disponible: 0</small><span class="text-danger"> *</span></label>
-                    <select class="form-select product-select" id="product-select-${index}" name="producto_id" required>
+                    <input type="search" class="form-control form-control-sm mb-1 buscar-producto" id="buscar-producto-${index}" placeholder="Buscar por nombre o código" autocomplete="off">
+                    <select class="form-select product-select" id="product-select-${index}" name="producto_id" data-url="${this.urlProductos}" data-precio="precio_compra" required>
                         ${this.createProductOptions()}
                     </select>
                 </div>
@@ -132,35 +130,22 @@ class PedidoProveedorManager {
         const priceInput = row.querySelector('.precio-unitario-input');
         const removeBtn = row.querySelector('.remove-product-btn');
         const categoriaFilter = row.querySelector('.categoria-filter');
-
-        // Capturar copia de opciones originales para reconstrucción posterior
-        const originalOptions = Array.from(productSelect.querySelectorAll('option')).map(option => option.cloneNode(true));
-
-        // Filtrar productos por categoría (compatible con Safari)
-        if (categoriaFilter && productSelect) {
-            categoriaFilter.addEventListener('change', () => {
-                const categoriaSeleccionada = categoriaFilter.value;
-
-                // Limpiar opciones actuales
-                productSelect.innerHTML = '';
-
-                // Agregar solo las opciones que coinciden con la categoría o son la opción vacía
-                originalOptions.forEach(option => {
-                    const categoriaProducto = option.getAttribute('data-categoria');
-                    if (!categoriaSeleccionada || categoriaProducto === categoriaSeleccionada || option.value === "") {
-                        productSelect.appendChild(option.cloneNode(true));
-                    }
-                });
-
-                productSelect.value = "";
+        const buscador = row.querySelector('.buscar-producto');
+
+        // Cargar productos desde la API según la búsqueda y la categoría
+        BuscadorProductos.conectar({
+            select: productSelect,
+            buscador: buscador,
+            categoria: categoriaFilter,
+            alRecargar: () => {
                 priceInput.value = "0.00";
 
                 const stockSpan = row.querySelector('small[id^="stock-orden-"]');
                 if (stockSpan) {
                     stockSpan.textContent = `Stock disponible: 0`;
                 }
-            });
-        }
+            },
+        });
 
         // Actualizar precio y stock al seleccionar producto
         if (productSelect && priceInput) {
@@ -6,14 +6,17 @@ from .views import (
     # Pedidos a Proveedores
     registro_pedido_proveedor,
     listado_pedidos_proveedor,
+    exportar_pedidos_proveedor,
     detalle_pedido_proveedor,
     agregar_producto_pedido_proveedor,
     eliminar_producto_pedido_proveedor,
     eliminar_pedido_proveedor,
+    recepcion_pedido_proveedor,
 
     # Órdenes de Venta
     registro_orden_venta,
     listado_ordenes_venta,
+    exportar_ordenes_venta,
     detalle_orden_venta,
     agregar_producto_orden_venta,
     eliminar_producto_orden_venta,
@@ -32,6 +35,8 @@ urlpatterns = [
         'pedidos-proveedor/registro/', registro_pedido_proveedor, name='registro_pedido_proveedor'),
     path(
         'pedidos-proveedor/listado/', listado_pedidos_proveedor, name='listado_pedidos_proveedor'),
+    path(
+        'pedidos-proveedor/exportar/', exportar_pedidos_proveedor, name='exportar_pedidos_proveedor'),
     path(
         'pedidos-proveedor/detalle/<int:pedido_id>/', detalle_pedido_proveedor, name='detalle_pedido_proveedor'),
     path(
@@ -40,12 +45,16 @@ urlpatterns = [
         'pedidos-proveedor/eliminar-producto/<int:detalle_id>/', eliminar_producto_pedido_proveedor, name='eliminar_producto_pedido_proveedor'),
     path(
         'pedidos-proveedor/eliminar/<int:pedido_id>/', eliminar_pedido_proveedor, name='eliminar_pedido_proveedor'),
+    path(
+        'pedidos-proveedor/<int:pedido_id>/recepcion/', recepcion_pedido_proveedor, name='recepcion_pedido_proveedor'),
 
     # URLs para Órdenes de Venta
     path(
         'ordenes-venta/registro/', registro_orden_venta, name='registro_orden_venta'),
     path(
         'ordenes-venta/listado/', listado_ordenes_venta, name='listado_ordenes_venta'),
+    path(
+        'ordenes-venta/exportar/', exportar_ordenes_venta, name='exportar_ordenes_venta'),
     path(
         'ordenes-venta/detalle/<int:orden_id>/', detalle_orden_venta, name='detalle_orden_venta'),
     path(
@@ -8,12 +8,26 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
 from django.db import transaction
+from django.views.decorators.http import require_GET
 from datetime import datetime, date
+import json
+from decimal import Decimal, InvalidOperation
 from proveedores.models import Proveedor
 from .models import PedidoProveedor, DetallePedidoProveedor, OrdenVenta, DetalleOrdenVenta
 from clientes.models import Cliente
-from inventario.models import Producto, Inventario, CategoriaProducto
-
+from inventario.models import Almacen, Producto, Inventario, CategoriaProducto
+from core.busqueda import buscar
+from core.exportacion import respuesta_csv
+from core.paginacion import paginar_keyset
+from .estadisticas import estadisticas_dashboard
+from .services import (
+    RecepcionInvalida, guardar_detalles_orden_venta, preparar_detalles_orden_venta,
+    recalcular_totales_orden_venta, redondear_importe, registrar_recepcion_pedido_proveedor,
+    sumar_linea_orden_venta, sumar_linea_pedido_proveedor)
+
+# Productos por página en el autocompletado de los formularios
+LIMITE_AUTOCOMPLETADO = 20
+LIMITE_AUTOCOMPLETADO_MAXIMO = 50
 
 # ================================
 # VISTAS PARA PEDIDOS A PROVEEDORES
@@ -106,12 +120,10 @@ def registro_pedido_proveedor(request):
             print(f'el error es {type(e).__name__} - {str(e)}')
 
     proveedores = Proveedor.objects.all()
-    productos = Producto.objects.all().prefetch_related('inventarios')
     categorias = CategoriaProducto.objects.all()
 
     context = {
         'proveedores': proveedores,
-        'productos': productos,
         'categorias': categorias,
         'fecha_actual': date.today()
     }
@@ -119,13 +131,8 @@ def registro_pedido_proveedor(request):
     return render(request, 'pedidos/registro_pedido_proveedor.html', context)
 
 
-@login_required
-def listado_pedidos_proveedor(request):
-    """Listar todos los pedidos a proveedores"""
-    pedidos = PedidoProveedor.objects.select_related(
-        'proveedor', 'empleado_creador').order_by('-fecha_pedido')
-
-    # Filtros opcionales
+def _filtrar_pedidos_proveedor(request, pedidos):
+    """Filtros del listado de pedidos (también los usa la exportación)"""
     estado_filtro = request.GET.get('estado')
     proveedor_filtro = request.GET.get('proveedor')
 
@@ -135,8 +142,29 @@ def listado_pedidos_proveedor(request):
     if proveedor_filtro:
         pedidos = pedidos.filter(proveedor_id=proveedor_filtro)
 
+    # Prefijo del número (PED-2026-00): recorrido del índice del número
+    numero_filtro = request.GET.get('numero', '').strip().upper()
+    if numero_filtro:
+        pedidos = pedidos.filter(numero_pedido__startswith=numero_filtro)
+
+    return pedidos, estado_filtro, proveedor_filtro
+
+
+@login_required
+def listado_pedidos_proveedor(request):
+    """Listar todos los pedidos a proveedores"""
+    pedidos = PedidoProveedor.objects.select_related(
+        'proveedor', 'empleado_creador').order_by('-fecha_pedido')
+
+    # Filtros opcionales
+    pedidos, estado_filtro, proveedor_filtro = _filtrar_pedidos_proveedor(
+        request, pedidos)
+
+    pagina = paginar_keyset(request, pedidos, ('-fecha_pedido',))
+
     context = {
-        'pedidos': pedidos,
+        'pedidos': pagina.objetos,
+        'pagina': pagina,
         'estados': PedidoProveedor.ESTADOS,
         'proveedores': Proveedor.objects.all(),
         'estado_actual': estado_filtro,
@@ -146,13 +174,20 @@ def listado_pedidos_proveedor(request):
     return render(request, 'pedidos/listado_pedidos_proveedor.html', context)
 
 
+@login_required
+@require_GET
+def exportar_pedidos_proveedor(request):
+    """Exporta a CSV (en streaming) los pedidos del listado con sus líneas"""
+    pedidos, _, _ = _filtrar_pedidos_proveedor(request, PedidoProveedor.objects.all())
+    return respuesta_csv(pedidos, 'pedidos_proveedor')
+
+
 @login_required
 def detalle_pedido_proveedor(request, pedido_id):
     """Ver/editar detalle de un pedido a proveedor"""
     pedido = get_object_or_404(
         PedidoProveedor.objects.select_related('proveedor'), id=pedido_id)
     detalles = pedido.detalles.select_related('producto')
-    productos = Producto.objects.all().prefetch_related('inventarios')
     categorias = CategoriaProducto.objects.all()
 
     if request.method == 'POST':
@@ -174,31 +209,23 @@ def detalle_pedido_proveedor(request, pedido_id):
                     )
                     return redirect('detalle_pedido_proveedor', pedido_id=pedido.id)
 
-                pedido.estado = nuevo_estado
-
-                # Si el estado es recibido_parcial, actualizamos cantidades recibidas
+                # Si el estado es recibido_parcial, se registra la recepción en bloque
                 if nuevo_estado == 'recibido_parcial':
-                    for detalle in detalles:
-                        key = f'cantidad_recibida_{detalle.id}'
-                        nueva_cantidad = request.POST.get(key)
-
-                        if nueva_cantidad is not None:
-                            try:
-                                nueva_cantidad = int(nueva_cantidad)
-                                if 0 <= nueva_cantidad <= detalle.cantidad_pedida:
-                                    detalle.cantidad_recibida = nueva_cantidad
-                                    detalle.save()
-                                else:
-                                    messages.warning(
-                                        request, f'Cantidad inválida para {detalle.producto.nombre}.')
-                            except ValueError:
-                                messages.warning(
-                                    request, f'Valor inválido en la cantidad para {detalle.producto.nombre}.')
-
-                            # Guardar notas generales
-                            notas = request.POST.get('notas')
-                            pedido.notas = notas
-                pedido.save()
+                    cantidades, errores = _leer_cantidades_recibidas(
+                        request.POST, detalles)
+                    try:
+                        if errores:
+                            raise RecepcionInvalida(errores)
+                        registrar_recepcion_pedido_proveedor(
+                            pedido, cantidades, nuevo_estado, notas=request.POST.get('notas'))
+                    except RecepcionInvalida as e:
+                        # Nada se ha aplicado: se corrige el formulario y se vuelve a enviar
+                        for error in e.errores:
+                            messages.error(request, error)
+                        return redirect('detalle_pedido_proveedor', pedido_id=pedido.id)
+                else:
+                    pedido.estado = nuevo_estado
+                    pedido.save()
                 messages.success(
                     request, f'Estado actualizado a {pedido.get_estado_display()}')
                 return redirect('detalle_pedido_proveedor', pedido_id=pedido.id)
@@ -209,7 +236,6 @@ def detalle_pedido_proveedor(request, pedido_id):
 
     context = {
         'pedido': pedido,
-        'productos': productos,
         'categorias': categorias,
         'detalles': detalles,
         'estados': PedidoProveedor.ESTADOS,
@@ -221,6 +247,63 @@ def detalle_pedido_proveedor(request, pedido_id):
     return render(request, 'pedidos/detalle_pedido_proveedor.html', context)
 
 
+def _leer_cantidades_recibidas(datos, detalles):
+    """Lee los campos cantidad_recibida_<id> del formulario: {detalle_id: cantidad}"""
+    cantidades = {}
+    errores = []
+    for detalle in detalles:
+        nueva_cantidad = datos.get(f'cantidad_recibida_{detalle.id}')
+        if nueva_cantidad is None:
+            continue
+        try:
+            cantidades[detalle.id] = int(nueva_cantidad)
+        except ValueError:
+            errores.append(
+                f'Valor inválido en la cantidad para {detalle.producto.nombre}.')
+    return cantidades, errores
+
+
+@login_required
+def recepcion_pedido_proveedor(request, pedido_id):
+    """
+    API para registrar una recepción de mercancía completa en una sola
+    petición. Cuerpo JSON: {"estado": "recibido_parcial", "lineas": {"<detalle_id>": cantidad_recibida},
+    "almacen": <id opcional del almacén de recepción>}
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'message': 'Método no permitido'}, status=405)
+
+    pedido = get_object_or_404(PedidoProveedor, id=pedido_id)
+
+    try:
+        datos = json.loads(request.body or '{}')
+        estado = datos.get('estado', 'recibido_parcial')
+        cantidades = {
+            int(detalle_id): int(cantidad)
+            for detalle_id, cantidad in datos.get('lineas', {}).items()
+        }
+        almacen_id = datos.get('almacen')
+        if almacen_id is not None:
+            almacen_id = get_object_or_404(Almacen, id=int(almacen_id), activo=True).id
+        actualizados = registrar_recepcion_pedido_proveedor(
+            pedido, cantidades, estado, almacen_id=almacen_id)
+    except RecepcionInvalida as e:
+        return JsonResponse({
+            'success': False,
+            'message': 'Recepción rechazada, no se ha aplicado ninguna línea',
+            'errores': e.errores,
+        }, status=400)
+    except (ValueError, TypeError, AttributeError) as e:
+        return JsonResponse({'success': False, 'message': f'Datos de recepción no válidos: {str(e)}'}, status=400)
+
+    return JsonResponse({
+        'success': True,
+        'estado': pedido.estado,
+        'lineas_actualizadas': len(actualizados),
+        'errores': [],
+    })
+
+
 @login_required
 def agregar_producto_pedido_proveedor(request, pedido_id):
     """Agregar producto a un pedido existente"""
@@ -230,27 +313,29 @@ def agregar_producto_pedido_proveedor(request, pedido_id):
         try:
             producto_id = request.POST.get('producto')
             cantidad = int(request.POST.get('cantidad'))
-            precio_unitario = float(request.POST.get('precio_unitario'))
-            igic_porcentaje = float(request.POST.get(
+            precio_unitario = Decimal(request.POST.get('precio_unitario'))
+            igic_porcentaje = Decimal(request.POST.get(
                 'igic_porcentaje'))  # NUEVO: Capturar IGIC
 
             subtotal_linea = cantidad * precio_unitario
             # Calcular impuestos de esta línea específica
-            igic_importe_linea = subtotal_linea * (igic_porcentaje / 100)
-
-            DetallePedidoProveedor.objects.create(
-                pedido=pedido,
-                producto_id=producto_id,
-                empleado_creador=request.user,
-                cantidad_pedida=cantidad,
-                precio_unitario=precio_unitario,
-                subtotal=subtotal_linea,
-                igic_porcentaje=igic_porcentaje,
-                igic_importe=igic_importe_linea
-            )
+            igic_importe_linea = redondear_importe(
+                subtotal_linea * igic_porcentaje / 100)
+
+            with transaction.atomic():
+                detalle = DetallePedidoProveedor.objects.create(
+                    pedido=pedido,
+                    producto_id=producto_id,
+                    empleado_creador=request.user,
+                    cantidad_pedida=cantidad,
+                    precio_unitario=precio_unitario,
+                    subtotal=subtotal_linea,
+                    igic_porcentaje=igic_porcentaje,
+                    igic_importe=igic_importe_linea
+                )
 
-            # Recalcular totales del pedido
-            _recalcular_totales_pedido_proveedor(pedido)
+                # Sumar la línea a los totales del pedido
+                sumar_linea_pedido_proveedor(detalle)
 
             messages.success(request, 'Producto agregado exitosamente')
 
@@ -278,8 +363,9 @@ def eliminar_producto_pedido_proveedor(request, detalle_id):
             )
             return redirect('detalle_pedido_proveedor', pedido_id=pedido.id)
 
-        detalle.delete()
-        _recalcular_totales_pedido_proveedor(pedido)
+        with transaction.atomic():
+            detalle.delete()
+            sumar_linea_pedido_proveedor(detalle, signo=-1)
 
         messages.success(request, 'Producto eliminado del pedido')
         return redirect('detalle_pedido_proveedor', pedido_id=pedido.id)
@@ -312,38 +398,6 @@ def eliminar_pedido_proveedor(request, pedido_id):
     return redirect('listado_pedidos_proveedor')
 
 
-def _recalcular_totales_pedido_proveedor(pedido):
-    """Función auxiliar para recalcular totales de un pedido a proveedor"""
-    try:
-        detalles = pedido.detalles.all()
-
-        # Calcular subtotal (suma de todos los subtotales de línea)
-        subtotal = sum(detalle.subtotal for detalle in detalles)
-
-        # Calcular impuestos (suma de todos los igic_importe por línea)
-        impuestos = sum(detalle.igic_importe for detalle in detalles)
-
-        total = subtotal + impuestos
-
-        # Calcular el porcentaje promedio de IGIC del pedido (para mostrar en template)
-        if subtotal > 0:
-            igic_porcentaje_promedio = (impuestos / subtotal) * 100
-        else:
-            igic_porcentaje_promedio = 0
-
-        pedido.subtotal = subtotal
-        pedido.impuestos = impuestos
-        pedido.total = total
-        pedido.igic_porcentaje = igic_porcentaje_promedio  # Actualizar porcentaje promedio
-        pedido.save()
-
-        print(
-            f"Totales recalculados - Subtotal: {subtotal}, Impuestos: {impuestos}, Total: {total}")
-
-    except Exception as e:
-        print(
-            f'Error al recalcular totales del pedido proveedor: {type(e)}, {str(e)}')
-
 # ============================
 # VISTAS PARA ÓRDENES DE VENTA
 # ============================
@@ -362,69 +416,17 @@ def registro_orden_venta(request):
                 metodo_pago = request.POST.get('metodo_pago')
                 notas = request.POST.get('notas', '')
 
-                # Crear la orden
-                orden = OrdenVenta.objects.create(
-                    cliente_id=cliente_id,
-                    empleado_creador=request.user,
-                    fecha_orden=fecha_orden,
-                    fecha_entrega=fecha_entrega,
-                    metodo_pago=metodo_pago,
-                    notas=notas,
-                    subtotal=0,
-                    descuento=0,
-                    impuestos=0,
-                    total=0
-                )
-
-                # Procesar productos
-                productos_ids = request.POST.getlist('producto_id')
-                cantidades = request.POST.getlist('cantidad')
-                precios = request.POST.getlist('precio_unitario')
-                descuentos_linea = request.POST.getlist('descuento_linea')
-                igic_porcentajes = request.POST.getlist('igic_porcentaje')
-
-                subtotal_sin_igic_total = 0
-                igic_total = 0
-
-                for i, producto_id in enumerate(productos_ids):
-                    if producto_id and cantidades[i] and precios[i]:
-                        cantidad = int(cantidades[i])
-                        precio_unitario = float(precios[i])
-                        descuento_linea = float(
-                            descuentos_linea[i]) if descuentos_linea[i] else 0
-                        igic_porcentaje = float(
-                            igic_porcentajes[i]) if igic_porcentajes[i] else 7.00
-
-                        # Calcular subtotal sin IGIC
-                        subtotal_sin_igic = (
-                            cantidad * precio_unitario) - descuento_linea
-
-                        # Calcular IGIC para esta línea
-                        igic_importe = subtotal_sin_igic * \
-                            (igic_porcentaje / 100)
-
-                        # Subtotal final de la línea (con IGIC)
-                        subtotal_linea = subtotal_sin_igic + igic_importe
-
-                        DetalleOrdenVenta.objects.create(
-                            orden=orden,
-                            producto_id=producto_id,
-                            empleado_creador=request.user,
-                            cantidad=cantidad,
-                            precio_unitario=precio_unitario,
-                            descuento_linea=descuento_linea,
-                            igic_porcentaje=igic_porcentaje,
-                            igic_importe=igic_importe,
-                            subtotal=subtotal_linea
-                        )
+                # Se validan todas las líneas antes de crear nada
+                detalles = preparar_detalles_orden_venta(
+                    _leer_lineas_orden_venta(request), request.user)
 
-                        # Acumular totales
-                        subtotal_sin_igic_total += subtotal_sin_igic
-                        igic_total += igic_importe
+                subtotal_sin_igic_total = sum(
+                    (detalle.subtotal - detalle.igic_importe for detalle in detalles), Decimal('0'))
+                igic_total = sum(
+                    (detalle.igic_importe for detalle in detalles), Decimal('0'))
 
-                # Actualizar totales de la orden
-                descuento_general = float(
-                    request.POST.get('descuento_general', 0))
+                descuento_general = Decimal(
+                    request.POST.get('descuento_general') or 0)
 
                 # Aplicar descuento general al subtotal sin IGIC
                 subtotal_con_descuento_general = subtotal_sin_igic_total - descuento_general
@@ -434,18 +436,28 @@ def registro_orden_venta(request):
 
                 total_final = subtotal_con_descuento_general + igic_final
 
-                # Actualizar la orden
-                orden.subtotal = subtotal_sin_igic_total  # Subtotal sin impuestos
-                orden.descuento = descuento_general
-                orden.impuestos = igic_final              # Total de IGIC
-                orden.total = total_final                 # Total final
-                orden.save()
+                # La orden se crea ya con sus totales: sin UPDATE posterior
+                orden = OrdenVenta.objects.create(
+                    cliente_id=cliente_id,
+                    empleado_creador=request.user,
+                    fecha_orden=fecha_orden,
+                    fecha_entrega=fecha_entrega,
+                    metodo_pago=metodo_pago,
+                    notas=notas,
+                    subtotal=subtotal_sin_igic_total,  # Subtotal sin impuestos
+                    descuento=descuento_general,
+                    impuestos=igic_final,              # Total de IGIC
+                    total=total_final                  # Total final
+                )
+
+                # Las líneas se crean en bloque con una sola pasada de reserva
+                guardar_detalles_orden_venta(orden, detalles)
 
                 messages.success(
                     request, f'Orden {orden.numero_orden} creada exitosamente')
                 return redirect('detalle_orden_venta', orden_id=orden.id)
 
-        except ValueError as ve:
+        except (ValueError, InvalidOperation) as ve:
             messages.error(
                 request, f'Error en los datos proporcionados: {type(ve)}, {str(ve)}')
 
@@ -455,7 +467,6 @@ def registro_orden_venta(request):
 
     # GET request
     clientes = Cliente.objects.all()
-    productos = Producto.objects.all().prefetch_related('inventarios')
 
     categorias = CategoriaProducto.objects.all()
 
@@ -469,7 +480,6 @@ def registro_orden_venta(request):
     context = {
         'clientes': clientes,
         'categorias': categorias,
-        'productos': productos,
         'metodos_pago_choices': metodos_pago_choices,
         'fecha_actual': date.today()
     }
@@ -477,13 +487,29 @@ def registro_orden_venta(request):
     return render(request, 'pedidos/registro_orden_venta.html', context)
 
 
-@login_required
-def listado_ordenes_venta(request):
-    """Listar todas las órdenes de venta"""
-    ordenes = OrdenVenta.objects.select_related(
-        'cliente', 'empleado_creador').order_by('-fecha_orden')
-
-    # Filtros opcionales
+def _leer_lineas_orden_venta(request):
+    """Convierte las listas del formulario en líneas de orden (ignora las incompletas)"""
+    productos_ids = request.POST.getlist('producto_id')
+    cantidades = request.POST.getlist('cantidad')
+    precios = request.POST.getlist('precio_unitario')
+    descuentos_linea = request.POST.getlist('descuento_linea')
+    igic_porcentajes = request.POST.getlist('igic_porcentaje')
+
+    lineas = []
+    for i, producto_id in enumerate(productos_ids):
+        if producto_id and cantidades[i] and precios[i]:
+            lineas.append({
+                'producto_id': int(producto_id),
+                'cantidad': int(cantidades[i]),
+                'precio_unitario': Decimal(precios[i]),
+                'descuento_linea': Decimal(descuentos_linea[i]) if descuentos_linea[i] else Decimal('0'),
+                'igic_porcentaje': Decimal(igic_porcentajes[i]) if igic_porcentajes[i] else Decimal('7.00'),
+            })
+    return lineas
+
+
+def _filtrar_ordenes_venta(request, ordenes):
+    """Filtros del listado de órdenes (también los usa la exportación)"""
     estado_filtro = request.GET.get('estado')
     cliente_filtro = request.GET.get('cliente')
 
@@ -493,8 +519,29 @@ def listado_ordenes_venta(request):
     if cliente_filtro:
         ordenes = ordenes.filter(cliente_id=cliente_filtro)
 
+    # Prefijo del número (PED-2026-00): recorrido del índice del número
+    numero_filtro = request.GET.get('numero', '').strip().upper()
+    if numero_filtro:
+        ordenes = ordenes.filter(numero_orden__startswith=numero_filtro)
+
+    return ordenes, estado_filtro, cliente_filtro
+
+
+@login_required
+def listado_ordenes_venta(request):
+    """Listar todas las órdenes de venta"""
+    ordenes = OrdenVenta.objects.select_related(
+        'cliente', 'empleado_creador').order_by('-fecha_orden')
+
+    # Filtros opcionales
+    ordenes, estado_filtro, cliente_filtro = _filtrar_ordenes_venta(
+        request, ordenes)
+
+    pagina = paginar_keyset(request, ordenes, ('-fecha_orden',))
+
     context = {
-        'ordenes': ordenes,
+        'ordenes': pagina.objetos,
+        'pagina': pagina,
         'estados': OrdenVenta.ESTADOS,
         'clientes': Cliente.objects.all(),
         'estado_actual': estado_filtro,
@@ -504,6 +551,14 @@ def listado_ordenes_venta(request):
     return render(request, 'pedidos/listado_ordenes_venta.html', context)
 
 
+@login_required
+@require_GET
+def exportar_ordenes_venta(request):
+    """Exporta a CSV (en streaming) las órdenes del listado con sus líneas"""
+    ordenes, _, _ = _filtrar_ordenes_venta(request, OrdenVenta.objects.all())
+    return respuesta_csv(ordenes, 'ordenes_venta')
+
+
 @login_required
 def detalle_orden_venta(request, orden_id):
     """Ver/editar detalle de una orden de venta"""
@@ -511,7 +566,6 @@ def detalle_orden_venta(request, orden_id):
         OrdenVenta.objects.select_related('cliente'), id=orden_id)
     detalles = orden.detalles.select_related(
         'producto')
-    productos = Producto.objects.all().prefetch_related('inventarios')
 
     categorias = CategoriaProducto.objects.all()
 
@@ -557,9 +611,10 @@ def detalle_orden_venta(request, orden_id):
                         messages.warning(request, 'Formato de fecha no válido')
 
                 # Actualizar descuento general
+                descuento_cambiado = False
                 try:
-                    nuevo_descuento = float(
-                        request.POST.get('descuento_general', 0))
+                    nuevo_descuento = Decimal(
+                        request.POST.get('descuento_general') or 0)
                     if nuevo_descuento < 0:
                         messages.error(
                             request, 'El descuento no puede ser negativo')
@@ -568,19 +623,20 @@ def detalle_orden_venta(request, orden_id):
                             request, 'El descuento no puede ser mayor que el subtotal')
                     else:
                         orden.descuento = nuevo_descuento
+                        descuento_cambiado = True
 
-                        # Recalcular totales después del cambio de descuento
-                        _recalcular_totales_orden_venta(orden)
-
-                        messages.success(
-                            request, 'Información de la orden actualizada exitosamente')
-
-                except ValueError:
+                except InvalidOperation:
                     messages.error(
                         request, 'El descuento debe ser un número válido')
 
-                # Guardar los cambios
-                orden.save()
+                # Guardar los cambios; los totales los escribe el recálculo
+                orden.save(update_fields=[
+                    'notas', 'metodo_pago', 'fecha_entrega', 'descuento', 'actualizado_el'])
+
+                if descuento_cambiado:
+                    recalcular_totales_orden_venta(orden)
+                    messages.success(
+                        request, 'Información de la orden actualizada exitosamente')
             else:
                 # Si no hay acción específica, asumir actualización de estado (compatibilidad)
                 nuevo_estado = request.POST.get('estado')
@@ -606,7 +662,6 @@ def detalle_orden_venta(request, orden_id):
     context = {
         'orden': orden,
         'detalles': detalles,
-        'productos': productos,
         'categorias': categorias,
         'estados': OrdenVenta.ESTADOS,
         'metodos_pago_choices': metodos_pago_choices,
@@ -625,38 +680,40 @@ def agregar_producto_orden_venta(request, orden_id):
         try:
             producto_id = request.POST.get('producto')
             cantidad = int(request.POST.get('cantidad'))
-            precio_unitario = float(request.POST.get('precio_unitario'))
-            descuento_linea = float(request.POST.get('descuento_linea', 0))
-            igic_porcentaje = float(request.POST.get('igic_porcentaje', 0))
+            precio_unitario = Decimal(request.POST.get('precio_unitario'))
+            descuento_linea = Decimal(request.POST.get('descuento_linea') or 0)
+            igic_porcentaje = Decimal(request.POST.get('igic_porcentaje') or 0)
 
             # Calcular subtotal antes de impuestos
             subtotal_sin_igic = (cantidad * precio_unitario) - descuento_linea
 
             # Calcular el IGIC
-            igic_importe = subtotal_sin_igic * (igic_porcentaje / 100)
+            igic_importe = redondear_importe(
+                subtotal_sin_igic * igic_porcentaje / 100)
 
             # Calcular subtotal final (incluyendo IGIC)
             subtotal_linea = subtotal_sin_igic + igic_importe
 
-            DetalleOrdenVenta.objects.create(
-                orden=orden,
-                producto_id=producto_id,
-                empleado_creador=request.user,
-                cantidad=cantidad,
-                precio_unitario=precio_unitario,
-                descuento_linea=descuento_linea,
-                igic_porcentaje=igic_porcentaje,
-                igic_importe=igic_importe,
-                subtotal=subtotal_linea
-            )
+            with transaction.atomic():
+                detalle = DetalleOrdenVenta.objects.create(
+                    orden=orden,
+                    producto_id=producto_id,
+                    empleado_creador=request.user,
+                    cantidad=cantidad,
+                    precio_unitario=precio_unitario,
+                    descuento_linea=descuento_linea,
+                    igic_porcentaje=igic_porcentaje,
+                    igic_importe=igic_importe,
+                    subtotal=subtotal_linea
+                )
 
-            # Recalcular totales de la orden
-            _recalcular_totales_orden_venta(orden)
+                # Sumar la línea a los totales de la orden
+                sumar_linea_orden_venta(detalle)
 
             messages.success(
                 request, 'Producto agregado exitosamente')
 
-        except ValueError as e:
+        except (ValueError, InvalidOperation) as e:
             messages.error(
                 request, f'Error en los datos proporcionados: {str(e)}')
 
@@ -674,8 +731,9 @@ def eliminar_producto_orden_venta(request, detalle_id):
         detalle = get_object_or_404(DetalleOrdenVenta, id=detalle_id)
         orden = detalle.orden
 
-        detalle.delete()
-        _recalcular_totales_orden_venta(orden)
+        with transaction.atomic():
+            detalle.delete()
+            sumar_linea_orden_venta(detalle, signo=-1)
 
         messages.success(request, 'Producto eliminado de la orden')
         return redirect('detalle_orden_venta', orden_id=orden.id)
@@ -709,33 +767,6 @@ def eliminar_orden_venta(request, detalle_id):
     return redirect('listado_ordenes_venta')
 
 
-def _recalcular_totales_orden_venta(orden):
-    """Función auxiliar para recalcular totales de una orden de venta"""
-    try:
-        detalles = orden.detalles.all()
-
-        # Calcular subtotal sin IGIC e IGIC total
-        subtotal_sin_igic = 0
-        igic_total = 0
-
-        for detalle in detalles:
-            subtotal_linea_sin_igic = (
-                detalle.cantidad * detalle.precio_unitario) - detalle.descuento_linea
-            subtotal_sin_igic += subtotal_linea_sin_igic
-            igic_total += detalle.igic_importe
-
-        # Aplicar descuento general solo al subtotal
-        subtotal_con_descuento = subtotal_sin_igic - orden.descuento
-
-        # Actualizar totales
-        orden.subtotal = subtotal_sin_igic
-        orden.impuestos = igic_total
-        orden.total = subtotal_con_descuento + igic_total
-        orden.save()
-    except Exception as e:
-        print(
-            f'El error de recalcular total orden venta es: {type(e)}, {str(e)}')
-
 # ============================
 # VISTAS ADICIONALES
 # ============================
@@ -744,43 +775,53 @@ def _recalcular_totales_orden_venta(orden):
 @login_required
 def dashboard_pedidos(request):
     """Dashboard principal de pedidos"""
-    # Estadísticas de pedidos a proveedores
-    pedidos_proveedor = PedidoProveedor.objects.all()
-    stats_pedidos = {
-        'total': pedidos_proveedor.count(),
-        'pendientes': pedidos_proveedor.filter(estado='pendiente').count(),
-        'enviados': pedidos_proveedor.filter(estado='enviado').count(),
-        'recibidos': pedidos_proveedor.filter(estado__in=['recibido_parcial', 'recibido_completo']).count(),
-    }
-
-    # Estadísticas de órdenes de venta
-    ordenes_venta = OrdenVenta.objects.all()
-    stats_ordenes = {
-        'total': ordenes_venta.count(),
-        'pendientes': ordenes_venta.filter(estado='pendiente').count(),
-        'procesando': ordenes_venta.filter(estado='procesando').count(),
-        'entregadas': ordenes_venta.filter(estado='entregado').count(),
-    }
-
-    # Pedidos recientes
-    pedidos_recientes = PedidoProveedor.objects.select_related(
-        'proveedor').order_by('-fecha_pedido')[:5]
-    ordenes_recientes = OrdenVenta.objects.select_related(
-        'cliente').order_by('-fecha_orden')[:5]
-
-    context = {
-        'stats_pedidos': stats_pedidos,
-        'stats_ordenes': stats_ordenes,
-        'pedidos_recientes': pedidos_recientes,
-        'ordenes_recientes': ordenes_recientes,
-    }
+    # Contadores y recientes en caché; se invalida al guardar pedidos u órdenes
+    context = estadisticas_dashboard()
 
     return render(request, 'pedidos/dashboard.html', context)
 
 
 @login_required
 def get_productos_json(request):
-    """API para obtener productos en formato JSON (para AJAX)"""
-    productos = Producto.objects.all().values(
-        'id', 'nombre', 'precio_venta', 'stock_actual')
-    return JsonResponse(list(productos), safe=False)
+    """
+    API de autocompletado de productos para los formularios de pedidos y
+    órdenes. Parámetros: q (nombre o código), categoria, limite y cursor.
+    Devuelve una página de productos con su disponibilidad actual.
+    """
+    productos = Producto.objects.con_stock()
+
+    categoria_id = request.GET.get('categoria')
+    if categoria_id and categoria_id.isdigit():
+        productos = productos.filter(categoria_id=categoria_id)
+
+    orden = ('nombre',)
+    query = request.GET.get('q', '').strip()
+    if query:
+        productos = buscar(productos, query)
+        orden = ('-relevancia', 'nombre')
+
+    try:
+        limite = min(int(request.GET.get('limite', LIMITE_AUTOCOMPLETADO)),
+                     LIMITE_AUTOCOMPLETADO_MAXIMO)
+    except ValueError:
+        limite = LIMITE_AUTOCOMPLETADO
+
+    pagina = paginar_keyset(request, productos, orden, por_pagina=max(limite, 1))
+
+    return JsonResponse({
+        'resultados': [
+            {
+                'id': producto.id,
+                'codigo': producto.codigo_producto,
+                'nombre': producto.nombre,
+                'categoria': producto.categoria_id,
+                'precio_venta': str(producto.precio_venta),
+                'precio_compra': str(producto.precio_compra),
+                'cantidad_actual': producto.cantidad_actual,
+                'cantidad_reservada': producto.cantidad_reservada,
+                'disponible': producto.cantidad_disponible,
+            }
+            for producto in pagina
+        ],
+        'siguiente': pagina.url_siguiente,
+    })
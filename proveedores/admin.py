@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
+from core.exportacion import respuesta_csv
 from .models import Proveedor
 
 
@@ -153,13 +154,8 @@ class ProveedorAdmin(admin.ModelAdmin):
     marcar_como_contactado.short_description = "Marcar como contactados"
 
     def exportar_contactos(self, request, queryset):
-        """Acción para exportar información de contacto"""
-        count = queryset.count()
-        # Aquí podrías agregar lógica para exportar datos
-        self.message_user(
-            request,
-            f'Se preparó la exportación de {count} proveedor(es).'
-        )
+        """Acción para exportar información de contacto (CSV en streaming)"""
+        return respuesta_csv(queryset, 'proveedores')
     exportar_contactos.short_description = "Exportar información de contacto"
 
     # Filtros personalizados
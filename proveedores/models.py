@@ -93,6 +93,7 @@ class Proveedor(models.Model):
         indexes = [
             models.Index(fields=['nombre_empresa']),
             models.Index(fields=['cif']),
+            models.Index(fields=['creado_el', 'id']),
         ]
 
     def __str__(self):
@@ -1,9 +1,11 @@
 from django.urls import path
-from .views import supplier_register, list_supplier, details_supplier
+from .views import supplier_register, list_supplier, details_supplier, exportar_proveedores
 
 urlpatterns = [
     path('registro_proveedores/', supplier_register, name='registro_proveedores'),
     path('listado_proveedor/', list_supplier, name='listado_proveedor'),
+    path(
+        'exportar_proveedores/', exportar_proveedores, name='exportar_proveedores'),
     path(
         'detalle_proveedor/<int:supplier_id>/', details_supplier, name='editar_proveedor'),
 ]
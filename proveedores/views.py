@@ -1,8 +1,12 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
+from django.views.decorators.http import require_GET
 from django.contrib import messages
 from .models import Proveedor
+from core.busqueda import buscar
+from core.exportacion import respuesta_csv
+from core.paginacion import paginar_keyset
 
 
 @login_required
@@ -131,10 +135,22 @@ def list_supplier(request):
     query = request.GET.get('buscarProveedor')
     proveedore = Proveedor.objects.all()
 
+    orden = ('-creado_el',)
     if query:
-        proveedore = proveedore.filter(nombre_empresa__icontains=query)
+        proveedore = buscar(proveedore, query)
+        orden = ('-relevancia', '-creado_el')
 
-    return render(request, 'proveedores/list_supplier.html', {"proveedores": proveedore})
+    pagina = paginar_keyset(request, proveedore, orden)
+
+    return render(request, 'proveedores/list_supplier.html', {"proveedores": pagina.objetos, "pagina": pagina})
+
+
+@login_required
+@require_GET
+def exportar_proveedores(request):
+    """Exporta a CSV (en streaming) los proveedores del listado"""
+    proveedores = buscar(Proveedor.objects.all(), request.GET.get('buscarProveedor'))
+    return respuesta_csv(proveedores, 'proveedores')
 
 
 @login_required
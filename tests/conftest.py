@@ -1,4 +1,5 @@
 import pytest
+from django.core.cache import cache
 from django.test import Client
 from django.contrib.auth import get_user_model
 
@@ -7,6 +8,17 @@ from tests.factories import UserFactory
 User = get_user_model()
 
 
+@pytest.fixture(autouse=True)
+def limpiar_cache():
+    """
+    Vacía la caché entre tests: la invalidación real ocurre en
+    transaction.on_commit, que no se ejecuta dentro de los tests con rollback.
+    """
+    cache.clear()
+    yield
+    cache.clear()
+
+
 @pytest.fixture
 def client():
     """
@@ -0,0 +1,93 @@
+import pytest
+from decimal import Decimal
+from django.db import connection
+from django.urls import reverse
+
+from clientes.models import Cliente
+from core.busqueda import buscar, crear_indices_busqueda, trigram_disponible
+from inventario.models import Producto
+from tests.clientes.factories import ClienteFactory
+from tests.inventario.factories import ProductoFactory
+
+
+@pytest.mark.django_db
+class TestBusqueda:
+    """
+    Tests para la búsqueda de productos, clientes y proveedores.
+    """
+
+    def test_ordena_por_relevancia(self):
+        """
+        Test que verifica que la coincidencia exacta va antes que el prefijo y el resto.
+        """
+        contiene = ProductoFactory(nombre='Gran tornillo')
+        exacto = ProductoFactory(nombre='Tornillo')
+        prefijo = ProductoFactory(nombre='Tornillo hexagonal')
+        ProductoFactory(nombre='Tuerca')
+
+        resultados = list(buscar(Producto.objects.all(), 'tornillo').order_by(
+            '-relevancia', 'pk'))
+
+        assert resultados == [exacto, prefijo, contiene]
+
+    def test_relevancia_decimal_exacta(self):
+        """
+        Test que verifica que la relevancia es un Decimal que se puede comparar por igualdad.
+        """
+        ProductoFactory(nombre='Tornillo hexagonal')
+
+        [producto] = buscar(Producto.objects.all(), 'tornillo')
+
+        assert isinstance(producto.relevancia, Decimal)
+        assert buscar(Producto.objects.all(), 'tornillo').filter(
+            relevancia=producto.relevancia).count() == 1
+
+    def test_busca_en_codigo_cif_y_email(self):
+        """
+        Test que verifica que también se busca por código, CIF y email.
+        """
+        producto = ProductoFactory(codigo_producto='REF-99812')
+        cliente_cif = ClienteFactory(cif='B76543210')
+        cliente_email = ClienteFactory(email='compras@ferreteria-lopez.es')
+
+        assert list(buscar(Producto.objects.all(), '99812')) == [producto]
+        assert list(buscar(Cliente.objects.all(), 'b765')) == [cliente_cif]
+        assert list(buscar(Cliente.objects.all(), 'ferreteria-lopez')) == [
+            cliente_email]
+
+    def test_texto_vacio_no_filtra(self):
+        """
+        Test que verifica que una búsqueda vacía devuelve el queryset intacto.
+        """
+        ProductoFactory.create_batch(2)
+
+        assert buscar(Producto.objects.all(), '  ').count() == 2
+
+    def test_listado_pagina_resultados_de_busqueda(self, authenticated_client):
+        """
+        Test que verifica que los resultados de búsqueda se paginan por relevancia.
+        """
+        for i in range(30):
+            ProductoFactory(nombre=f'Cable {i}')
+        ProductoFactory(nombre='Cable')
+        url = reverse('lista_inventario')
+
+        primera = authenticated_client.get(url, {'buscarProducto': 'cable'})
+        pagina = primera.context['pagina']
+        segunda = authenticated_client.get(url + pagina.url_siguiente)
+
+        assert primera.context['productos'][0].nombre == 'Cable'
+        nombres = [p.nombre for p in primera.context['productos']] + \
+            [p.nombre for p in segunda.context['productos']]
+        assert len(nombres) == len(set(nombres)) == 31
+
+    def test_sin_postgresql_usa_la_ruta_portable(self):
+        """
+        Test que verifica que fuera de PostgreSQL no se intentan crear índices.
+        """
+        if connection.vendor == 'postgresql':
+            pytest.skip('Solo aplica a bases de datos sin pg_trgm')
+
+        crear_indices_busqueda(using='default')
+
+        assert trigram_disponible() is False
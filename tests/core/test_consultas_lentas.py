@@ -0,0 +1,165 @@
+import pytest
+from django.test import override_settings
+from django.urls import reverse
+
+from core.consultas_lentas import RegistroConsultas, normalizar_sql, registro
+from core.models import ConsultaLenta
+from tests.clientes.factories import ClienteFactory
+
+
+@pytest.fixture(autouse=True)
+def registro_vacio():
+    registro.grupos.clear()
+    registro.descartadas = 0
+    yield
+    registro.grupos.clear()
+
+
+class TestNormalizarSQL:
+    """
+    Tests para la huella de las consultas.
+    """
+
+    def test_misma_huella_con_otros_valores(self):
+        """
+        Test que verifica que literales, parámetros y tamaños de IN/VALUES no cambian la huella.
+        """
+        huella, normalizado = normalizar_sql(
+            "SELECT * FROM t WHERE id IN (%s, %s, %s) AND nombre = 'Ana' LIMIT 21")
+        otra, _ = normalizar_sql(
+            "SELECT *  FROM t WHERE id IN (%s) AND nombre = 'Luis O''Neil' LIMIT 5")
+
+        assert huella == otra
+        assert normalizado == 'SELECT * FROM t WHERE id IN (...) AND nombre = ? LIMIT ?'
+
+        lote, normalizado = normalizar_sql('INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)')
+        uno, _ = normalizar_sql('INSERT INTO t (a, b) VALUES (%s, %s)')
+        assert lote == uno
+        assert normalizado.endswith('VALUES (...)')
+
+        assert (normalizar_sql('SAVEPOINT "s140458606791552_x13"')
+                == normalizar_sql('SAVEPOINT "s140458606791552_x2"'))
+
+
+@pytest.mark.django_db
+class TestRegistroConsultas:
+    """
+    Tests para el registro en memoria y su volcado a la tabla.
+    """
+
+    @override_settings(CONSULTAS_LENTAS_MAXIMO=2)
+    def test_registro_acotado(self):
+        """
+        Test que verifica que el registro no pasa del máximo de grupos y acumula los repetidos.
+        """
+        registro_prueba = RegistroConsultas()
+        for sql in ('SELECT 1 FROM a', 'SELECT 2 FROM a', 'SELECT 1 FROM b', 'SELECT 1 FROM c'):
+            registro_prueba.registrar(sql, 'vista', 5.0)
+
+        assert len(registro_prueba.grupos) == 2
+        assert registro_prueba.descartadas == 1
+        [grupo, _] = registro_prueba.grupos.values()
+        assert grupo['ejecuciones'] == 2
+        assert grupo['total'] == 10.0
+
+    def test_volcados_acumulan(self):
+        """
+        Test que verifica que volcados sucesivos suman ejecuciones y guardan el máximo.
+        """
+        registro_prueba = RegistroConsultas()
+        registro_prueba.registrar('SELECT * FROM t WHERE id = %s', 'detalle', 4.0)
+        registro_prueba.volcar(forzar=True)
+        registro_prueba.registrar('SELECT * FROM t WHERE id = %s', 'detalle', 9.0)
+        registro_prueba.registrar('SELECT * FROM t WHERE id = %s', 'detalle', 1.0)
+        registro_prueba.volcar(forzar=True)
+
+        consulta = ConsultaLenta.objects.get()
+        assert consulta.ejecuciones == 3
+        assert consulta.milisegundos_total == 14.0
+        assert consulta.milisegundos_maximo == 9.0
+        assert registro_prueba.grupos == {}
+
+
+@pytest.mark.django_db
+class TestConsultasLentasMiddleware:
+    """
+    Tests para el registro de consultas de las peticiones.
+    """
+
+    @override_settings(CONSULTAS_LENTAS_UMBRAL_MS=0, CONSULTAS_LENTAS_VOLCADO_SEGUNDOS=0)
+    def test_registra_consultas_por_vista(self, authenticated_client):
+        """
+        Test que verifica que las consultas se guardan con la vista y la pila del proyecto.
+        """
+        ClienteFactory.create_batch(3)
+
+        response = authenticated_client.get(reverse('listado_clientes'))
+
+        assert response.status_code == 200
+        consultas = ConsultaLenta.objects.filter(vista='listado_clientes')
+        assert consultas.exists()
+        assert any('clientes/views.py' in consulta.pila for consulta in consultas)
+        assert not ConsultaLenta.objects.filter(sql__contains='core_consultalenta').exists()
+
+    @override_settings(CONSULTAS_LENTAS_UMBRAL_MS=None)
+    def test_desactivado_sin_umbral(self, authenticated_client):
+        """
+        Test que verifica que sin umbral no se registra nada.
+        """
+        authenticated_client.get(reverse('listado_clientes'))
+
+        assert registro.grupos == {}
+        assert not ConsultaLenta.objects.exists()
+
+    @override_settings(CONSULTAS_LENTAS_UMBRAL_MS=10_000)
+    def test_consultas_rapidas_no_se_registran(self, authenticated_client):
+        """
+        Test que verifica que las consultas por debajo del umbral no se guardan.
+        """
+        authenticated_client.get(reverse('listado_clientes'))
+
+        assert registro.grupos == {}
+
+
+@pytest.mark.django_db
+class TestPaginaConsultasLentas:
+    """
+    Tests para la página de consultas lentas.
+    """
+
+    def test_staff_ve_las_huellas_por_tiempo_total(self, admin_client):
+        """
+        Test que verifica el orden por tiempo total, el filtro por vista y el volcado previo.
+        """
+        registro.registrar('SELECT * FROM rapida', 'listado_clientes', 1.0)
+        registro.registrar('SELECT * FROM lenta', 'lista_inventario', 80.0)
+
+        response = admin_client.get(reverse('consultas_lentas'))
+
+        assert response.status_code == 200
+        consultas = list(response.context['consultas'])
+        assert [c.sql for c in consultas] == ['SELECT * FROM lenta', 'SELECT * FROM rapida']
+
+        response = admin_client.get(reverse('consultas_lentas'), {'vista': 'listado_clientes'})
+        assert [c.vista for c in response.context['consultas']] == ['listado_clientes']
+
+    @override_settings(CONSULTAS_LENTAS_UMBRAL_MS=0)
+    def test_el_volcado_de_la_pagina_no_se_registra(self, admin_client):
+        """
+        Test que verifica que las consultas del volcado forzado no entran en el registro.
+        """
+        registro.registrar('SELECT * FROM lenta', 'lista_inventario', 80.0)
+
+        admin_client.get(reverse('consultas_lentas'))
+        registro.volcar(forzar=True)
+
+        registradas = ConsultaLenta.objects.filter(vista='consultas_lentas')
+        assert registradas.filter(sql__startswith='SELECT').exists()
+        assert not registradas.filter(sql__contains='INTO "core_consultalenta"').exists()
+        assert not registradas.filter(sql__startswith='UPDATE "core_consultalenta"').exists()
+
+    def test_usuario_sin_staff_no_accede(self, authenticated_client):
+        """
+        Test que verifica que un usuario normal recibe 403.
+        """
+        assert authenticated_client.get(reverse('consultas_lentas')).status_code == 403
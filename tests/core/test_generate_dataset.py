@@ -0,0 +1,90 @@
+import pytest
+from io import StringIO
+from django.core.management import call_command
+from django.db.models import Sum
+
+from clientes.models import Cliente
+from inventario.models import Inventario, MovimientoStock, ReposicionPendiente, StockProducto
+from pedidos.models import DetalleOrdenVenta, OrdenVenta, PedidoProveedor
+from pedidos.services import totales_descuadrados
+from pedidos.signals import ESTADOS_CON_RESERVA
+
+
+def generar(**opciones):
+    argumentos = {
+        'clientes': 20, 'proveedores': 5, 'productos': 30, 'ordenes': 60,
+        'pedidos': 15, 'lote': 25, 'semilla': 7, 'limpiar': True,
+    }
+    argumentos.update(opciones)
+    salida = StringIO()
+    call_command('generate_dataset', stdout=salida, **argumentos)
+    return salida.getvalue()
+
+
+@pytest.mark.django_db
+class TestGenerateDataset:
+    """
+    Tests para el comando generate_dataset.
+    """
+
+    def test_genera_las_cantidades_pedidas(self):
+        """
+        Test que verifica el número de filas de cada tabla.
+        """
+        salida = generar()
+
+        assert Cliente.objects.count() == 20
+        assert OrdenVenta.objects.count() == 60
+        assert PedidoProveedor.objects.count() == 15
+        assert Inventario.objects.count() == 30
+        assert StockProducto.objects.count() == 30
+        assert '✅ Dataset generado' in salida
+
+    def test_misma_semilla_mismos_datos(self):
+        """
+        Test que verifica que dos ejecuciones con la misma semilla coinciden.
+        """
+        generar()
+        primera = list(OrdenVenta.objects.order_by('numero_orden').values_list(
+            'numero_orden', 'fecha_orden', 'estado', 'total'))
+
+        generar()
+        segunda = list(OrdenVenta.objects.order_by('numero_orden').values_list(
+            'numero_orden', 'fecha_orden', 'estado', 'total'))
+
+        assert primera == segunda
+
+    def test_documentos_con_empleado_creador(self, empleado):
+        """
+        Test que verifica que órdenes, pedidos y líneas se asignan a los usuarios existentes.
+        """
+        generar()
+
+        assert not OrdenVenta.objects.filter(empleado_creador__isnull=True).exists()
+        assert not PedidoProveedor.objects.filter(empleado_creador__isnull=True).exists()
+        assert not DetalleOrdenVenta.objects.exclude(empleado_creador=empleado).exists()
+
+    def test_totales_e_inventario_coherentes(self):
+        """
+        Test que verifica totales, reservas, libro de movimientos y cola de reposición.
+        """
+        generar()
+
+        assert totales_descuadrados(OrdenVenta) == []
+        assert totales_descuadrados(PedidoProveedor) == []
+
+        reservado = DetalleOrdenVenta.objects.filter(
+            orden__estado__in=ESTADOS_CON_RESERVA).aggregate(total=Sum('cantidad'))['total']
+        assert Inventario.objects.aggregate(
+            total=Sum('cantidad_reservada'))['total'] == reservado
+
+        for inventario in Inventario.objects.all():
+            libro = MovimientoStock.objects.filter(producto=inventario.producto_id).aggregate(
+                actual=Sum('delta_actual'), reservada=Sum('delta_reservada'))
+            assert (libro['actual'], libro['reservada']) == (
+                inventario.cantidad_actual, inventario.cantidad_reservada)
+            assert inventario.cantidad_actual >= inventario.cantidad_reservada
+
+        assert ReposicionPendiente.objects.count() == sum(
+            1 for stock in StockProducto.objects.select_related('producto')
+            if stock.cantidad_actual - stock.cantidad_reservada <= stock.producto.stock_minimo)
@@ -0,0 +1,82 @@
+import json
+import logging
+import pytest
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+
+from tests.pedidos.factories import DetalleOrdenVentaFactory
+
+
+def _lineas_log(caplog):
+    return [json.loads(registro.getMessage()) for registro in caplog.records
+            if registro.name == 'mystock.peticiones']
+
+
+@pytest.mark.django_db
+class TestInstrumentacionMiddleware:
+    """
+    Tests para la instrumentación de consultas y tiempos por petición.
+    """
+
+    @override_settings(INSTRUMENTACION_MUESTREO=1)
+    def test_cabecera_server_timing_y_log(self, authenticated_client, caplog):
+        """
+        Test que verifica la cabecera Server-Timing y la línea de log con la vista resuelta.
+        """
+        with caplog.at_level(logging.INFO, logger='mystock.peticiones'):
+            response = authenticated_client.get(reverse('listado_ordenes_venta'))
+
+        assert response.status_code == 200
+        assert response['Server-Timing'].startswith('db;dur=')
+        assert 'total;dur=' in response['Server-Timing']
+
+        [linea] = _lineas_log(caplog)
+        assert linea['vista'] == 'listado_ordenes_venta'
+        assert linea['metodo'] == 'GET'
+        assert linea['estado'] == 200
+        assert linea['consultas'] > 0
+        assert f'desc="{linea["consultas"]} consultas"' in response['Server-Timing']
+        assert connection.execute_wrappers == []
+
+    @override_settings(INSTRUMENTACION_MUESTREO=0)
+    def test_peticiones_no_muestreadas(self, authenticated_client, caplog):
+        """
+        Test que verifica que sin muestreo no hay cabecera ni log.
+        """
+        with caplog.at_level(logging.INFO, logger='mystock.peticiones'):
+            response = authenticated_client.get(reverse('listado_ordenes_venta'))
+
+        assert 'Server-Timing' not in response
+        assert _lineas_log(caplog) == []
+
+    @override_settings(INSTRUMENTACION_MUESTREO=1)
+    def test_streaming_cuenta_consultas_del_contenido(self, authenticated_client, caplog):
+        """
+        Test que verifica que en una exportación se registran las consultas hechas al enviar el CSV.
+        """
+        DetalleOrdenVentaFactory.create_batch(3)
+
+        with caplog.at_level(logging.INFO, logger='mystock.peticiones'):
+            response = authenticated_client.get(reverse('exportar_ordenes_venta'))
+            assert _lineas_log(caplog) == []
+            b''.join(response.streaming_content)
+
+        [linea] = _lineas_log(caplog)
+        consultas_cabecera = int(
+            response['Server-Timing'].split('desc="')[1].split(' ')[0])
+        assert linea['vista'] == 'exportar_ordenes_venta'
+        assert linea['consultas'] > consultas_cabecera
+        assert connection.execute_wrappers == []
+
+    @override_settings(INSTRUMENTACION_MUESTREO=1)
+    def test_url_inexistente(self, client, caplog):
+        """
+        Test que verifica que una ruta sin vista se registra sin nombre de vista.
+        """
+        with caplog.at_level(logging.INFO, logger='mystock.peticiones'):
+            response = client.get('/no-existe/')
+
+        assert response.status_code == 404
+        [linea] = _lineas_log(caplog)
+        assert linea['vista'] is None
@@ -0,0 +1,94 @@
+import pytest
+from django.db import transaction
+from django.test import override_settings
+from django.urls import reverse
+from prometheus_client import REGISTRY
+
+from tests.pedidos.factories import DetalleOrdenVentaFactory, OrdenVentaFactory
+
+
+def _valor(nombre, **etiquetas):
+    return REGISTRY.get_sample_value(nombre, etiquetas) or 0
+
+
+@pytest.mark.django_db
+class TestEndpointMetricas:
+    """
+    Tests para el endpoint /metrics.
+    """
+
+    def test_staff_ve_las_metricas_por_vista(self, admin_client):
+        """
+        Test que verifica el formato de texto y los histogramas de latencia y consultas por vista.
+        """
+        admin_client.get(reverse('listado_clientes'))
+
+        response = admin_client.get(reverse('metricas'))
+
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+        contenido = response.content.decode()
+        assert 'mystock_peticion_segundos_bucket{le="0.005",metodo="GET",vista="listado_clientes"}' in contenido
+        assert 'mystock_peticion_consultas_count{vista="listado_clientes"}' in contenido
+
+    def test_usuario_sin_staff_no_accede(self, authenticated_client, client):
+        """
+        Test que verifica que un usuario normal recibe 403 y uno anónimo va al login.
+        """
+        assert authenticated_client.get(reverse('metricas')).status_code == 403
+
+        response = client.get(reverse('metricas'))
+        assert response.status_code == 302
+        assert response.url.startswith('/login/')
+
+    @override_settings(METRICAS_TOKEN='secreto')
+    def test_acceso_con_token(self, client):
+        """
+        Test que verifica el acceso de Prometheus con la cabecera Authorization.
+        """
+        response = client.get(reverse('metricas'), HTTP_AUTHORIZATION='Bearer secreto')
+        assert response.status_code == 200
+
+        response = client.get(reverse('metricas'), HTTP_AUTHORIZATION='Bearer otro')
+        assert response.status_code == 302
+
+
+@pytest.mark.django_db
+class TestMetricasStock:
+    """
+    Tests para las métricas del motor de stock.
+    """
+
+    def test_reservas_liberaciones_y_bloqueos(self, django_capture_on_commit_callbacks):
+        """
+        Test que verifica los contadores de reservas y liberaciones y el histograma de bloqueos.
+        """
+        reservas = _valor('mystock_stock_reservas_total', operacion='reserva')
+        unidades = _valor('mystock_stock_reservas_unidades_total', operacion='reserva')
+        liberaciones = _valor('mystock_stock_reservas_total', operacion='liberacion')
+        bloqueos = _valor('mystock_inventario_bloqueo_segundos_count')
+
+        with django_capture_on_commit_callbacks(execute=True):
+            detalle = DetalleOrdenVentaFactory(
+                orden=OrdenVentaFactory(estado='pendiente'), cantidad=3)
+            detalle.delete()
+
+        assert _valor('mystock_stock_reservas_total', operacion='reserva') == reservas + 1
+        assert _valor('mystock_stock_reservas_unidades_total', operacion='reserva') == unidades + 3
+        assert _valor('mystock_stock_reservas_total', operacion='liberacion') == liberaciones + 1
+        assert _valor('mystock_inventario_bloqueo_segundos_count') >= bloqueos + 2
+
+    def test_reserva_deshecha_no_cuenta(self, django_capture_on_commit_callbacks):
+        """
+        Test que verifica que una orden revertida no suma a los contadores de reservas.
+        """
+        reservas = _valor('mystock_stock_reservas_total', operacion='reserva')
+
+        with django_capture_on_commit_callbacks(execute=True):
+            with pytest.raises(RuntimeError):
+                with transaction.atomic():
+                    DetalleOrdenVentaFactory(
+                        orden=OrdenVentaFactory(estado='pendiente'), cantidad=3)
+                    raise RuntimeError('orden revertida')
+
+        assert _valor('mystock_stock_reservas_total', operacion='reserva') == reservas
@@ -0,0 +1,107 @@
+import re
+import pytest
+from datetime import date
+from django.db import transaction
+from django.urls import reverse
+
+from core.models import ContadorDocumento
+from core.numeracion import NumeracionAgotada, reservar_numeros, siguiente_numero
+from tests.pedidos.factories import OrdenVentaFactory, PedidoProveedorFactory
+
+
+@pytest.mark.django_db
+class TestNumeracionDocumentos:
+    """
+    Tests para la numeración correlativa de pedidos y órdenes.
+    """
+
+    def test_numeros_correlativos_por_serie_y_anio(self):
+        """
+        Test que verifica que cada serie y año lleva su propio contador.
+        """
+        assert siguiente_numero('PED', anio=2025) == 'PED-2025-000001'
+        assert siguiente_numero('PED', anio=2025) == 'PED-2025-000002'
+        assert siguiente_numero('PED', anio=2026) == 'PED-2026-000001'
+        assert siguiente_numero('ORD', anio=2025) == 'ORD-2025-000001'
+
+    def test_reserva_de_bloques(self):
+        """
+        Test que verifica que un bloque reserva números consecutivos.
+        """
+        siguiente_numero('PED', anio=2026)
+
+        assert reservar_numeros('PED', 3, anio=2026) == [
+            'PED-2026-000002', 'PED-2026-000003', 'PED-2026-000004']
+        assert siguiente_numero('PED', anio=2026) == 'PED-2026-000005'
+
+    def test_una_transaccion_deshecha_no_deja_huecos(self):
+        """
+        Test que verifica que el contador vuelve atrás con la transacción.
+        """
+        siguiente_numero('PED', anio=2026)
+
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                siguiente_numero('PED', anio=2026)
+                raise RuntimeError('fallo al guardar')
+
+        assert siguiente_numero('PED', anio=2026) == 'PED-2026-000002'
+
+    def test_serie_agotada(self):
+        """
+        Test que verifica que una serie no pasa del ancho fijo de los números.
+        """
+        ContadorDocumento.objects.create(serie='PED', anio=2026, ultimo_numero=999_998)
+
+        assert siguiente_numero('PED', anio=2026) == 'PED-2026-999999'
+        with pytest.raises(NumeracionAgotada):
+            with transaction.atomic():
+                siguiente_numero('PED', anio=2026)
+
+        assert ContadorDocumento.objects.get(serie='PED', anio=2026).ultimo_numero == 999_999
+
+    def test_los_documentos_reciben_su_numero_al_guardarse(self):
+        """
+        Test que verifica el formato de los números de pedidos y órdenes.
+        """
+        primera, segunda = OrdenVentaFactory.create_batch(2, fecha_orden=date(2026, 3, 1))
+        pedido = PedidoProveedorFactory(fecha_pedido=date(2026, 3, 1))
+
+        assert primera.numero_orden == 'PED-2026-000001'
+        assert segunda.numero_orden == 'PED-2026-000002'
+        assert re.fullmatch(r'ORD-2026-\d{6}', pedido.numero_pedido)
+        assert ContadorDocumento.objects.get(serie='PED', anio=2026).ultimo_numero == 2
+
+    def test_el_anio_es_el_de_la_fecha_del_documento(self):
+        """
+        Test que verifica que un documento con fecha de otro año toma la serie de ese año.
+        """
+        orden = OrdenVentaFactory(fecha_orden='2025-12-31')
+        pedido = PedidoProveedorFactory(fecha_pedido=date(2024, 6, 1))
+
+        assert orden.numero_orden == 'PED-2025-000001'
+        assert pedido.numero_pedido == 'ORD-2024-000001'
+
+    def test_guardar_de_nuevo_no_cambia_el_numero(self):
+        """
+        Test que verifica que las actualizaciones conservan el número asignado.
+        """
+        orden = OrdenVentaFactory()
+        numero = orden.numero_orden
+
+        orden.notas = 'Actualizada'
+        orden.save()
+
+        orden.refresh_from_db()
+        assert orden.numero_orden == numero
+
+    def test_filtro_por_prefijo_del_numero(self, authenticated_client):
+        """
+        Test que verifica el filtro del listado por el principio del número.
+        """
+        primera, segunda = OrdenVentaFactory.create_batch(2, fecha_orden=date(2026, 3, 1))
+
+        response = authenticated_client.get(
+            reverse('listado_ordenes_venta'), {'numero': 'ped-2026-000002'})
+
+        assert list(response.context['ordenes']) == [segunda]
@@ -0,0 +1,118 @@
+import pytest
+from datetime import date
+from decimal import Decimal
+from django.test import RequestFactory
+from django.urls import reverse
+
+from core.busqueda import buscar
+from core.paginacion import _campos_orden, _decodificar_cursor, paginar_keyset
+from inventario.models import Producto
+from pedidos.models import OrdenVenta
+from tests.inventario.factories import ProductoFactory
+from tests.pedidos.factories import OrdenVentaFactory
+
+
+def _recorrer(url_inicial, orden, por_pagina):
+    """Recorre todas las páginas hacia delante siguiendo los cursores."""
+    paginas = []
+    consulta = url_inicial
+    while consulta is not None:
+        request = RequestFactory().get(f'/listado/{consulta}')
+        pagina = paginar_keyset(
+            request, OrdenVenta.objects.all(), orden, por_pagina=por_pagina)
+        paginas.append(pagina)
+        consulta = pagina.url_siguiente
+    return paginas
+
+
+@pytest.mark.django_db
+class TestPaginacionKeyset:
+    """
+    Tests para la paginación por cursor de los listados.
+    """
+
+    def test_recorre_todas_las_filas_sin_repetir(self):
+        """
+        Test que verifica que las páginas cubren todo el listado, incluso con fechas repetidas.
+        """
+        for dia in (1, 1, 1, 2, 2, 3, 4, 4, 5, 6, 6):
+            OrdenVentaFactory(fecha_orden=date(2025, 1, dia))
+
+        paginas = _recorrer('', ('-fecha_orden',), por_pagina=4)
+
+        ids = [orden.id for pagina in paginas for orden in pagina]
+        esperado = list(OrdenVenta.objects.order_by(
+            '-fecha_orden', '-pk').values_list('id', flat=True))
+        assert ids == esperado
+        assert [len(pagina) for pagina in paginas] == [4, 4, 3]
+        assert not paginas[0].hay_anterior
+        assert not paginas[-1].hay_siguiente
+
+    def test_empates_de_relevancia_en_el_borde_de_pagina(self):
+        """
+        Test que verifica que las filas con la misma relevancia no se pierden entre páginas.
+        """
+        ProductoFactory(nombre='Cable')
+        for i in range(7):
+            ProductoFactory(nombre=f'Cable {i}')
+        for i in range(4):
+            ProductoFactory(nombre=f'Gran cable {i}')
+        orden = ('-relevancia',)
+
+        vistos = []
+        consulta = ''
+        while consulta is not None:
+            request = RequestFactory().get(f'/listado/{consulta}')
+            queryset = buscar(Producto.objects.all(), 'cable')
+            pagina = paginar_keyset(request, queryset, orden, por_pagina=3)
+            vistos.extend(producto.id for producto in pagina)
+            if pagina.cursor_siguiente:
+                _, valores = _decodificar_cursor(
+                    pagina.cursor_siguiente, queryset, _campos_orden(orden))
+                assert isinstance(valores[0], Decimal)
+            consulta = pagina.url_siguiente
+
+        esperado = list(buscar(Producto.objects.all(), 'cable').order_by(
+            '-relevancia', '-pk').values_list('id', flat=True))
+        assert vistos == esperado
+        assert len(vistos) == 12
+
+    def test_volver_a_la_pagina_anterior(self):
+        """
+        Test que verifica que el cursor anterior devuelve la misma página.
+        """
+        OrdenVentaFactory.create_batch(7)
+        paginas = _recorrer('', ('-fecha_orden',), por_pagina=3)
+
+        request = RequestFactory().get(f'/listado/{paginas[1].url_anterior}')
+        anterior = paginar_keyset(
+            request, OrdenVenta.objects.all(), ('-fecha_orden',), por_pagina=3)
+
+        assert list(anterior) == list(paginas[0])
+        assert not anterior.hay_anterior
+        assert anterior.hay_siguiente
+
+    def test_cursor_conserva_los_filtros(self):
+        """
+        Test que verifica que los enlaces mantienen los filtros de la búsqueda.
+        """
+        OrdenVentaFactory.create_batch(3, estado='pendiente')
+        request = RequestFactory().get('/listado/', {'estado': 'pendiente'})
+
+        pagina = paginar_keyset(request, OrdenVenta.objects.filter(
+            estado='pendiente'), ('-fecha_orden',), por_pagina=2)
+
+        assert 'estado=pendiente' in pagina.url_siguiente
+        assert 'cursor=' in pagina.url_siguiente
+
+    def test_cursor_invalido_muestra_la_primera_pagina(self, authenticated_client):
+        """
+        Test que verifica que un cursor manipulado no rompe el listado.
+        """
+        OrdenVentaFactory.create_batch(2)
+
+        response = authenticated_client.get(
+            reverse('listado_ordenes_venta'), {'cursor': 'no-es-un-cursor'})
+
+        assert response.status_code == 200
+        assert len(response.context['ordenes']) == 2
@@ -2,7 +2,7 @@ import factory
 from factory.django import DjangoModelFactory
 from factory.fuzzy import FuzzyChoice, FuzzyDecimal, FuzzyInteger
 
-from inventario.models import CategoriaProducto, Producto, Inventario
+from inventario.models import Almacen, CategoriaProducto, Producto, Inventario
 
 
 class CategoriaProductoFactory(DjangoModelFactory):
@@ -33,6 +33,18 @@ class ProductoFactory(DjangoModelFactory):
     codigo_producto = factory.Sequence(lambda n: f"TEST{n:04d}")
 
 
+class AlmacenFactory(DjangoModelFactory):
+    """
+    Factory para crear almacenes de prueba.
+    """
+    class Meta:
+        model = Almacen
+        django_get_or_create = ('codigo',)
+
+    codigo = factory.Sequence(lambda n: f'ALM{n:03d}')
+    nombre = factory.Sequence(lambda n: f'Almacén {n}')
+
+
 class InventarioFactory(DjangoModelFactory):
     """
     Factory para crear inventarios de prueba.
@@ -0,0 +1,66 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from inventario.codigos import registrar_codigos, reservar_codigos, siguiente_codigo
+from inventario.models import ContadorCodigo, Producto
+from tests.inventario.factories import CategoriaProductoFactory, ProductoFactory
+
+
+@pytest.mark.django_db
+class TestContadorCodigos:
+    """
+    Tests para el reparto de códigos de producto por prefijo.
+    """
+
+    def test_el_contador_empieza_en_el_mayor_codigo_existente(self):
+        """
+        Test que verifica que el contador se inicia con los códigos ya usados.
+        """
+        ProductoFactory(codigo_producto='EL0009')
+        ProductoFactory(codigo_producto='EL10000')
+
+        assert siguiente_codigo('EL') == 'EL10001'
+        assert ContadorCodigo.objects.get(prefijo='EL').ultimo_numero == 10001
+
+    def test_reserva_bloques_consecutivos_sin_recorrer_productos(self):
+        """
+        Test que verifica los bloques consecutivos y que no se consultan los productos.
+        """
+        assert reservar_codigos('HE', 3) == ['HE0001', 'HE0002', 'HE0003']
+
+        with CaptureQueriesContext(connection) as consultas:
+            assert reservar_codigos('HE', 2) == ['HE0004', 'HE0005']
+
+        assert not any('inventario_producto' in q['sql'] for q in consultas.captured_queries)
+
+    def test_los_codigos_puestos_a_mano_avanzan_el_contador(self):
+        """
+        Test que verifica que un código explícito no se vuelve a repartir.
+        """
+        siguiente_codigo('EL')
+
+        registrar_codigos(['EL0050', 'EL0020', 'TEST0001'])
+
+        assert siguiente_codigo('EL') == 'EL0051'
+
+    def test_categorias_con_el_mismo_prefijo_no_repiten_codigo(self, authenticated_client):
+        """
+        Test que verifica que dos categorías con el mismo prefijo comparten contador.
+        """
+        electricidad = CategoriaProductoFactory(nombre_categoria='Electricidad')
+        electronica = CategoriaProductoFactory(nombre_categoria='Electrónica')
+        url = reverse('crear_producto')
+
+        for nombre, categoria in (('Cable', electricidad), ('Placa', electronica)):
+            response = authenticated_client.post(url, {
+                'nombreProducto': nombre,
+                'categoria': categoria.id,
+                'precioCompra': '1.00',
+                'precioVenta': '2.00',
+            })
+            assert response.status_code == 302
+
+        codigos = sorted(Producto.objects.values_list('codigo_producto', flat=True))
+        assert codigos == ['EL0001', 'EL0002']
@@ -0,0 +1,125 @@
+import json
+import pytest
+from io import StringIO
+from django.core.management import call_command
+
+from inventario.models import Inventario, MovimientoStock, Producto, StockProducto
+from tests.inventario.factories import CategoriaProductoFactory, ProductoFactory
+
+
+@pytest.mark.django_db
+class TestImportProductos:
+    """
+    Tests para el comando import_productos.
+    """
+
+    def _csv(self, tmp_path, filas):
+        archivo = tmp_path / 'productos.csv'
+        cabecera = 'nombre,categoria,precio_compra,precio_venta,stock_minimo,unidad_medida,cantidad'
+        archivo.write_text('\n'.join([cabecera, *filas]) + '\n', encoding='utf-8')
+        return archivo
+
+    def test_importa_por_lotes_con_codigos_e_inventario(self, tmp_path):
+        """
+        Test que verifica los códigos correlativos por categoría y el stock inicial.
+        """
+        categoria = CategoriaProductoFactory(nombre_categoria='Electricidad')
+        ProductoFactory(categoria=categoria, codigo_producto='EL0007')
+        archivo = self._csv(tmp_path, [
+            f'cable {n},Electricidad,1.50,3.00,5,Metro,{n}' for n in range(5)
+        ])
+        salida = StringIO()
+
+        call_command('import_productos', str(archivo), '--lote', '2', stdout=salida)
+
+        codigos = sorted(Producto.objects.filter(nombre__startswith='Cable')
+                         .values_list('codigo_producto', flat=True))
+        assert codigos == ['EL0008', 'EL0009', 'EL0010', 'EL0011', 'EL0012']
+        producto = Producto.objects.get(nombre='Cable 3')
+        assert Inventario.objects.get(producto=producto).cantidad_actual == 3
+        assert StockProducto.objects.get(producto=producto).cantidad_actual == 3
+        assert MovimientoStock.objects.filter(tipo_documento='ajuste').count() == 4
+        assert '5 productos' in salida.getvalue()
+
+    def test_filas_invalidas_se_rechazan(self, tmp_path):
+        """
+        Test que verifica que las filas erróneas no detienen la importación.
+        """
+        CategoriaProductoFactory(nombre_categoria='Electricidad')
+        archivo = self._csv(tmp_path, [
+            'bueno,Electricidad,1,2,0,Unidad,0',
+            'precio malo,Electricidad,abc,2,0,Unidad,0',
+            'sin categoria,Inexistente,1,2,0,Unidad,0',
+        ])
+        salida = StringIO()
+
+        call_command('import_productos', str(archivo), stdout=salida)
+
+        assert list(Producto.objects.values_list('nombre', flat=True)) == ['Bueno']
+        assert '2 fila(s) rechazada(s)' in salida.getvalue()
+
+    def test_valores_que_no_caben_se_rechazan(self, tmp_path):
+        """
+        Test que verifica que NaN, infinitos y valores fuera de columna se rechazan por fila.
+        """
+        CategoriaProductoFactory(nombre_categoria='Electricidad')
+        archivo = self._csv(tmp_path, [
+            'primero,Electricidad,1,2,0,Unidad,0',
+            'no numero,Electricidad,nan,2,0,Unidad,0',
+            'infinito,Electricidad,1,Infinity,0,Unidad,0',
+            'enorme,Electricidad,1,1e20,0,Unidad,0',
+            'decimales,Electricidad,1.005,2,0,Unidad,0',
+            f'{"x" * 201},Electricidad,1,2,0,Unidad,0',
+            f'unidad larga,Electricidad,1,2,0,{"u" * 51},0',
+            'ultimo,Electricidad,1,2,0,Unidad,0',
+        ])
+        salida = StringIO()
+
+        call_command('import_productos', str(archivo), stdout=salida)
+
+        assert sorted(Producto.objects.values_list('nombre', flat=True)) == [
+            'Primero', 'Ultimo']
+        assert 'Fila 2: precio_compra no es un número válido' in salida.getvalue()
+        assert 'Fila 6: nombre supera los 200 caracteres' in salida.getvalue()
+        assert '6 fila(s) rechazada(s)' in salida.getvalue()
+
+    def test_jsonl_y_crear_categorias(self, tmp_path):
+        """
+        Test que verifica la lectura de JSONL y la creación de categorías.
+        """
+        archivo = tmp_path / 'productos.jsonl'
+        archivo.write_text(json.dumps({
+            'nombre': 'martillo', 'categoria': 'herramientas',
+            'precio_compra': '4.5', 'precio_venta': '9', 'cantidad': 2,
+        }) + '\n', encoding='utf-8')
+
+        call_command('import_productos', str(archivo), '--crear-categorias',
+                     stdout=StringIO())
+
+        producto = Producto.objects.get(nombre='Martillo')
+        assert producto.codigo_producto == 'HE0001'
+        assert producto.categoria.nombre_categoria == 'Herramientas'
+
+    def test_jsonl_con_linea_mal_formada(self, tmp_path):
+        """
+        Test que verifica que una línea JSON rota se rechaza con su número y la importación sigue.
+        """
+        CategoriaProductoFactory(nombre_categoria='Herramientas')
+        bueno = {'nombre': 'martillo', 'categoria': 'herramientas', 'cantidad': 1}
+        archivo = tmp_path / 'productos.jsonl'
+        archivo.write_text('\n'.join([
+            json.dumps(bueno),
+            '',
+            '{"nombre": "sierra", ',
+            '[1, 2]',
+            json.dumps({**bueno, 'nombre': 'alicates'}),
+        ]) + '\n', encoding='utf-8')
+        salida = StringIO()
+
+        call_command('import_productos', str(archivo), '--lote', '2', stdout=salida)
+
+        assert sorted(Producto.objects.values_list('nombre', flat=True)) == [
+            'Alicates', 'Martillo']
+        assert 'Fila 3: JSON no válido' in salida.getvalue()
+        assert 'Fila 4: la línea no es un objeto JSON' in salida.getvalue()
+        assert '2 fila(s) rechazada(s)' in salida.getvalue()
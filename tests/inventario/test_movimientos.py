@@ -0,0 +1,283 @@
+import pytest
+from django.db import IntegrityError, transaction
+from django.db.transaction import TransactionManagementError
+
+from inventario.models import (
+    Almacen, Inventario, MovimientoStock, Producto, ReposicionPendiente, StockProducto)
+from inventario.services import (
+    bloquear_inventarios, inicializar_almacenes, registrar_movimientos)
+from pedidos.signals import ajustar_reserva_detalle_orden, obtener_estado_inventario
+from tests.inventario.factories import AlmacenFactory, ProductoFactory, InventarioFactory
+from tests.pedidos.factories import OrdenVentaFactory, DetalleOrdenVentaFactory
+
+
+@pytest.mark.django_db
+class TestRegistrarMovimientos:
+    """
+    Tests para el libro de movimientos de stock y su proyección en Inventario.
+    """
+
+    def test_movimientos_se_proyectan_en_inventario(self):
+        """
+        Test que verifica que los deltas del mismo producto se suman en un lote.
+        """
+        inventario = InventarioFactory(
+            cantidad_actual=10, cantidad_reservada=0)
+
+        registrar_movimientos([
+            MovimientoStock(producto=inventario.producto, delta_reservada=3,
+                            tipo_documento='ajuste'),
+            MovimientoStock(producto=inventario.producto, delta_actual=-2,
+                            delta_reservada=1, tipo_documento='ajuste'),
+        ])
+
+        inventario.refresh_from_db()
+        assert inventario.cantidad_actual == 8
+        assert inventario.cantidad_reservada == 4
+        assert MovimientoStock.objects.filter(
+            producto=inventario.producto).count() == 2
+
+    def test_crea_inventario_si_no_existe(self):
+        """
+        Test que verifica que se crea el inventario del producto si falta.
+        """
+        producto = ProductoFactory()
+
+        registrar_movimientos([MovimientoStock(
+            producto=producto, delta_actual=5, tipo_documento='ajuste')])
+
+        inventario = Inventario.objects.get(producto=producto)
+        assert inventario.cantidad_actual == 5
+
+    def test_movimientos_vacios_no_se_insertan(self):
+        """
+        Test que verifica que los movimientos sin variación se descartan.
+        """
+        producto = ProductoFactory()
+
+        registrar_movimientos([MovimientoStock(
+            producto=producto, tipo_documento='ajuste')])
+
+        assert not MovimientoStock.objects.exists()
+
+    def test_reserva_de_detalle_queda_en_el_libro(self):
+        """
+        Test que verifica que la reserva de una línea de orden deja su movimiento.
+        """
+        orden = OrdenVentaFactory(estado='pendiente')
+        detalle = DetalleOrdenVentaFactory(orden=orden, cantidad=4)
+
+        movimiento = MovimientoStock.objects.get(producto=detalle.producto)
+        assert movimiento.tipo_documento == 'orden_venta'
+        assert movimiento.documento_id == orden.id
+        assert movimiento.delta_reservada == 4
+        assert movimiento.delta_actual == 0
+
+    def test_error_capturado_no_rompe_la_transaccion_exterior(self, monkeypatch):
+        """
+        Test que verifica que un fallo al proyectar deshace solo sus movimientos.
+        """
+        producto = ProductoFactory()
+
+        def fallar(deltas):
+            raise IntegrityError('fallo simulado')
+
+        monkeypatch.setattr('inventario.services.aplicar_deltas', fallar)
+        with transaction.atomic():
+            try:
+                registrar_movimientos([MovimientoStock(
+                    producto=producto, delta_actual=5, tipo_documento='ajuste')])
+            except IntegrityError:
+                pass
+
+            # La transacción de quien llama sigue siendo utilizable
+            assert not MovimientoStock.objects.exists()
+
+
+@pytest.mark.django_db(transaction=True)
+class TestBloquearInventarios:
+    """
+    Tests para el bloqueo ordenado de inventarios.
+    """
+
+    def test_bloquea_todos_los_productos_en_una_consulta(self, django_assert_num_queries):
+        """
+        Test que verifica que todos los inventarios se obtienen de una vez.
+        """
+        inventarios = InventarioFactory.create_batch(3)
+        producto_ids = [inventario.producto_id for inventario in inventarios]
+
+        with transaction.atomic():
+            with django_assert_num_queries(1):
+                bloqueados = bloquear_inventarios(reversed(producto_ids))
+
+        assert list(bloqueados) == sorted(producto_ids)
+
+    def test_fuera_de_transaccion_falla(self):
+        """
+        Test que verifica que el bloqueo exige una transacción abierta.
+        """
+        inventario = InventarioFactory()
+
+        with pytest.raises(TransactionManagementError):
+            bloquear_inventarios([inventario.producto_id])
+
+
+@pytest.mark.django_db
+class TestStockPorAlmacen:
+    """
+    Tests para los saldos por almacén y el total mantenido por producto.
+    """
+
+    def test_movimientos_por_almacen_y_total(self):
+        """
+        Test que verifica que cada almacén tiene su saldo y el total los suma.
+        """
+        producto = ProductoFactory()
+        norte = AlmacenFactory()
+
+        registrar_movimientos([
+            MovimientoStock(producto=producto, delta_actual=10,
+                            tipo_documento='ajuste'),
+            MovimientoStock(producto=producto, almacen=norte, delta_actual=4,
+                            delta_reservada=1, tipo_documento='ajuste'),
+        ])
+
+        principal = Inventario.objects.get(
+            producto=producto, almacen=Almacen.principal())
+        en_norte = Inventario.objects.get(producto=producto, almacen=norte)
+        total = StockProducto.objects.get(producto=producto)
+        assert principal.cantidad_actual == 10
+        assert (en_norte.cantidad_actual, en_norte.cantidad_reservada) == (4, 1)
+        assert (total.cantidad_actual, total.cantidad_reservada) == (14, 1)
+
+    def test_un_inventario_por_producto_y_almacen(self):
+        """
+        Test que verifica el índice único (producto, almacén).
+        """
+        inventario = InventarioFactory()
+
+        with pytest.raises(IntegrityError), transaction.atomic():
+            Inventario.objects.create(
+                producto=inventario.producto, almacen=inventario.almacen)
+
+    def test_escrituras_directas_mantienen_el_total(self):
+        """
+        Test que verifica que altas y borrados de Inventario fuera del
+        servicio recalculan el total del producto.
+        """
+        inventario = InventarioFactory(cantidad_actual=7, cantidad_reservada=2)
+        otro = InventarioFactory(producto=inventario.producto,
+                                 almacen=AlmacenFactory(),
+                                 cantidad_actual=3, cantidad_reservada=0)
+
+        total = StockProducto.objects.get(producto=inventario.producto)
+        assert (total.cantidad_actual, total.cantidad_reservada) == (10, 2)
+
+        otro.delete()
+        total.refresh_from_db()
+        assert total.cantidad_actual == 7
+
+    def test_ajuste_de_reserva_comprueba_el_almacen(self):
+        """
+        Test que verifica que con almacén la disponibilidad es la de ese almacén.
+        """
+        norte = AlmacenFactory()
+        inventario = InventarioFactory(cantidad_actual=100, cantidad_reservada=0)
+        InventarioFactory(producto=inventario.producto, almacen=norte,
+                          cantidad_actual=2, cantidad_reservada=0)
+        orden = OrdenVentaFactory(estado='cancelado')
+        detalle = DetalleOrdenVentaFactory(
+            orden=orden, producto=inventario.producto, cantidad=1)
+
+        with pytest.raises(ValueError):
+            ajustar_reserva_detalle_orden(detalle, 5, almacen_id=norte.id)
+
+        ajustar_reserva_detalle_orden(detalle, 5)
+        assert obtener_estado_inventario(inventario.producto)['cantidad_reservada'] == 5
+        assert obtener_estado_inventario(
+            inventario.producto, norte.id)['cantidad_reservada'] == 0
+
+    def test_inicializar_almacenes_asigna_el_principal(self):
+        """
+        Test que verifica que los inventarios sin almacén pasan al principal
+        y se generan sus totales.
+        """
+        inventario = InventarioFactory(cantidad_actual=6)
+        Inventario.objects.filter(pk=inventario.pk).update(almacen=None)
+        StockProducto.objects.all().delete()
+
+        inicializar_almacenes()
+
+        inventario.refresh_from_db()
+        assert inventario.almacen == Almacen.principal()
+        assert StockProducto.objects.get(
+            producto=inventario.producto).cantidad_actual == 6
+
+
+@pytest.mark.django_db
+class TestColaReposicion:
+    """
+    Tests para la cola de reposición mantenida al mover stock.
+    """
+
+    def test_entra_y_sale_de_la_cola_con_los_movimientos(self):
+        """
+        Test que verifica que el producto entra al bajar de su mínimo y sale al reponerse.
+        """
+        producto = ProductoFactory(stock_minimo=5)
+        registrar_movimientos([MovimientoStock(
+            producto=producto, delta_actual=20, tipo_documento='ajuste')])
+        assert not ReposicionPendiente.objects.filter(producto=producto).exists()
+
+        registrar_movimientos([MovimientoStock(
+            producto=producto, delta_reservada=16, tipo_documento='ajuste')])
+        reposicion = ReposicionPendiente.objects.get(producto=producto)
+        assert reposicion.cantidad_disponible == 4
+        assert reposicion.faltante == 1
+
+        registrar_movimientos([MovimientoStock(
+            producto=producto, delta_actual=10, tipo_documento='ajuste')])
+        assert not ReposicionPendiente.objects.filter(producto=producto).exists()
+
+    def test_stock_bajo_coincide_con_la_cola(self):
+        """
+        Test que verifica que el aviso de stock bajo y la cola miran el disponible.
+        """
+        reservado = ProductoFactory(stock_minimo=50)
+        holgado = ProductoFactory(stock_minimo=50)
+        registrar_movimientos([
+            MovimientoStock(producto=reservado, delta_actual=60, delta_reservada=20,
+                            tipo_documento='ajuste'),
+            MovimientoStock(producto=holgado, delta_actual=60, tipo_documento='ajuste'),
+        ])
+
+        stock_bajo = dict(Producto.objects.con_stock().values_list('id', 'stock_bajo'))
+        assert stock_bajo == {reservado.id: True, holgado.id: False}
+        assert list(ReposicionPendiente.objects.values_list('producto_id', flat=True)) == [
+            reservado.id]
+
+    def test_cambio_de_stock_minimo_actualiza_la_cola(self):
+        """
+        Test que verifica que subir el mínimo de un producto lo pone en la cola.
+        """
+        inventario = InventarioFactory(cantidad_actual=10, cantidad_reservada=0,
+                                       producto__stock_minimo=0)
+        producto = inventario.producto
+        assert not ReposicionPendiente.objects.filter(producto=producto).exists()
+
+        producto.stock_minimo = 12
+        producto.save()
+
+        assert ReposicionPendiente.objects.get(producto=producto).faltante == 2
+
+    def test_borrar_producto_en_cola(self):
+        """
+        Test que verifica que un producto en la cola se puede borrar con su inventario.
+        """
+        inventario = InventarioFactory(cantidad_actual=0, producto__stock_minimo=3)
+        assert ReposicionPendiente.objects.filter(producto=inventario.producto).exists()
+
+        inventario.producto.delete()
+
+        assert not ReposicionPendiente.objects.exists()
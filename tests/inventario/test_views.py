@@ -1,7 +1,14 @@
+import csv
+import io
+import json
 import pytest
+from datetime import timedelta
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 
-from inventario.models import Producto, CategoriaProducto
+from inventario.models import Inventario, Producto, CategoriaProducto
 from tests.inventario.factories import ProductoFactory, CategoriaProductoFactory, InventarioFactory
 
 
@@ -63,6 +70,58 @@ class TestListInventoryView:
         assert producto2 not in response.context['productos']
 
 
+    def test_stock_anotado_sin_consultas_por_producto(self, authenticated_client):
+        """
+        Test que verifica que el stock sale de la consulta del listado y que
+        el número de consultas no crece con los productos mostrados.
+        """
+        url = reverse('lista_inventario')
+        InventarioFactory(cantidad_actual=40, cantidad_reservada=15,
+                          producto__stock_minimo=50)
+
+        with CaptureQueriesContext(connection) as pocas:
+            response = authenticated_client.get(url)
+        producto = response.context['productos'][0]
+        assert producto.cantidad_actual == 40
+        assert producto.cantidad_reservada == 15
+        assert producto.cantidad_disponible == 25
+        assert producto.stock_bajo is True
+        assert b'40 |' in response.content
+
+        InventarioFactory.create_batch(5)
+        with CaptureQueriesContext(connection) as muchas:
+            authenticated_client.get(url)
+        assert len(muchas) == len(pocas)
+
+
+@pytest.mark.django_db
+class TestProductoAdmin:
+    """
+    Tests para el listado de productos del admin.
+    """
+
+    def test_changelist_sin_consultas_por_producto(self, admin_client):
+        """
+        Test que verifica que el stock y su estado se muestran sin una
+        consulta por fila.
+        """
+        url = reverse('admin:inventario_producto_changelist')
+        InventarioFactory(cantidad_actual=5, producto__stock_minimo=10)
+        ProductoFactory()
+
+        with CaptureQueriesContext(connection) as pocas:
+            response = admin_client.get(url)
+        assert response.status_code == 200
+        contenido = response.content.decode()
+        assert 'Bajo' in contenido
+        assert 'Sin inventario' in contenido
+
+        InventarioFactory.create_batch(5)
+        with CaptureQueriesContext(connection) as muchas:
+            admin_client.get(url)
+        assert len(muchas) == len(pocas)
+
+
 @pytest.mark.django_db
 class TestCreateProductView:
     """
@@ -306,3 +365,138 @@ class TestCreateCategoryView:
 
         assert response.status_code == 200
         assert CategoriaProducto.objects.count() == 1
+
+
+@pytest.mark.django_db
+class TestCatalogoProductosApi:
+    """
+    Tests para la API de catálogo en streaming.
+    """
+
+    def _leer(self, response):
+        return json.loads(b''.join(response.streaming_content))['productos']
+
+    def test_catalogo_incluye_stock(self, authenticated_client):
+        """
+        Test que verifica que cada producto lleva su stock del inventario.
+        """
+        inventario = InventarioFactory(cantidad_actual=9, cantidad_reservada=2)
+        ProductoFactory()
+
+        response = authenticated_client.get(reverse('api_catalogo'))
+
+        assert response.status_code == 200
+        productos = {p['id']: p for p in self._leer(response)}
+        assert len(productos) == 2
+        assert productos[inventario.producto.id]['cantidad_actual'] == 9
+        assert productos[inventario.producto.id]['cantidad_reservada'] == 2
+
+    def test_updated_since_filtra_por_producto_o_stock(self, authenticated_client):
+        """
+        Test que verifica que solo se devuelven productos modificados desde la fecha.
+        """
+        antiguo = InventarioFactory()
+        sin_cambios = ProductoFactory()
+        hace_un_dia = timezone.now() - timedelta(days=1)
+        Producto.objects.update(actualizado_el=hace_un_dia - timedelta(days=1))
+        Inventario.objects.update(actualizado_el=hace_un_dia - timedelta(days=1))
+        Inventario.objects.filter(pk=antiguo.pk).update(actualizado_el=timezone.now())
+
+        response = authenticated_client.get(
+            reverse('api_catalogo'), {'updated_since': hace_un_dia.isoformat()})
+
+        ids = [p['id'] for p in self._leer(response)]
+        assert ids == [antiguo.producto.id]
+        assert sin_cambios.id not in ids
+
+    def test_etag_devuelve_304_sin_cambios(self, authenticated_client):
+        """
+        Test que verifica que un cliente con el ETag vigente recibe 304.
+        """
+        inventario = InventarioFactory()
+        url = reverse('api_catalogo')
+
+        primera = authenticated_client.get(url)
+        etag = primera['ETag']
+        segunda = authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        Inventario.objects.filter(pk=inventario.pk).update(
+            cantidad_actual=99, actualizado_el=timezone.now() + timedelta(seconds=1))
+        tercera = authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert segunda.status_code == 304
+        assert tercera.status_code == 200
+
+    def test_updated_since_invalido(self, authenticated_client):
+        """
+        Test que verifica que una fecha mal formada devuelve 400.
+        """
+        response = authenticated_client.get(
+            reverse('api_catalogo'), {'updated_since': 'ayer'})
+
+        assert response.status_code == 400
+
+
+@pytest.mark.django_db
+class TestColaReposicionViews:
+    """
+    Tests para la página y la API de la cola de reposición.
+    """
+
+    def test_pagina_lista_productos_bajo_minimo(self, authenticated_client):
+        """
+        Test que verifica que la página muestra solo los productos por reponer.
+        """
+        bajo = InventarioFactory(cantidad_actual=2, cantidad_reservada=0,
+                                 producto__stock_minimo=10)
+        InventarioFactory(cantidad_actual=50, cantidad_reservada=0,
+                          producto__stock_minimo=10)
+
+        response = authenticated_client.get(reverse('cola_reposicion'))
+
+        assert response.status_code == 200
+        productos = [r.producto for r in response.context['reposiciones']]
+        assert productos == [bajo.producto]
+
+    def test_api_ordenada_por_urgencia_y_paginada(self, authenticated_client):
+        """
+        Test que verifica el orden por faltante y el enlace a la siguiente página.
+        """
+        for faltante in (1, 8, 4):
+            InventarioFactory(cantidad_actual=10, cantidad_reservada=0,
+                              producto__stock_minimo=10 + faltante)
+        url = reverse('api_reposicion')
+
+        datos = authenticated_client.get(url, {'limite': 2}).json()
+        assert [r['faltante'] for r in datos['resultados']] == [8, 4]
+        assert datos['siguiente']
+
+        datos = authenticated_client.get(url + datos['siguiente']).json()
+        assert [r['faltante'] for r in datos['resultados']] == [1]
+        assert datos['siguiente'] is None
+
+
+@pytest.mark.django_db
+class TestExportarInventario:
+    """
+    Tests para la exportación CSV del inventario.
+    """
+
+    def test_exporta_el_inventario_de_la_categoria_filtrada(self, authenticated_client):
+        """
+        Test que verifica el filtro de categoría y la columna de disponible.
+        """
+        categoria = CategoriaProductoFactory()
+        producto = ProductoFactory(categoria=categoria)
+        InventarioFactory(producto=producto, cantidad_actual=10, cantidad_reservada=3)
+        InventarioFactory(producto=ProductoFactory())
+
+        response = authenticated_client.get(
+            reverse('exportar_inventario'), {'buscarCategoria': categoria.id})
+
+        contenido = b''.join(response.streaming_content).decode('utf-8-sig')
+        filas = list(csv.reader(io.StringIO(contenido), delimiter=';'))
+        assert len(filas) == 2
+        fila = dict(zip(filas[0], filas[1]))
+        assert fila['Código Producto'] == producto.codigo_producto
+        assert fila['Disponible'] == '7'
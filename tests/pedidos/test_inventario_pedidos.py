@@ -0,0 +1,541 @@
+import json
+import pytest
+from io import StringIO
+from datetime import date
+from decimal import Decimal
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from inventario.models import Inventario, MovimientoStock
+from pedidos.models import OrdenVenta, DetalleOrdenVenta, PedidoProveedor
+from pedidos.services import (
+    recalcular_totales_orden_venta, recalcular_totales_pedido_proveedor,
+    totales_descuadrados)
+from pedidos.signals import delta_cambio_estado_orden_venta
+from tests.clientes.factories import ClienteFactory
+from tests.inventario.factories import InventarioFactory, ProductoFactory
+from tests.pedidos.factories import (
+    OrdenVentaFactory, DetalleOrdenVentaFactory,
+    PedidoProveedorFactory, DetallePedidoProveedorFactory)
+
+
+@pytest.mark.django_db
+class TestCambioEstadoOrdenVenta:
+    """
+    Tests para el procesamiento en bloque de cambios de estado de órdenes de venta.
+    """
+
+    def test_matriz_de_estados(self):
+        """
+        Test que verifica la variación por unidad de los cambios de estado.
+        """
+        assert delta_cambio_estado_orden_venta(
+            'pendiente', 'procesando') == (0, 0)
+        assert delta_cambio_estado_orden_venta(
+            'procesando', 'entregado') == (-1, -1)
+        assert delta_cambio_estado_orden_venta(
+            'entregado', 'cancelado') == (1, 0)
+        assert delta_cambio_estado_orden_venta(
+            'cancelado', 'pendiente') == (0, 1)
+
+    def test_lineas_del_mismo_producto_se_agrupan(self):
+        """
+        Test que verifica que las líneas de un mismo producto se consumen juntas.
+        """
+        orden = OrdenVentaFactory(estado='procesando')
+        inventario = InventarioFactory(
+            cantidad_actual=20, cantidad_reservada=0)
+        DetalleOrdenVentaFactory(
+            orden=orden, producto=inventario.producto, cantidad=3)
+        DetalleOrdenVentaFactory(
+            orden=orden, producto=inventario.producto, cantidad=4)
+
+        orden.estado = 'entregado'
+        orden.save()
+
+        inventario.refresh_from_db()
+        assert inventario.cantidad_actual == 13
+        assert inventario.cantidad_reservada == 0
+
+    def test_consultas_no_crecen_con_las_lineas(self, django_assert_max_num_queries):
+        """
+        Test que verifica que el cambio de estado no hace consultas por línea.
+        """
+        orden = OrdenVentaFactory(estado='procesando')
+        for _ in range(30):
+            DetalleOrdenVentaFactory(orden=orden, cantidad=1)
+
+        orden.estado = 'entregado'
+        with django_assert_max_num_queries(15):
+            orden.save()
+
+        assert Inventario.objects.filter(cantidad_actual=-1).count() == 30
+
+
+@pytest.mark.django_db
+class TestRegistroOrdenVentaEnBloque:
+    """
+    Tests para el alta en bloque de líneas de orden de venta.
+    """
+
+    def _datos_orden(self, productos, cantidad=1):
+        cliente = ClienteFactory()
+        return {
+            'cliente': cliente.id,
+            'fecha_orden': date.today(),
+            'fecha_entrega': date.today(),
+            'metodo_pago': 'efectivo',
+            'descuento_general': 0,
+            'producto_id': [producto.id for producto in productos],
+            'cantidad': [cantidad] * len(productos),
+            'precio_unitario': [10.00] * len(productos),
+            'descuento_linea': [0] * len(productos),
+            'igic_porcentaje': [7.00] * len(productos),
+        }
+
+    def test_reserva_agrupada_por_producto(self, authenticated_client):
+        """
+        Test que verifica que las líneas repetidas reservan con un solo movimiento.
+        """
+        inventario = InventarioFactory(
+            cantidad_actual=50, cantidad_reservada=0)
+        producto = inventario.producto
+        datos = self._datos_orden([producto, producto, producto], cantidad=2)
+
+        authenticated_client.post(reverse('registro_orden_venta'), data=datos)
+
+        orden = OrdenVenta.objects.get()
+        assert orden.detalles.count() == 3
+        assert orden.subtotal == Decimal('60.00')
+        assert orden.impuestos == Decimal('4.20')
+        inventario.refresh_from_db()
+        assert inventario.cantidad_reservada == 6
+        assert MovimientoStock.objects.filter(producto=producto).count() == 1
+
+    def test_importes_de_linea_redondeados(self, authenticated_client):
+        """
+        Test que verifica que la cabecera suma los importes de línea ya redondeados.
+        """
+        productos = ProductoFactory.create_batch(2)
+        datos = self._datos_orden(productos)
+        datos['precio_unitario'] = ['1.25', '1.25']
+        datos['igic_porcentaje'] = ['10', '10']
+
+        authenticated_client.post(reverse('registro_orden_venta'), data=datos)
+
+        orden = OrdenVenta.objects.get()
+        detalles = list(orden.detalles.all())
+        assert [d.igic_importe for d in detalles] == [Decimal('0.13'), Decimal('0.13')]
+        assert orden.impuestos == sum(d.igic_importe for d in detalles)
+        assert orden.total == sum(d.subtotal for d in detalles)
+        assert orden.total == Decimal('2.76')
+        assert totales_descuadrados(OrdenVenta) == []
+
+    def test_producto_inexistente_no_crea_la_orden(self, authenticated_client):
+        """
+        Test que verifica que una línea inválida anula toda la orden.
+        """
+        producto = ProductoFactory()
+        datos = self._datos_orden([producto])
+        datos['producto_id'] = [producto.id, 999999]
+        datos['cantidad'] = [1, 1]
+        datos['precio_unitario'] = [10, 10]
+        datos['descuento_linea'] = [0, 0]
+        datos['igic_porcentaje'] = [7, 7]
+
+        authenticated_client.post(reverse('registro_orden_venta'), data=datos)
+
+        assert not OrdenVenta.objects.exists()
+        assert not MovimientoStock.objects.exists()
+
+    def test_consultas_constantes(self, authenticated_client, django_assert_max_num_queries):
+        """
+        Test que verifica que el número de consultas no crece con las líneas.
+        """
+        productos = ProductoFactory.create_batch(40)
+        datos = self._datos_orden(productos)
+        url = reverse('registro_orden_venta')
+
+        with django_assert_max_num_queries(25):
+            response = authenticated_client.post(url, data=datos)
+
+        assert response.status_code == 302
+        assert DetalleOrdenVenta.objects.count() == 40
+
+
+@pytest.mark.django_db
+class TestCamposRastreados:
+    """
+    Tests para el rastreo de valores originales en órdenes y líneas.
+    """
+
+    def test_previous_y_has_changed(self):
+        """
+        Test que verifica los valores originales tras cargar desde la BD.
+        """
+        detalle = DetalleOrdenVentaFactory(cantidad=5)
+        detalle = DetalleOrdenVenta.objects.get(pk=detalle.pk)
+
+        detalle.cantidad = 8
+
+        assert detalle.previous('cantidad') == 5
+        assert detalle.has_changed('cantidad')
+        assert detalle.previous('producto') == detalle.producto_id
+        assert not detalle.has_changed('producto')
+
+    def test_refresh_parcial_conserva_cambios_sin_guardar(self):
+        """
+        Test que verifica que refresh_from_db(fields=...) solo toma como originales los campos recargados.
+        """
+        orden = OrdenVentaFactory(estado='pendiente')
+        inventario = InventarioFactory(cantidad_actual=20, cantidad_reservada=0)
+        detalle = DetalleOrdenVentaFactory(
+            orden=orden, producto=inventario.producto, cantidad=5)
+        detalle = DetalleOrdenVenta.objects.get(pk=detalle.pk)
+
+        detalle.cantidad = 8
+        detalle.refresh_from_db(fields=['precio_unitario'])
+
+        assert detalle.previous('cantidad') == 5
+        assert detalle.has_changed('cantidad')
+
+        detalle.save()
+        inventario.refresh_from_db()
+        assert inventario.cantidad_reservada == 8
+
+        detalle.cantidad = 3
+        detalle.refresh_from_db(fields=['cantidad'])
+        assert detalle.cantidad == 8
+        assert not detalle.has_changed('cantidad')
+
+    def test_guardar_no_consulta_la_fila_anterior(self, django_assert_num_queries):
+        """
+        Test que verifica que guardar una orden sin cambio de estado solo hace el UPDATE.
+        """
+        orden = OrdenVenta.objects.get(pk=OrdenVentaFactory().pk)
+        orden.notas = 'Actualizada'
+
+        with django_assert_num_queries(1):
+            orden.save()
+
+    def test_cambio_de_cantidad_ajusta_la_reserva(self):
+        """
+        Test que verifica que modificar una línea reserva solo la diferencia.
+        """
+        orden = OrdenVentaFactory(estado='pendiente')
+        inventario = InventarioFactory(
+            cantidad_actual=20, cantidad_reservada=0)
+        detalle = DetalleOrdenVentaFactory(
+            orden=orden, producto=inventario.producto, cantidad=5)
+
+        detalle = DetalleOrdenVenta.objects.get(pk=detalle.pk)
+        detalle.cantidad = 2
+        detalle.save()
+
+        inventario.refresh_from_db()
+        assert inventario.cantidad_reservada == 2
+
+
+@pytest.mark.django_db
+class TestRecepcionPedidoProveedor:
+    """
+    Tests para la recepción en bloque de pedidos a proveedores.
+    """
+
+    def _pedido(self, cantidad_pedida=10):
+        pedido = PedidoProveedorFactory(estado='pendiente')
+        inventario = InventarioFactory(
+            cantidad_actual=0, cantidad_reservada=0)
+        detalle = DetallePedidoProveedorFactory(
+            pedido=pedido, producto=inventario.producto,
+            cantidad_pedida=cantidad_pedida, cantidad_recibida=0)
+        return pedido, detalle, inventario
+
+    def _recibir(self, client, pedido, lineas, estado='recibido_parcial'):
+        return client.post(
+            reverse('recepcion_pedido_proveedor', args=[pedido.id]),
+            data=json.dumps({'estado': estado, 'lineas': lineas}),
+            content_type='application/json')
+
+    def test_recepcion_parcial_suma_una_sola_vez(self, authenticated_client):
+        """
+        Test que verifica que la primera recepción parcial no duplica el stock.
+        """
+        pedido, detalle, inventario = self._pedido()
+
+        response = self._recibir(
+            authenticated_client, pedido, {str(detalle.id): 4})
+
+        assert response.json()['lineas_actualizadas'] == 1
+        inventario.refresh_from_db()
+        detalle.refresh_from_db()
+        assert inventario.cantidad_actual == 4
+        assert detalle.cantidad_recibida == 4
+
+    def test_segunda_recepcion_aplica_la_diferencia(self, authenticated_client):
+        """
+        Test que verifica que una nueva recepción parcial suma solo lo nuevo.
+        """
+        pedido, detalle, inventario = self._pedido()
+
+        self._recibir(authenticated_client, pedido, {str(detalle.id): 4})
+        self._recibir(authenticated_client, pedido, {str(detalle.id): 7})
+
+        inventario.refresh_from_db()
+        assert inventario.cantidad_actual == 7
+
+    def test_recepcion_completa_tras_parcial(self, authenticated_client):
+        """
+        Test que verifica que completar el pedido suma solo lo pendiente.
+        """
+        pedido, detalle, inventario = self._pedido()
+
+        self._recibir(authenticated_client, pedido, {str(detalle.id): 4})
+        pedido = PedidoProveedor.objects.get(pk=pedido.pk)
+        pedido.estado = 'recibido_completo'
+        pedido.save()
+
+        inventario.refresh_from_db()
+        detalle.refresh_from_db()
+        assert inventario.cantidad_actual == 10
+        assert detalle.cantidad_recibida == 10
+
+    def test_cantidad_invalida_se_informa(self, authenticated_client):
+        """
+        Test que verifica que una cantidad mayor a la pedida no se aplica.
+        """
+        pedido, detalle, inventario = self._pedido(cantidad_pedida=5)
+
+        response = self._recibir(
+            authenticated_client, pedido, {str(detalle.id): 9})
+
+        assert response.status_code == 400
+        assert response.json()['success'] is False
+        assert response.json()['errores']
+        inventario.refresh_from_db()
+        assert inventario.cantidad_actual == 0
+
+    def test_linea_invalida_no_aplica_ninguna(self, authenticated_client):
+        """
+        Test que verifica que una línea desconocida rechaza la recepción entera.
+        """
+        pedido, detalle, inventario = self._pedido()
+
+        response = self._recibir(
+            authenticated_client, pedido, {str(detalle.id): 4, '999999': 1})
+
+        assert response.status_code == 400
+        assert 'Líneas que no pertenecen al pedido: 999999.' in response.json()['errores']
+        inventario.refresh_from_db()
+        detalle.refresh_from_db()
+        pedido.refresh_from_db()
+        assert inventario.cantidad_actual == 0
+        assert detalle.cantidad_recibida == 0
+        assert pedido.estado == 'pendiente'
+
+    def test_recepcion_completa_con_cantidad_invalida(self, authenticated_client):
+        """
+        Test que verifica que recibido_completo no sustituye cantidades inválidas por la pedida.
+        """
+        pedido, detalle, inventario = self._pedido(cantidad_pedida=5)
+
+        response = self._recibir(
+            authenticated_client, pedido, {str(detalle.id): -1}, estado='recibido_completo')
+
+        assert response.status_code == 400
+        pedido.refresh_from_db()
+        inventario.refresh_from_db()
+        assert pedido.estado == 'pendiente'
+        assert inventario.cantidad_actual == 0
+
+    @pytest.mark.parametrize('estado_final', ['cancelado', 'recibido_completo'])
+    def test_pedido_en_estado_final_no_admite_recepciones(self, authenticated_client, estado_final):
+        """
+        Test que verifica que un pedido cancelado o ya recibido no vuelve a sumar stock.
+        """
+        pedido, detalle, inventario = self._pedido()
+        PedidoProveedor.objects.filter(pk=pedido.pk).update(estado=estado_final)
+        stock_inicial = Inventario.objects.get(pk=inventario.pk).cantidad_actual
+        movimientos = MovimientoStock.objects.count()
+
+        response = self._recibir(
+            authenticated_client, pedido, {str(detalle.id): 4})
+
+        assert response.status_code == 400
+        assert 'no admite recepciones' in response.json()['errores'][0]
+        inventario.refresh_from_db()
+        pedido.refresh_from_db()
+        assert inventario.cantidad_actual == stock_inicial
+        assert MovimientoStock.objects.count() == movimientos
+        assert pedido.estado == estado_final
+
+    def test_formulario_con_cantidad_invalida_no_cambia_el_estado(self, authenticated_client):
+        """
+        Test que verifica que el formulario del detalle tampoco aplica una recepción inválida.
+        """
+        pedido, detalle, inventario = self._pedido(cantidad_pedida=5)
+
+        authenticated_client.post(
+            reverse('detalle_pedido_proveedor', args=[pedido.id]),
+            {'estado': 'recibido_parcial', f'cantidad_recibida_{detalle.id}': '9'})
+
+        pedido.refresh_from_db()
+        inventario.refresh_from_db()
+        assert pedido.estado == 'pendiente'
+        assert inventario.cantidad_actual == 0
+
+
+@pytest.mark.django_db
+class TestRecalcularTotales:
+    """
+    Tests para el cálculo de totales en la base de datos.
+    """
+
+    def test_totales_orden_venta(self):
+        """
+        Test que verifica subtotal sin IGIC, descuento general e impuestos.
+        """
+        orden = OrdenVentaFactory(estado='cancelado', descuento=Decimal('5.00'))
+        DetalleOrdenVentaFactory(
+            orden=orden, cantidad=3, precio_unitario=Decimal('10.00'),
+            descuento_linea=Decimal('1.00'), igic_importe=Decimal('2.03'))
+        DetalleOrdenVentaFactory(
+            orden=orden, cantidad=1, precio_unitario=Decimal('0.10'),
+            descuento_linea=Decimal('0.00'), igic_importe=Decimal('0.01'))
+
+        recalcular_totales_orden_venta(orden)
+
+        orden.refresh_from_db()
+        assert orden.subtotal == Decimal('29.10')
+        assert orden.impuestos == Decimal('2.04')
+        assert orden.total == Decimal('26.14')
+
+    def test_totales_pedido_proveedor_sin_igic_en_subtotal(self):
+        """
+        Test que verifica que el subtotal del pedido no incluye el IGIC de las líneas.
+        """
+        pedido = PedidoProveedorFactory(estado='cancelado')
+        DetallePedidoProveedorFactory(
+            pedido=pedido, cantidad_pedida=2, precio_unitario=Decimal('15.50'),
+            igic_importe=Decimal('2.17'), subtotal=Decimal('33.17'))
+
+        recalcular_totales_pedido_proveedor(pedido)
+
+        pedido.refresh_from_db()
+        assert pedido.subtotal == Decimal('31.00')
+        assert pedido.impuestos == Decimal('2.17')
+        assert pedido.total == Decimal('33.17')
+
+    def test_dos_consultas_sin_importar_las_lineas(self, django_assert_num_queries):
+        """
+        Test que verifica que recalcular cuesta un SELECT y un UPDATE.
+        """
+        orden = OrdenVentaFactory(estado='cancelado')
+        DetalleOrdenVentaFactory.create_batch(25, orden=orden)
+
+        with django_assert_num_queries(2):
+            recalcular_totales_orden_venta(orden)
+
+    def test_descuento_general_desde_el_formulario(self, authenticated_client):
+        """
+        Test que verifica el descuento exacto y un único UPDATE de los totales.
+        """
+        orden = OrdenVentaFactory(estado='pendiente', descuento=Decimal('0'))
+        DetalleOrdenVentaFactory(
+            orden=orden, cantidad=3, precio_unitario=Decimal('10.00'),
+            descuento_linea=Decimal('0'), igic_importe=Decimal('2.10'))
+        recalcular_totales_orden_venta(orden)
+
+        with CaptureQueriesContext(connection) as consultas:
+            authenticated_client.post(
+                reverse('detalle_orden_venta', kwargs={'orden_id': orden.id}),
+                data={'accion': 'actualizar_informacion_general',
+                      'metodo_pago': 'efectivo', 'descuento_general': '0.10'})
+
+        orden.refresh_from_db()
+        assert orden.descuento == Decimal('0.10')
+        assert orden.total == Decimal('32.00')
+        escrituras_totales = [
+            c['sql'] for c in consultas.captured_queries
+            if c['sql'].startswith('UPDATE "pedidos_ordenventa"') and '"total"' in c['sql']]
+        assert len(escrituras_totales) == 1
+
+
+@pytest.mark.django_db
+class TestTotalesIncrementales:
+    """
+    Tests para el mantenimiento de totales por deltas al añadir o quitar líneas.
+    """
+
+    def _orden_con_lineas(self, lineas):
+        orden = OrdenVentaFactory(estado='cancelado', descuento=Decimal('0'))
+        DetalleOrdenVentaFactory.create_batch(
+            lineas, orden=orden, cantidad=1, precio_unitario=Decimal('10.00'),
+            descuento_linea=Decimal('0'), igic_importe=Decimal('0.70'))
+        recalcular_totales_orden_venta(orden)
+        return orden
+
+    def test_agregar_y_eliminar_linea(self, authenticated_client):
+        """
+        Test que verifica que los totales siguen cuadrando tras añadir y quitar.
+        """
+        orden = self._orden_con_lineas(2)
+        producto = ProductoFactory()
+
+        authenticated_client.post(
+            reverse('agregar_producto_orden_venta', args=[orden.id]),
+            data={'producto': producto.id, 'cantidad': 3, 'precio_unitario': '5.50',
+                  'descuento_linea': '1.00', 'igic_porcentaje': '7'})
+
+        orden.refresh_from_db()
+        assert orden.subtotal == Decimal('35.50')
+        assert orden.impuestos == Decimal('2.49')
+        assert orden.total == Decimal('37.99')
+        assert not totales_descuadrados(OrdenVenta)
+
+        detalle = orden.detalles.get(producto=producto)
+        authenticated_client.post(
+            reverse('eliminar_producto_orden_venta', args=[detalle.id]))
+
+        orden.refresh_from_db()
+        assert orden.total == Decimal('21.40')
+        assert not totales_descuadrados(OrdenVenta)
+
+    def test_coste_independiente_del_numero_de_lineas(self, authenticated_client):
+        """
+        Test que verifica que quitar una línea cuesta igual en órdenes de 5 y de 60 líneas.
+        """
+        consultas = []
+        for lineas in (5, 60):
+            orden = self._orden_con_lineas(lineas)
+            detalle = orden.detalles.first()
+            url = reverse('eliminar_producto_orden_venta', args=[detalle.id])
+
+            with CaptureQueriesContext(connection) as capturadas:
+                authenticated_client.post(url)
+            consultas.append(len(capturadas))
+
+        assert consultas[0] == consultas[1]
+
+    def test_verificador_detecta_y_corrige(self):
+        """
+        Test que verifica que el comando encuentra y corrige los descuadres.
+        """
+        pedido = PedidoProveedorFactory(estado='cancelado')
+        DetallePedidoProveedorFactory(
+            pedido=pedido, cantidad_pedida=1, precio_unitario=Decimal('10.00'),
+            igic_importe=Decimal('0.70'))
+        PedidoProveedor.objects.filter(pk=pedido.pk).update(
+            subtotal=0, impuestos=0, total=0)
+
+        salida = StringIO()
+        call_command('verificar_totales', stdout=salida)
+        assert pedido.numero_pedido in salida.getvalue()
+        assert len(totales_descuadrados(PedidoProveedor)) == 1
+
+        call_command('verificar_totales', '--corregir', stdout=StringIO())
+        pedido.refresh_from_db()
+        assert pedido.total == Decimal('10.70')
+        assert not totales_descuadrados(PedidoProveedor)
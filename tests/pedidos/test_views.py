@@ -1,4 +1,8 @@
+import csv
+import io
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from datetime import date
 
@@ -11,7 +15,7 @@ from tests.pedidos.factories import (
 from tests.factories import UserFactory
 from tests.proveedores.factories import ProveedorFactory
 from tests.clientes.factories import ClienteFactory
-from tests.inventario.factories import ProductoFactory
+from tests.inventario.factories import ProductoFactory, InventarioFactory
 
 
 @pytest.mark.django_db
@@ -30,6 +34,39 @@ class TestDashboardPedidosView:
         assert response.status_code == 200
         assert 'pedidos/dashboard.html' in [t.name for t in response.templates]
 
+    def test_estadisticas_en_dos_consultas_y_en_cache(self, authenticated_client):
+        """
+        Test que verifica un aggregate por modelo y que la segunda visita sale de caché.
+        """
+        PedidoProveedorFactory.create_batch(3, estado='pendiente')
+        OrdenVentaFactory.create_batch(2, estado='entregado')
+        url = reverse('dashboard_pedidos')
+
+        with CaptureQueriesContext(connection) as primera:
+            response = authenticated_client.get(url)
+        with CaptureQueriesContext(connection) as segunda:
+            authenticated_client.get(url)
+
+        consultas = [q['sql'] for q in primera.captured_queries]
+        assert sum('COUNT' in sql for sql in consultas) == 2
+        assert response.context['stats_pedidos']['pendientes'] == 3
+        assert response.context['stats_ordenes']['entregadas'] == 2
+        assert len(segunda) < len(primera) - 3
+
+    def test_guardar_una_orden_invalida_la_cache(self, authenticated_client,
+                                                 django_capture_on_commit_callbacks):
+        """
+        Test que verifica que al guardar una orden el dashboard se recalcula.
+        """
+        url = reverse('dashboard_pedidos')
+        authenticated_client.get(url)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            OrdenVentaFactory(estado='pendiente')
+
+        response = authenticated_client.get(url)
+        assert response.context['stats_ordenes']['pendientes'] == 1
+
 
 @pytest.mark.django_db
 class TestRegistroPedidoProveedorView:
@@ -452,3 +489,111 @@ class TestAgregarProductoOrdenVentaView:
         # Verificar reserva
         inventario.refresh_from_db()
         assert inventario.cantidad_reservada == 2
+
+
+@pytest.mark.django_db
+class TestAutocompletadoProductos:
+    """
+    Tests para la API de autocompletado de productos de los formularios.
+    """
+
+    def test_devuelve_disponibilidad_y_filtra_por_categoria(self, authenticated_client):
+        """
+        Test que verifica la disponibilidad calculada y el filtro de categoría.
+        """
+        inventario = InventarioFactory(
+            cantidad_actual=12, cantidad_reservada=5)
+        ProductoFactory()
+
+        response = authenticated_client.get(
+            reverse('api_productos'), {'categoria': inventario.producto.categoria_id})
+
+        resultados = response.json()['resultados']
+        assert len(resultados) == 1
+        assert resultados[0]['id'] == inventario.producto.id
+        assert resultados[0]['disponible'] == 7
+
+    def test_busqueda_y_paginas(self, authenticated_client):
+        """
+        Test que verifica la búsqueda por nombre y el cursor a la página siguiente.
+        """
+        for i in range(5):
+            ProductoFactory(nombre=f'Martillo {i}')
+        ProductoFactory(nombre='Destornillador')
+        url = reverse('api_productos')
+
+        primera = authenticated_client.get(
+            url, {'q': 'martillo', 'limite': 3}).json()
+        segunda = authenticated_client.get(url + primera['siguiente']).json()
+
+        nombres = [p['nombre'] for p in primera['resultados'] + segunda['resultados']]
+        assert len(primera['resultados']) == 3
+        assert sorted(nombres) == [f'Martillo {i}' for i in range(5)]
+        assert segunda['siguiente'] is None
+
+    def test_formulario_no_incluye_el_catalogo(self, authenticated_client):
+        """
+        Test que verifica que el formulario de orden ya no renderiza todos los productos.
+        """
+        producto = ProductoFactory(nombre='Producto Oculto')
+
+        response = authenticated_client.get(reverse('registro_orden_venta'))
+
+        assert response.status_code == 200
+        assert producto.nombre not in response.content.decode()
+
+
+@pytest.mark.django_db
+class TestExportacionCSV:
+    """
+    Tests para las exportaciones CSV de pedidos y órdenes.
+    """
+
+    def _filas(self, response):
+        contenido = b''.join(response.streaming_content).decode('utf-8-sig')
+        return list(csv.reader(io.StringIO(contenido), delimiter=';'))
+
+    def test_exporta_una_fila_por_linea_con_los_filtros_del_listado(self, authenticated_client):
+        """
+        Test que verifica que la exportación respeta el filtro de estado y lleva las líneas.
+        """
+        orden = OrdenVentaFactory(estado='pendiente')
+        DetalleOrdenVentaFactory.create_batch(2, orden=orden)
+        OrdenVentaFactory(estado='cancelado')
+
+        response = authenticated_client.get(
+            reverse('exportar_ordenes_venta'), {'estado': 'pendiente'})
+
+        assert response.status_code == 200
+        assert response.streaming
+        assert response['Content-Type'] == 'text/csv; charset=utf-8'
+        filas = self._filas(response)
+        assert filas[0][0] == 'Número'
+        assert len(filas) == 3
+        assert {fila[0] for fila in filas[1:]} == {orden.numero_orden}
+
+    def test_pedido_sin_lineas_se_exporta_igualmente(self, authenticated_client):
+        """
+        Test que verifica que un pedido sin líneas aparece con las columnas de línea vacías.
+        """
+        pedido = PedidoProveedorFactory()
+
+        response = authenticated_client.get(reverse('exportar_pedidos_proveedor'))
+
+        filas = self._filas(response)
+        assert len(filas) == 2
+        assert filas[1][0] == pedido.numero_pedido
+        assert filas[1][-1] == ''
+
+    def test_accion_de_admin_exporta_los_seleccionados(self, admin_client):
+        """
+        Test que verifica la acción de admin sobre las órdenes seleccionadas.
+        """
+        orden, otra = OrdenVentaFactory.create_batch(2)
+
+        response = admin_client.post(
+            reverse('admin:pedidos_ordenventa_changelist'),
+            {'action': 'exportar_csv', '_selected_action': [orden.pk]})
+
+        filas = self._filas(response)
+        assert [fila[0] for fila in filas[1:]] == [orden.numero_orden]
@@ -280,3 +280,27 @@ class TestDetailsSupplierView:
         response = authenticated_client.post(url, data=update_data)
 
         assert response.status_code == 200  # No redirige
+
+
+@pytest.mark.django_db
+class TestExportarProveedores:
+    """
+    Tests para la exportación CSV de proveedores.
+    """
+
+    def test_exporta_los_proveedores_de_la_busqueda(self, authenticated_client):
+        """
+        Test que verifica que la exportación aplica la búsqueda del listado.
+        """
+        ProveedorFactory(nombre_empresa='Empresa ABC')
+        ProveedorFactory(nombre_empresa='Otra Empresa')
+
+        response = authenticated_client.get(
+            reverse('exportar_proveedores'), {'buscarProveedor': 'ABC'})
+
+        contenido = b''.join(response.streaming_content).decode('utf-8-sig')
+        lineas = contenido.splitlines()
+        assert response['Content-Disposition'].startswith(
+            'attachment; filename="proveedores_')
+        assert len(lineas) == 2
+        assert lineas[1].startswith('Empresa Abc;')
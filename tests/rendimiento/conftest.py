@@ -0,0 +1,92 @@
+import json
+import math
+import os
+from io import StringIO
+from pathlib import Path
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models import Count
+
+from clientes.models import Cliente
+from inventario.models import Producto
+from pedidos.models import OrdenVenta, PedidoProveedor
+from proveedores.models import Proveedor
+
+RUTA_PRESUPUESTOS = Path(__file__).with_name('presupuestos.json')
+
+# Multiplica el tamaño del dataset (RENDIMIENTO_ESCALA=10 para pruebas locales)
+ESCALA = int(os.environ.get('RENDIMIENTO_ESCALA', '1'))
+
+# Holgura de los presupuestos de tiempo en máquinas más lentas
+FACTOR_TIEMPO = float(os.environ.get('RENDIMIENTO_FACTOR_TIEMPO', '1'))
+
+# RENDIMIENTO_ACTUALIZAR=1 reescribe presupuestos.json con lo medido
+ACTUALIZAR = os.environ.get('RENDIMIENTO_ACTUALIZAR') == '1'
+
+# Filas del dataset con ESCALA=1
+TAMANOS_DATASET = {
+    'clientes': 300, 'proveedores': 40, 'productos': 500, 'ordenes': 2000, 'pedidos': 300,
+}
+
+
+def presupuesto_desde_medida(medida):
+    """Presupuesto que se guarda al actualizar: consultas exactas y margen en tiempo y memoria"""
+    return {
+        'consultas': medida['consultas'],
+        'milisegundos': max(math.ceil(medida['milisegundos'] * 3), 50),
+        'memoria_kb': math.ceil(medida['memoria_kb'] * 1.5) + 512,
+    }
+
+
+@pytest.fixture(scope='session')
+def presupuestos():
+    """Presupuestos comprometidos por vista; al actualizar se reescriben al final"""
+    datos = json.loads(RUTA_PRESUPUESTOS.read_text(encoding='utf-8'))
+    medidas = {}
+    yield datos, medidas
+    if ACTUALIZAR and medidas:
+        datos.update({nombre: presupuesto_desde_medida(medida)
+                      for nombre, medida in medidas.items()})
+        RUTA_PRESUPUESTOS.write_text(
+            json.dumps(dict(sorted(datos.items())), indent=2, ensure_ascii=False) + '\n',
+            encoding='utf-8')
+
+
+@pytest.fixture(scope='module')
+def dataset(django_db_setup, django_db_blocker):
+    """
+    Genera el dataset una vez por módulo (fuera de las transacciones de los
+    tests) y devuelve los ids que usan las vistas de detalle y de acciones.
+    """
+    with django_db_blocker.unblock():
+        # Creador de los documentos generados, como en los datos reales
+        User.objects.create_user('empleado_rendimiento', first_name='Empleado')
+        tamanos = {clave: valor * ESCALA for clave, valor in TAMANOS_DATASET.items()}
+        call_command('generate_dataset', limpiar=True, semilla=2026, lineas=5,
+                     stdout=StringIO(), **tamanos)
+
+        ordenes = OrdenVenta.objects.annotate(lineas=Count('detalles'))
+        pedidos = PedidoProveedor.objects.annotate(lineas=Count('detalles'))
+        orden = ordenes.filter(estado='pendiente', lineas__gte=2).order_by('-id').first()
+        pedido = pedidos.filter(estado='pendiente', lineas__gte=2).order_by('-id').first()
+        ids = {
+            'orden': orden.id,
+            'detalle_orden': orden.detalles.order_by('id').first().id,
+            'orden_cancelada': OrdenVenta.objects.filter(estado='cancelado').order_by('-id').first().id,
+            'pedido': pedido.id,
+            'detalles_pedido': list(pedido.detalles.order_by('id').values_list('id', flat=True)),
+            'detalle_pedido': pedido.detalles.order_by('id').first().id,
+            'producto': Producto.objects.order_by('-id').first().id,
+            'cliente': Cliente.objects.order_by('-id').first().id,
+            'proveedor': Proveedor.objects.order_by('-id').first().id,
+            # Líneas de la orden que se registra por POST
+            'productos_orden': list(
+                Producto.objects.order_by('id').values_list('id', flat=True)[:20]),
+        }
+
+    yield ids
+
+    with django_db_blocker.unblock():
+        call_command('flush', interactive=False, verbosity=0)
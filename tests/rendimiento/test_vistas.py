@@ -0,0 +1,194 @@
+"""
+Presupuestos de rendimiento de las vistas.
+
+Cada vista se ejecuta contra el dataset de generate_dataset y se mide el
+número de consultas, el tiempo y el pico de memoria de la petición; el test
+falla si alguna medida supera su presupuesto en presupuestos.json. Tras un
+cambio que mejora (o empeora a propósito) una vista, los presupuestos se
+regeneran con RENDIMIENTO_ACTUALIZAR=1 y se revisan en el diff.
+
+Los presupuestos dependen de la máquina, así que no entran en la ejecución
+normal: se lanzan con `pytest -m rendimiento`.
+"""
+
+import json
+import time
+import tracemalloc
+
+import pytest
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver, reverse
+
+from tests.rendimiento.conftest import ACTUALIZAR, FACTOR_TIEMPO
+
+# Peticiones medidas por vista (se toma el menor tiempo)
+REPETICIONES = 3
+
+APPS = ('pedidos', 'inventario', 'clientes', 'proveedores')
+
+
+class Caso:
+    """Petición que se mide: nombre de la URL, método, argumentos y datos"""
+
+    def __init__(self, nombre, metodo='get', args=(), datos=None, json_datos=None, url=None):
+        self.nombre = nombre
+        self.url_nombre = url or nombre
+        self.metodo = metodo
+        self.args = args
+        self.datos = datos
+        self.json_datos = json_datos
+
+    def peticion(self, client, ids):
+        url = reverse(self.url_nombre, args=[ids[arg] for arg in self.args])
+        if self.json_datos is not None:
+            return client.post(url, data=json.dumps(self.json_datos(ids)),
+                               content_type='application/json')
+        datos = self.datos(ids) if callable(self.datos) else self.datos
+        return getattr(client, self.metodo)(url, data=datos)
+
+
+LINEA_ORDEN = {'cantidad': '2', 'precio_unitario': '10.00', 'igic_porcentaje': '7'}
+
+CASOS = [
+    # Pedidos
+    Caso('dashboard_pedidos'),
+    Caso('registro_pedido_proveedor'),
+    Caso('listado_pedidos_proveedor'),
+    Caso('listado_pedidos_proveedor_filtrado', url='listado_pedidos_proveedor',
+         datos={'estado': 'pendiente'}),
+    Caso('exportar_pedidos_proveedor'),
+    Caso('detalle_pedido_proveedor', args=['pedido']),
+    Caso('agregar_producto_pedido_proveedor', 'post', args=['pedido'],
+         datos=lambda ids: {'producto': ids['producto'], **LINEA_ORDEN}),
+    Caso('eliminar_producto_pedido_proveedor', 'post',
+         args=['detalle_pedido']),
+    Caso('eliminar_pedido_proveedor', 'post', args=['pedido']),
+    Caso('recepcion_pedido_proveedor', 'post', args=['pedido'], json_datos=lambda ids: {
+        'estado': 'recibido_completo',
+        'lineas': {str(detalle_id): 1 for detalle_id in ids['detalles_pedido']},
+    }),
+    Caso('registro_orden_venta'),
+    Caso('registro_orden_venta_post', 'post', url='registro_orden_venta', datos=lambda ids: {
+        'cliente': ids['cliente'],
+        'fecha_orden': '2026-01-15',
+        'fecha_entrega': '2026-01-20',
+        'metodo_pago': 'Transferencia',
+        'producto_id': ids['productos_orden'],
+        'cantidad': ['1'] * len(ids['productos_orden']),
+        'precio_unitario': ['10.00'] * len(ids['productos_orden']),
+        'descuento_linea': ['0'] * len(ids['productos_orden']),
+        'igic_porcentaje': ['7'] * len(ids['productos_orden']),
+    }),
+    Caso('listado_ordenes_venta'),
+    Caso('listado_ordenes_venta_filtrado', url='listado_ordenes_venta',
+         datos={'estado': 'entregado'}),
+    Caso('exportar_ordenes_venta'),
+    Caso('detalle_orden_venta', args=['orden']),
+    Caso('agregar_producto_orden_venta', 'post', args=['orden'],
+         datos=lambda ids: {'producto': ids['producto'], **LINEA_ORDEN}),
+    Caso('eliminar_producto_orden_venta', 'post', args=['detalle_orden']),
+    Caso('eliminar_orden_venta', 'post', args=['orden_cancelada']),
+    Caso('api_productos', datos={'q': 'a', 'limite': '20'}),
+
+    # Inventario
+    Caso('lista_inventario'),
+    Caso('lista_inventario_busqueda', url='lista_inventario', datos={'buscarProducto': 'a'}),
+    Caso('exportar_inventario'),
+    Caso('crear_producto'),
+    Caso('crear_categoria'),
+    Caso('detalle_producto', args=['producto']),
+    Caso('api_catalogo'),
+    Caso('cola_reposicion'),
+    Caso('api_reposicion'),
+
+    # Clientes
+    Caso('registro_cliente'),
+    Caso('listado_clientes'),
+    Caso('detalle_cliente', args=['cliente']),
+
+    # Proveedores
+    Caso('registro_proveedores'),
+    Caso('listado_proveedor'),
+    Caso('exportar_proveedores'),
+    Caso('editar_proveedor', args=['proveedor']),
+]
+
+
+def _ejecutar(client, caso, ids):
+    """
+    Ejecuta la petición dentro de un savepoint que se deshace: las vistas
+    que modifican datos se pueden repetir y no alteran el dataset.
+    """
+    with transaction.atomic():
+        cache.clear()
+        response = caso.peticion(client, ids)
+        if response.streaming:
+            # Las exportaciones hacen su trabajo al consumir el contenido
+            b''.join(response.streaming_content)
+        transaction.set_rollback(True)
+    return response
+
+
+def medir(client, caso, ids):
+    _ejecutar(client, caso, ids)  # calentamiento: plantillas, URLs, conexiones
+
+    consultas, tiempos = 0, []
+    for _ in range(REPETICIONES):
+        with CaptureQueriesContext(connection) as capturadas:
+            inicio = time.perf_counter()
+            response = _ejecutar(client, caso, ids)
+            tiempos.append(time.perf_counter() - inicio)
+        # SAVEPOINT y ROLLBACK del savepoint de _ejecutar no cuentan
+        consultas = max(consultas, len(capturadas) - 2)
+
+    tracemalloc.start()
+    try:
+        _ejecutar(client, caso, ids)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return response, {
+        'consultas': consultas,
+        'milisegundos': round(min(tiempos) * 1000, 1),
+        'memoria_kb': round(pico / 1024),
+    }
+
+
+@pytest.mark.rendimiento
+@pytest.mark.django_db
+@pytest.mark.parametrize('caso', CASOS, ids=[caso.nombre for caso in CASOS])
+def test_presupuesto_vista(caso, dataset, authenticated_client, presupuestos):
+    """
+    Test que verifica que la vista no supera sus presupuestos de consultas, tiempo y memoria.
+    """
+    comprometidos, medidas = presupuestos
+    response, medida = medir(authenticated_client, caso, dataset)
+
+    assert response.status_code in (200, 302), response.status_code
+    if ACTUALIZAR:
+        medidas[caso.nombre] = medida
+        return
+
+    presupuesto = comprometidos.get(caso.nombre)
+    assert presupuesto, (
+        f'{caso.nombre} no tiene presupuesto: ejecuta con RENDIMIENTO_ACTUALIZAR=1')
+    assert medida['consultas'] <= presupuesto['consultas'], medida
+    assert medida['milisegundos'] <= presupuesto['milisegundos'] * FACTOR_TIEMPO, medida
+    assert medida['memoria_kb'] <= presupuesto['memoria_kb'], medida
+
+
+def test_todas_las_vistas_tienen_caso():
+    """
+    Test que verifica que cada URL de las apps de negocio tiene su caso de rendimiento.
+    """
+    medidas = {caso.url_nombre for caso in CASOS}
+    urls = set()
+    for patron in get_resolver().url_patterns:
+        modulo = getattr(patron, 'urlconf_name', None)
+        if getattr(modulo, '__name__', '').split('.')[0] in APPS:
+            urls.update(p.name for p in patron.url_patterns if p.name)
+
+    assert urls - medidas == set()